@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html # Para exibir imagens
-from .models import PlateDetection, DetectedPlate, KnownPlate
+from .models import PlateDetection, DetectedPlate, KnownPlate, RegionOfInterest
 
 @admin.register(PlateDetection)
 class PlateDetectionAdmin(admin.ModelAdmin):
@@ -32,6 +32,13 @@ class KnownPlateAdmin(admin.ModelAdmin):
     search_fields = ('plate_number', 'details')
     ordering = ('plate_number',)
 
+@admin.register(RegionOfInterest)
+class RegionOfInterestAdmin(admin.ModelAdmin):
+    list_display = ('source_key', 'name', 'enabled', 'updated_at')
+    list_filter = ('enabled', 'source_key')
+    search_fields = ('source_key', 'name')
+    ordering = ('source_key', 'name')
+
 @admin.register(DetectedPlate)
 class DetectedPlateAdmin(admin.ModelAdmin):
     list_display = (
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class BackendConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if getattr(settings, 'PLATE_DETECTOR_PRELOAD', False):
+            # Importação tardia: evita carregar YOLO/EasyOCR em comandos como migrate
+            from .services.model_registry import model_registry
+            model_registry.warm_up()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0002_knownplate_remove_detectedplate_plate_number_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='platedetection',
+            name='original_image',
+            field=models.ImageField(blank=True, upload_to='uploads/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0003_alter_platedetection_original_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='platedetection',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
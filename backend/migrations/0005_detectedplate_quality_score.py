@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0004_platedetection_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detectedplate',
+            name='quality_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-17 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0005_detectedplate_quality_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionOfInterest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_key', models.CharField(db_index=True, help_text="'webcam:<id>' (ex.: webcam:0) ou 'mjpeg:<url>'", max_length=500, verbose_name='Fonte de Vídeo')),
+                ('name', models.CharField(blank=True, max_length=100, verbose_name='Nome')),
+                ('points', models.JSONField(help_text='Lista de pontos [x, y] normalizados (0-1), ex.: [[0, 0.4], [1, 0.4], [1, 1], [0, 1]]', verbose_name='Pontos')),
+                ('enabled', models.BooleanField(default=True, verbose_name='Ativa')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Região de Interesse',
+                'verbose_name_plural': 'Regiões de Interesse',
+                'ordering': ['source_key', 'name'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0006_regionofinterest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='platedetection',
+            name='profile',
+            field=models.CharField(blank=True, default='', max_length=30),
+        ),
+    ]
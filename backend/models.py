@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
 import uuid
@@ -6,7 +7,7 @@ import uuid
 class PlateDetection(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
-    original_image = models.ImageField(upload_to='uploads/')
+    original_image = models.ImageField(upload_to='uploads/', blank=True)  # Gravada em segundo plano
     created_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=[
@@ -16,6 +17,8 @@ class PlateDetection(models.Model):
         ('error', 'Erro')
     ], default='pending')
     error_message = models.TextField(blank=True, null=True)
+    progress = models.PositiveSmallIntegerField(default=0)  # 0-100, atualizado pelas detecções assíncronas
+    profile = models.CharField(max_length=30, blank=True, default='')  # Perfil do pipeline usado (realtime, balanced, ...)
 
     class Meta:
         ordering = ['-created_at']
@@ -48,6 +51,7 @@ class DetectedPlate(models.Model):
     best_ocr_text = models.CharField(max_length=20, blank=True)
     best_ocr_confidence = models.FloatField(null=True, blank=True)
     ocr_results = models.JSONField(default=dict)  # Todos os resultados OCR
+    quality_score = models.FloatField(null=True, blank=True)  # Qualidade do recorte (0-1) antes do OCR
     created_at = models.DateTimeField(auto_now_add=True)
 
     @property
@@ -57,4 +61,36 @@ class DetectedPlate(models.Model):
         return "Desconhecida"
 
     def __str__(self):
-        return f"{self.plate_number_detected} - {self.regularization_status}"
\ No newline at end of file
+        return f"{self.plate_number_detected} - {self.regularization_status}"
+
+
+class RegionOfInterest(models.Model):
+    """Polígono de uma fonte de vídeo em que as placas são procuradas (o restante do frame é ignorado)"""
+    source_key = models.CharField(
+        max_length=500, db_index=True, verbose_name="Fonte de Vídeo",
+        help_text="'webcam:<id>' (ex.: webcam:0) ou 'mjpeg:<url>'"
+    )
+    name = models.CharField(max_length=100, blank=True, verbose_name="Nome")
+    points = models.JSONField(
+        verbose_name="Pontos",
+        help_text="Lista de pontos [x, y] normalizados (0-1), ex.: [[0, 0.4], [1, 0.4], [1, 1], [0, 1]]"
+    )
+    enabled = models.BooleanField(default=True, verbose_name="Ativa")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def clean(self):
+        if not isinstance(self.points, list) or len(self.points) < 3:
+            raise ValidationError({'points': "Informe ao menos 3 pontos [x, y]."})
+        for point in self.points:
+            if (not isinstance(point, (list, tuple)) or len(point) != 2 or
+                    not all(isinstance(value, (int, float)) and 0 <= value <= 1 for value in point)):
+                raise ValidationError({'points': f"Ponto inválido: {point}. Use [x, y] com valores entre 0 e 1."})
+
+    def __str__(self):
+        return f"{self.source_key} - {self.name or 'ROI'}"
+
+    class Meta:
+        verbose_name = "Região de Interesse"
+        verbose_name_plural = "Regiões de Interesse"
+        ordering = ['source_key', 'name']
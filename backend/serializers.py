@@ -4,8 +4,8 @@ from .models import PlateDetection, DetectedPlate, KnownPlate # Adicione KnownPl
 class PlateDetectionSerializer(serializers.ModelSerializer):
     class Meta:
         model = PlateDetection
-        fields = ['id', 'original_image', 'created_at', 'processed_at', 'status', 'error_message']
-        read_only_fields = ['id', 'created_at', 'processed_at', 'status', 'error_message']
+        fields = ['id', 'original_image', 'created_at', 'processed_at', 'status', 'progress', 'profile', 'error_message']
+        read_only_fields = ['id', 'created_at', 'processed_at', 'status', 'progress', 'profile', 'error_message']
 
 
 class DetectedPlateSerializer(serializers.ModelSerializer):
@@ -32,6 +32,7 @@ class DetectedPlateSerializer(serializers.ModelSerializer):
             'best_ocr_text',
             'best_ocr_confidence',
             'ocr_results',
+            'quality_score',
             'known_plate', # ID da KnownPlate associada (opcional, pode remover se não quiser expor o ID direto)
             'known_plate_number', # Novo campo
             'known_plate_is_regularized' # Novo campo
@@ -0,0 +1,83 @@
+import math
+import time
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from .metrics import metrics
+
+
+# Proporção (largura / altura) das placas brasileiras: carro 400x130 mm, moto 200x170 mm
+CAR_PLATE_ASPECT = 400 / 130
+MOTORCYCLE_PLATE_ASPECT = 200 / 170
+
+
+class CropQuality(NamedTuple):
+    score: float  # 0-1 (nitidez, tamanho e proporção)
+    sharpness: float  # Variância do Laplaciano
+    width: int
+    height: int
+    aspect_error: float  # |log(proporção / proporção da placa mais próxima)|
+    acceptable: bool
+    reason: Optional[str]  # Motivo da rejeição ('blur', 'size' ou 'aspect')
+
+
+def assess_crop(crop: np.ndarray) -> CropQuality:
+    """
+    Avalia se um recorte do YOLO tem qualidade suficiente para o OCR
+
+    Limites configuráveis: settings.CROP_MIN_SHARPNESS, CROP_MIN_WIDTH, CROP_MIN_HEIGHT
+    e CROP_MAX_ASPECT_ERROR. O score combina nitidez (relativa a CROP_SHARPNESS_REFERENCE),
+    largura (relativa a CROP_WIDTH_REFERENCE) e proximidade da proporção de placa de carro ou moto.
+
+    Args:
+        crop: Recorte da placa (BGR ou escala de cinza)
+
+    Returns:
+        CropQuality
+    """
+    start = time.perf_counter()
+
+    height, width = crop.shape[:2]
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var()) if gray.size else 0.0
+
+    aspect = width / height if height else 0.0
+    if aspect > 0:
+        aspect_error = min(abs(math.log(aspect / CAR_PLATE_ASPECT)), abs(math.log(aspect / MOTORCYCLE_PLATE_ASPECT)))
+    else:
+        aspect_error = float('inf')
+
+    min_sharpness = getattr(settings, 'CROP_MIN_SHARPNESS', 30.0)
+    min_width = getattr(settings, 'CROP_MIN_WIDTH', 40)
+    min_height = getattr(settings, 'CROP_MIN_HEIGHT', 12)
+    max_aspect_error = getattr(settings, 'CROP_MAX_ASPECT_ERROR', 0.5)
+
+    reason = None
+    if width < min_width or height < min_height:
+        reason = 'size'
+    elif aspect_error > max_aspect_error:
+        reason = 'aspect'
+    elif sharpness < min_sharpness:
+        reason = 'blur'
+
+    sharpness_score = min(1.0, sharpness / getattr(settings, 'CROP_SHARPNESS_REFERENCE', 300.0))
+    size_score = min(1.0, width / getattr(settings, 'CROP_WIDTH_REFERENCE', 160))
+    aspect_score = max(0.0, 1.0 - aspect_error / max_aspect_error) if max_aspect_error > 0 else 0.0
+    score = round(0.5 * sharpness_score + 0.3 * size_score + 0.2 * aspect_score, 4)
+
+    metrics.record_timing('crop_quality', 'assess', time.perf_counter() - start)
+
+    return CropQuality(score, sharpness, width, height, aspect_error, reason is None, reason)
+
+
+def crop_quality_enabled() -> bool:
+    return getattr(settings, 'CROP_QUALITY_GATE_ENABLED', True)
+
+
+def record_skipped_crop(quality: CropQuality):
+    """Conta um recorte descartado antes do OCR (por motivo)"""
+    metrics.increment('crop_quality', 'skipped')
+    metrics.increment('crop_quality', f'skipped_{quality.reason}')
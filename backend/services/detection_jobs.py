@@ -0,0 +1,162 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Verdadeiro nos processos do backend 'process', que não recebem os sinais do servidor web
+_in_worker_process = False
+
+
+def _worker_initializer():
+    """Prepara o Django nos processos de trabalho (iniciados com 'spawn')"""
+    global _in_worker_process
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projeto_veicular_back.settings')
+    _in_worker_process = True
+
+    import django
+    django.setup()
+
+
+def get_executor():
+    """
+    Retorna o pool local de workers das detecções assíncronas, criado sob demanda.
+
+    settings.DETECTION_JOB_BACKEND escolhe entre 'thread' (threads no próprio processo,
+    compartilhando o pool de modelos, o índice de placas conhecidas e o agendador) e
+    'process' (processos separados, cada um com seus modelos carregados). Nenhum broker
+    externo é necessário: o estado dos jobs fica na própria PlateDetection (status/progress).
+    Ao iniciar o pool, as detecções abandonadas por um processo anterior são encerradas.
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            recover_stale_detections()
+            workers = max(1, int(getattr(settings, 'DETECTION_JOB_WORKERS', 2)))
+
+            if getattr(settings, 'DETECTION_JOB_BACKEND', 'thread') == 'thread':
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='detection-job')
+            else:
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_worker_initializer
+                )
+            logger.info(f"Pool de detecções assíncronas iniciado com {workers} worker(s)")
+
+        return _executor
+
+
+def recover_stale_detections():
+    """
+    Marca como 'error' as detecções que continuam 'pending'/'processing' há mais de
+    settings.DETECTION_JOB_STALE_SECONDS (o processo que as executava foi encerrado)
+    """
+    from backend.models import PlateDetection
+
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'DETECTION_JOB_STALE_SECONDS', 3600))
+    try:
+        recovered = PlateDetection.objects.filter(
+            status__in=['pending', 'processing'], created_at__lt=cutoff
+        ).update(
+            status='error',
+            error_message='Processamento interrompido (o servidor foi reiniciado)',
+            processed_at=timezone.now()
+        )
+    except Exception as e:
+        logger.error(f"Erro ao encerrar detecções abandonadas: {e}")
+        return
+
+    if recovered:
+        logger.warning(f"{recovered} detecção(ões) abandonada(s) marcada(s) como erro")
+
+
+def notify_detection_update(detection, plates=None):
+    """Publica o estado da detecção no grupo 'detection_<id>' do channel layer"""
+    try:
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+
+        async_to_sync(channel_layer.group_send)(f"detection_{detection.id}", {
+            'type': 'detection.update',
+            'detection_id': str(detection.id),
+            'status': detection.status,
+            'progress': detection.progress,
+            'plates': plates or [],
+            'error_message': detection.error_message
+        })
+    except Exception as e:
+        logger.debug(f"Não foi possível publicar a atualização da detecção {detection.id}: {e}")
+
+
+def run_detection_job(detection_id, image_bytes: bytes):
+    """
+    Executa a detecção de uma PlateDetection pendente (dentro de um worker)
+
+    Args:
+        detection_id: ID da PlateDetection
+        image_bytes: Conteúdo da imagem enviada
+    """
+    from backend.models import PlateDetection
+    from .detection_pipeline import finish_detection, process_detection, serialize_plate_result
+    from .inference_scheduler import PRIORITY_BATCH, inference_scheduler
+    from .known_plate_index import known_plate_index
+    from .model_registry import model_registry
+
+    try:
+        detection = PlateDetection.objects.get(pk=detection_id)
+    except PlateDetection.DoesNotExist:
+        logger.warning(f"Detecção {detection_id} removida antes do processamento")
+        close_old_connections()
+        return
+
+    def report_progress(progress):
+        detection.progress = progress
+        PlateDetection.objects.filter(pk=detection.id).update(progress=progress)
+        notify_detection_update(detection)
+
+    try:
+        if _in_worker_process:
+            # Os sinais de KnownPlate só atualizam o índice do servidor web
+            known_plate_index.refresh_if_stale()
+
+        detection.status = 'processing'
+        detection.save(update_fields=['status'])
+        report_progress(5)
+
+        # Sem limite de admissão nem de espera (a fila é a do pool de workers), atrás do stream e dos uploads síncronos
+        with inference_scheduler.priority(PRIORITY_BATCH), model_registry.borrow(timeout=None) as detector_service:
+            plate_results = process_detection(detection, detector_service, image_bytes, report_progress)
+
+        finish_detection(detection, 'completed')
+        notify_detection_update(detection, [serialize_plate_result(result) for result in plate_results])
+
+    except Exception as e:
+        logger.error(f"Erro ao processar detecção assíncrona {detection_id}: {e}", exc_info=True)
+        finish_detection(detection, 'error', str(e))
+        notify_detection_update(detection)
+
+    finally:
+        close_old_connections()
+
+
+def enqueue_detection(detection, image_bytes: bytes):
+    """Envia a detecção para o pool de workers após o commit da transação atual"""
+    transaction.on_commit(lambda: get_executor().submit(run_detection_job, detection.id, image_bytes))
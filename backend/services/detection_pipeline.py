@@ -0,0 +1,488 @@
+import logging
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .crop_quality import assess_crop, crop_quality_enabled, record_skipped_crop
+from .image_storage import schedule_original_image_persist
+from .inference_scheduler import STAGE_OCR, inference_scheduler
+from .known_plate_index import known_plate_index
+from .model_registry import model_registry
+from .pipeline_profiles import get_profile
+from .plate_detector import save_cropped_plate, validate_plate_text
+
+
+logger = logging.getLogger(__name__)
+
+# Similaridade mínima (fuzz.ratio) para associar uma placa enviada por upload a uma KnownPlate
+UPLOAD_SIMILARITY_THRESHOLD = 50
+
+
+def match_known_plate(plate_text: str, match_threshold: int) -> Tuple[Optional[object], int, str]:
+    """
+    Procura a KnownPlate mais parecida com o texto lido (índice em memória)
+
+    Returns:
+        Tupla (KnownPlate ou None, similaridade, texto validado usado na busca)
+    """
+    if not plate_text:
+        return None, 0, ''
+
+    # Validar e formatar o texto da placa para a consulta
+    _, query_plate_text, _ = validate_plate_text(plate_text)
+    if not query_plate_text:
+        return None, 0, ''
+
+    known_plate, similarity = known_plate_index.best_match(query_plate_text, match_threshold)
+    return known_plate, similarity, query_plate_text
+
+
+def build_detected_plates(detection, detected_plates_yolo: List[Dict], plates_ocr_results: List[Dict],
+                          match_threshold: int = UPLOAD_SIMILARITY_THRESHOLD) -> List[Dict]:
+    """
+    Associa cada placa lida a uma KnownPlate (por similaridade) e monta as DetectedPlate, sem gravá-las
+
+    Args:
+        detection: PlateDetection à qual as placas pertencem
+        detected_plates_yolo: Placas retornadas pelo YOLO ('cropped_image', 'bounding_box', 'confidence')
+        plates_ocr_results: Resultados do OCR, um por placa
+        match_threshold: Similaridade mínima (0-100) para associar a uma KnownPlate
+
+    Returns:
+        Lista de dicionários {'detected_plate', 'known_plate', 'similarity'}
+    """
+    from backend.models import DetectedPlate
+
+    saved_plates = []
+
+    for plate_data_from_yolo, ocr_results in zip(detected_plates_yolo, plates_ocr_results):
+        plate_text_from_ocr = ocr_results.get('best_text', '').strip().upper()
+
+        # Só há busca por similaridade se o OCR retornou algum texto
+        known_plate_association, current_highest_similarity, query_plate_text = match_known_plate(
+            plate_text_from_ocr, match_threshold
+        )
+
+        if query_plate_text:
+            if known_plate_association:
+                logger.info(
+                    f"Para PlateDetection ID {detection.id}: Placa OCR '{plate_text_from_ocr}' (processada como '{query_plate_text}') "
+                    f"será associada à KnownPlate '{known_plate_association.plate_number}' "
+                    f"(similaridade: {current_highest_similarity}%)."
+                )
+            else:
+                logger.info(
+                    f"Para PlateDetection ID {detection.id}: Nenhuma KnownPlate com similaridade de ao menos {match_threshold}% "
+                    f"para OCR '{plate_text_from_ocr}' (processada como '{query_plate_text}'). Será salva sem associação explícita."
+                )
+
+        # Salvar imagem cortada
+        filename = f"plate_{detection.id}_{uuid.uuid4().hex[:8]}.jpg"
+        cropped_file_django_field = save_cropped_plate(
+            plate_data_from_yolo['cropped_image'], filename
+        )
+
+        # Criar registro da placa detectada.
+        # 'known_plate' será preenchido com 'known_plate_association' (que pode ser None).
+        detected_plate_object = DetectedPlate(
+            detection=detection,
+            plate_number_detected=plate_text_from_ocr,
+            known_plate=known_plate_association,  # Associação aqui (pode ser None)
+            bounding_box=plate_data_from_yolo['bounding_box'],
+            yolo_confidence=plate_data_from_yolo['confidence'],
+            cropped_image=cropped_file_django_field,
+            best_ocr_text=ocr_results.get('best_text', ''),
+            best_ocr_confidence=ocr_results.get('best_confidence'),
+            ocr_results=ocr_results.get('all_results', {}),  # Usar .get para evitar KeyError
+            quality_score=plate_data_from_yolo.get('quality_score')
+        )
+
+        saved_plates.append({
+            'detected_plate': detected_plate_object,
+            'known_plate': known_plate_association,
+            'similarity': current_highest_similarity
+        })
+
+    return saved_plates
+
+
+def read_plates(detector_service, cropped_plates: List, profile=None) -> List[Dict]:
+    """
+    OCR de vários recortes conforme o perfil do pipeline: motores do OCR rápido ('fast')
+    ou variantes de pré-processamento, cascata e motores extras ('full')
+
+    Returns:
+        Resultados do OCR ('best_text', 'best_confidence', 'all_results'), um por recorte
+    """
+    # Execuções simultâneas do OCR limitadas pelo agendador (por classe de prioridade)
+    with inference_scheduler.slot(STAGE_OCR):
+        return _read_plates(detector_service, cropped_plates, profile)
+
+
+def _read_plates(detector_service, cropped_plates: List, profile) -> List[Dict]:
+    if profile is None:
+        return detector_service.process_plates_ocr(cropped_plates)
+
+    if profile.ocr == 'fast':
+        plates_results = []
+        for cropped_plate in cropped_plates:
+            fast_result = detector_service.process_plate_ocr_fast(cropped_plate, profile.ocr_engines)
+            plates_results.append({
+                'best_text': fast_result['best_text'],
+                'best_confidence': fast_result['best_confidence'],
+                'all_results': {'fast_ocr_result': fast_result}
+            })
+        return plates_results
+
+    return detector_service.process_plates_ocr(
+        cropped_plates, cascade=profile.cascade, methods=profile.preprocessing_methods, engines=profile.ocr_engines
+    )
+
+
+def ocr_plates_with_quality_gate(detector_service, detected_plates_yolo: List[Dict], profile=None) -> List[Dict]:
+    """
+    OCR em lote apenas dos recortes com qualidade suficiente (nitidez, tamanho e proporção).
+    O score de cada recorte é gravado em plate_data['quality_score']; os recortes
+    rejeitados recebem um resultado vazio e são contados nas métricas.
+
+    O descarte só vale para perfis com quality_gate (frames de vídeo, em que o próximo
+    frame pode trazer a placa); uploads e lotes têm uma única chance e leem todos os recortes.
+
+    Args:
+        detector_service: PlateDetectorService emprestado do pool
+        detected_plates_yolo: Placas retornadas pelo YOLO ('cropped_image', ...)
+        profile: PipelineProfile (ver read_plates)
+
+    Returns:
+        Resultados do OCR, um por placa (na mesma ordem)
+    """
+    gate_enabled = profile is not None and profile.quality_gate and crop_quality_enabled()
+    accepted_indexes = []
+
+    for idx, plate_data in enumerate(detected_plates_yolo):
+        quality = assess_crop(plate_data['cropped_image'])
+        plate_data['quality_score'] = quality.score
+
+        if quality.acceptable or not gate_enabled:
+            accepted_indexes.append(idx)
+        else:
+            record_skipped_crop(quality)
+            logger.debug(
+                f"Recorte {idx} ignorado antes do OCR ({quality.reason}): score={quality.score}, "
+                f"nitidez={quality.sharpness:.1f}, tamanho={quality.width}x{quality.height}"
+            )
+
+    plates_ocr_results = [
+        {'best_text': '', 'best_confidence': 0.0, 'all_results': []} for _ in detected_plates_yolo
+    ]
+    if accepted_indexes:
+        accepted_results = read_plates(
+            detector_service, [detected_plates_yolo[idx]['cropped_image'] for idx in accepted_indexes], profile
+        )
+        for idx, ocr_results in zip(accepted_indexes, accepted_results):
+            plates_ocr_results[idx] = ocr_results
+
+    return plates_ocr_results
+
+
+def save_detected_plates(detection, detected_plates_yolo: List[Dict], plates_ocr_results: List[Dict],
+                         match_threshold: int = UPLOAD_SIMILARITY_THRESHOLD) -> List[Dict]:
+    """
+    Associa cada placa lida a uma KnownPlate (por similaridade) e grava as DetectedPlate
+
+    Returns:
+        Lista de dicionários {'detected_plate', 'known_plate', 'similarity'}
+    """
+    saved_plates = build_detected_plates(
+        detection, detected_plates_yolo, plates_ocr_results, match_threshold
+    )
+
+    for plate_result in saved_plates:
+        plate_result['detected_plate'].save()
+
+    return saved_plates
+
+
+def process_detection(detection, detector_service, image_bytes: bytes,
+                      progress_callback: Optional[Callable[[int], None]] = None, profile=None) -> List[Dict]:
+    """
+    Pipeline completo de uma imagem: YOLO, OCR de todas as placas em lote,
+    associação com placas conhecidas e gravação das DetectedPlate
+
+    Args:
+        detection: PlateDetection em processamento
+        detector_service: PlateDetectorService emprestado do pool
+        image_bytes: Conteúdo da imagem
+        progress_callback: Função chamada com o progresso (0-100)
+        profile: PipelineProfile (padrão: o gravado em detection.profile ou o padrão dos uploads)
+
+    Returns:
+        Lista de dicionários {'detected_plate', 'known_plate', 'similarity'}
+    """
+    if profile is None:
+        profile = get_profile(detection.profile, 'upload')
+
+    def report(progress):
+        if progress_callback:
+            progress_callback(progress)
+
+    # 'detected_plates_yolo' é uma lista de dicts do serviço, cada um com:
+    # 'cropped_image' (np.array), 'bounding_box', 'confidence'
+    detected_plates_yolo = detector_service.detect_plates_from_bytes(image_bytes, profile)
+    report(30)
+
+    if not detected_plates_yolo:
+        return []
+
+    # OCR das placas com boa qualidade, em um único lote
+    plates_ocr_results = ocr_plates_with_quality_gate(detector_service, detected_plates_yolo, profile)
+    report(80)
+
+    return save_detected_plates(
+        detection, detected_plates_yolo, plates_ocr_results, profile.match_threshold
+    )
+
+
+def process_detection_batch(images: List[Tuple[str, object]], user=None,
+                            chunk_size: int = None, profile=None) -> List[Dict]:
+    """
+    Pipeline de várias imagens: YOLO em lotes, OCR de todas as placas de cada bloco
+    de imagens em um único lote e gravação com bulk_create
+
+    As imagens são processadas em blocos de settings.DETECTION_BATCH_CHUNK_SIZE para
+    que as imagens decodificadas e os recortes não se acumulem em memória. Cada bloco
+    empresta o detector do pool separadamente: entre um bloco e outro, o stream e os
+    uploads (classes de prioridade mais altas) passam na frente do lote.
+
+    Args:
+        images: Lista de tuplas (nome do arquivo, conteúdo ou função que o lê); as funções
+                são chamadas apenas quando o bloco da imagem é processado
+        user: Usuário dono das detecções
+        chunk_size: Imagens por bloco
+        profile: PipelineProfile (padrão: o dos lotes em settings.PIPELINE_PROFILE_DEFAULTS)
+
+    Returns:
+        Lista, na ordem de entrada, de dicionários {'filename', 'detection', 'plates', 'error'}
+
+    Raises:
+        DetectorUnavailable: Nenhuma instância liberada para o primeiro bloco (nada foi gravado)
+    """
+    if profile is None:
+        profile = get_profile(context='batch')
+    if chunk_size is None:
+        chunk_size = max(1, int(getattr(settings, 'DETECTION_BATCH_CHUNK_SIZE', 64)))
+
+    results = []
+    for start in range(0, len(images), chunk_size):
+        # Só o primeiro bloco respeita o timeout do pool; depois dele, o lote já começou a ser
+        # gravado e os blocos seguintes aguardam a vez atrás das classes mais urgentes
+        borrow = model_registry.borrow() if start == 0 else model_registry.borrow(timeout=None)
+        with borrow as detector_service:
+            results.extend(_process_detection_chunk(images[start:start + chunk_size], detector_service, user, profile))
+
+    return results
+
+
+def _process_detection_chunk(images: List[Tuple[str, object]], detector_service, user, profile) -> List[Dict]:
+    from backend.models import PlateDetection
+
+    results = []
+    decoded = []
+
+    for filename, source in images:
+        result = {'filename': filename, 'detection': None, 'plates': [], 'error': None}
+        results.append(result)
+
+        try:
+            data = source() if callable(source) else source
+        except Exception as e:  # Membro do ZIP corrompido, arquivo temporário removido...
+            result['error'] = f'Erro ao ler o arquivo: {e}'
+            continue
+
+        try:
+            image, scale = detector_service.decode_image(data)
+        except Exception as e:  # ValueError para imagens inválidas; erros do OpenCV afetam só esta imagem
+            result['error'] = str(e)
+            continue
+
+        result['detection'] = PlateDetection(user=user, status='processing', profile=profile.name)
+        decoded.append((result, data, image, scale))
+
+    if not decoded:
+        return results
+
+    with transaction.atomic():
+        PlateDetection.objects.bulk_create([result['detection'] for result, _, _, _ in decoded])
+
+        for result, data, _, _ in decoded:
+            schedule_original_image_persist(result['detection'].id, result['filename'], data)
+
+    try:
+        _detect_chunk_plates(decoded, detector_service, profile)
+    except Exception as e:
+        # As detecções do bloco já estão gravadas: não podem ficar 'processing' para sempre
+        logger.error(f"Erro ao processar bloco de {len(decoded)} imagem(ns) do lote: {e}", exc_info=True)
+        processed_at = timezone.now()
+        detections = []
+        for result, _, _, _ in decoded:
+            detection = result['detection']
+            detection.status = 'error'
+            detection.error_message = str(e)
+            detection.processed_at = processed_at
+            detections.append(detection)
+            result['plates'] = []
+            result['error'] = f'Erro ao processar imagem: {e}'
+        PlateDetection.objects.bulk_update(detections, ['status', 'error_message', 'processed_at'])
+
+    return results
+
+
+def _detect_chunk_plates(decoded: List[Tuple], detector_service, profile):
+    """YOLO, OCR e gravação das placas das imagens decodificadas de um bloco"""
+    from backend.models import DetectedPlate, PlateDetection
+
+    detected_plates_per_image = detector_service.detect_plates_batch(
+        [image for _, _, image, _ in decoded],
+        [scale for _, _, _, scale in decoded],
+        profile=profile
+    )
+
+    # OCR de todos os recortes do bloco (com qualidade suficiente) em um único lote
+    all_plates = [
+        plate_data
+        for detected_plates_yolo in detected_plates_per_image
+        for plate_data in detected_plates_yolo
+    ]
+    all_ocr_results = ocr_plates_with_quality_gate(detector_service, all_plates, profile)
+
+    offset = 0
+    for (result, _, _, _), detected_plates_yolo in zip(decoded, detected_plates_per_image):
+        plates_ocr_results = all_ocr_results[offset:offset + len(detected_plates_yolo)]
+        offset += len(detected_plates_yolo)
+
+        result['plates'] = build_detected_plates(
+            result['detection'], detected_plates_yolo, plates_ocr_results, profile.match_threshold
+        )
+
+    processed_at = timezone.now()
+    detections = []
+    for result, _, _, _ in decoded:
+        detection = result['detection']
+        detection.status = 'completed'
+        detection.processed_at = processed_at
+        detection.progress = 100
+        detections.append(detection)
+
+    with transaction.atomic():
+        DetectedPlate.objects.bulk_create([
+            plate_result['detected_plate'] for result, _, _, _ in decoded for plate_result in result['plates']
+        ])
+        # Apenas estes campos: a imagem original pode estar sendo gravada em paralelo
+        PlateDetection.objects.bulk_update(detections, ['status', 'processed_at', 'progress'])
+
+
+def save_stream_detection(frame, plates: List[Dict], user=None, profile=None) -> Dict:
+    """
+    Grava uma PlateDetection com as placas lidas no stream de vídeo, sem reprocessar o frame
+
+    Args:
+        frame: Frame BGR em que as placas foram detectadas
+        plates: Placas do consumer ('cropped_image', 'bounding_box', 'confidence',
+                'text', 'ocr_confidence')
+        user: Usuário dono da detecção
+        profile: Perfil do pipeline usado no stream (padrão: o do contexto 'stream')
+
+    Returns:
+        Dicionário {'detection', 'plates'} com as placas no formato de serialize_plate_result
+    """
+    from backend.models import DetectedPlate, PlateDetection
+
+    if profile is None:
+        profile = get_profile(context='stream')
+
+    with transaction.atomic():
+        detection = PlateDetection.objects.create(
+            user=user,
+            profile=profile.name,
+            status='completed',
+            processed_at=timezone.now(),
+            progress=100
+        )
+
+        success, buffer = cv2.imencode('.jpg', frame)
+        if success:
+            filename = f"frame_{timezone.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+            schedule_original_image_persist(detection.id, filename, buffer.tobytes())
+
+        plates_ocr_results = [
+            {
+                'best_text': plate['text'],
+                'best_confidence': plate.get('ocr_confidence'),
+                'all_results': {'fast_ocr_result': {
+                    'best_text': plate['text'], 'best_confidence': plate.get('ocr_confidence')
+                }}
+            }
+            for plate in plates
+        ]
+
+        plate_results = build_detected_plates(
+            detection, plates, plates_ocr_results, profile.match_threshold
+        )
+        DetectedPlate.objects.bulk_create([plate_result['detected_plate'] for plate_result in plate_results])
+
+    return {
+        'detection': detection,
+        'plates': [serialize_plate_result(plate_result) for plate_result in plate_results]
+    }
+
+
+def finish_detection(detection, status: str, error_message: str = None):
+    """Registra o status final de uma PlateDetection"""
+    detection.status = status
+    detection.processed_at = timezone.now()
+    detection.progress = 100
+    update_fields = ['status', 'processed_at', 'progress']
+
+    if error_message is not None:
+        detection.error_message = error_message
+        update_fields.append('error_message')
+
+    # update_fields: a imagem original pode estar sendo gravada em paralelo
+    detection.save(update_fields=update_fields)
+
+
+def serialize_plate_result(plate_result: Dict, build_absolute_uri: Callable[[str], str] = None) -> Dict:
+    """
+    Monta a representação de uma placa processada usada nas respostas da API
+
+    Args:
+        plate_result: Item retornado por process_detection
+        build_absolute_uri: request.build_absolute_uri (sem requisição, a URL fica relativa)
+    """
+    detected_plate_object = plate_result['detected_plate']
+    known_plate_association = plate_result['known_plate']
+
+    cropped_image_url = None
+    if detected_plate_object.cropped_image:
+        cropped_image_url = detected_plate_object.cropped_image.url
+        if build_absolute_uri:
+            cropped_image_url = build_absolute_uri(cropped_image_url)
+
+    return {
+        'id': detected_plate_object.id,
+        'plate_number_detected': detected_plate_object.plate_number_detected,
+        # Adicionar informação sobre a placa conhecida associada e a similaridade
+        'known_plate_associated_number': known_plate_association.plate_number if known_plate_association else None,
+        # Score da associação feita
+        'association_similarity_score': plate_result['similarity'] if known_plate_association else None,
+        'is_regularized_status': known_plate_association.is_regularized if known_plate_association else None,
+        'bounding_box': detected_plate_object.bounding_box,
+        'yolo_confidence': detected_plate_object.yolo_confidence,
+        'cropped_image_url': cropped_image_url,
+        'best_ocr_text': detected_plate_object.best_ocr_text,  # Pode ser igual a plate_number_detected
+        'best_ocr_confidence': detected_plate_object.best_ocr_confidence
+    }
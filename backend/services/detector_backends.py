@@ -0,0 +1,246 @@
+import logging
+import os
+import threading
+from typing import Dict, List, NamedTuple
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Deslocamento por classe no NMS (o mesmo do ultralytics: classes diferentes nunca se suprimem)
+NMS_CLASS_OFFSET = 7680
+
+# Exportação/quantização do ONNX feita uma vez por processo, mesmo com várias instâncias no pool
+_export_lock = threading.Lock()
+
+
+class Detections(NamedTuple):
+    xyxy: np.ndarray  # (N, 4) float32, coordenadas da imagem de entrada (letterbox)
+    conf: np.ndarray  # (N,) float32
+
+
+class UltralyticsBackend:
+    """Inferência com o modelo PyTorch do ultralytics (padrão e fallback)"""
+
+    name = 'ultralytics'
+
+    def __init__(self, model_path: str, options: Dict):
+        from ultralytics import YOLO
+
+        self.options = options
+        self.model = YOLO(model_path)
+
+    def predict(self, images: List[np.ndarray], options: Dict = None) -> List[Detections]:
+        """
+        Args:
+            images: Imagens BGR já no tamanho de entrada (letterbox imgsz x imgsz)
+            options: Parâmetros que substituem os do backend nesta chamada (perfil do pipeline)
+
+        Returns:
+            Caixas e confianças de cada imagem, na mesma ordem
+        """
+        results = self.model(images, **dict(self.options, **(options or {})))
+        detections = []
+        for result in results:
+            # Uma única transferência por resultado (em vez de box.xyxy[0].cpu() por caixa)
+            detections.append(Detections(
+                result.boxes.xyxy.cpu().numpy().astype(np.float32),
+                result.boxes.conf.cpu().numpy().astype(np.float32)
+            ))
+        return detections
+
+
+class OnnxRuntimeBackend:
+    """
+    Inferência com ONNX Runtime (CPU, ou OpenVINO via settings.ONNX_PROVIDERS).
+
+    O modelo .pt é exportado para ONNX uma única vez (com batch e tamanho dinâmicos) e o
+    arquivo fica ao lado dos pesos; ele é refeito quando o .pt é mais novo. Com
+    settings.ONNX_QUANTIZE, uma versão INT8 (quantização dinâmica dos pesos) também é
+    gravada ao lado e usada. A saída do modelo ((B, 4 + classes, N) do YOLOv8/11) passa
+    pelo mesmo filtro de confiança e NMS por classe do ultralytics, de modo que as caixas
+    são equivalentes às do UltralyticsBackend.
+    """
+
+    name = 'onnxruntime'
+
+    def __init__(self, model_path: str, options: Dict):
+        import onnxruntime as ort
+
+        self.options = options
+        onnx_path = self.export_onnx(model_path)
+        if getattr(settings, 'ONNX_QUANTIZE', False):
+            onnx_path = self.quantize(onnx_path)
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        intra_op_threads = getattr(settings, 'ONNX_INTRA_OP_THREADS', 0)
+        if intra_op_threads:
+            session_options.intra_op_num_threads = intra_op_threads
+
+        available = ort.get_available_providers()
+        providers = [provider for provider in getattr(settings, 'ONNX_PROVIDERS', ['CPUExecutionProvider'])
+                     if provider in available] or ['CPUExecutionProvider']
+
+        self.session = ort.InferenceSession(onnx_path, session_options, providers=providers)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Modelos exportados sem batch dinâmico aceitam uma imagem por vez
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        logger.info(f"✓ Modelo ONNX carregado: {onnx_path} (providers: {', '.join(self.session.get_providers())})")
+
+    @staticmethod
+    def export_onnx(model_path: str) -> str:
+        """Exporta os pesos para ONNX ao lado do .pt, se ainda não houver uma exportação atualizada"""
+        onnx_path = os.path.splitext(model_path)[0] + '.onnx'
+
+        with _export_lock:
+            if os.path.exists(onnx_path) and os.path.getmtime(onnx_path) >= os.path.getmtime(model_path):
+                return onnx_path
+
+            from ultralytics import YOLO
+
+            logger.info(f"Exportando {model_path} para ONNX...")
+            exported_path = YOLO(model_path).export(format='onnx', dynamic=True)
+            if os.path.abspath(exported_path) != os.path.abspath(onnx_path):
+                os.replace(exported_path, onnx_path)
+            logger.info(f"✓ Modelo exportado: {onnx_path}")
+
+        return onnx_path
+
+    @staticmethod
+    def quantize(onnx_path: str) -> str:
+        """Versão INT8 (quantização dinâmica dos pesos) do modelo ONNX, gravada ao lado"""
+        quantized_path = os.path.splitext(onnx_path)[0] + '.int8.onnx'
+
+        with _export_lock:
+            if os.path.exists(quantized_path) and os.path.getmtime(quantized_path) >= os.path.getmtime(onnx_path):
+                return quantized_path
+
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info(f"Quantizando {onnx_path} para INT8...")
+            temporary_path = quantized_path + '.tmp'
+            quantize_dynamic(onnx_path, temporary_path, weight_type=QuantType.QUInt8)
+            os.replace(temporary_path, quantized_path)
+
+        return quantized_path
+
+    def predict(self, images: List[np.ndarray], options: Dict = None) -> List[Detections]:
+        """
+        Args:
+            images: Imagens BGR já no tamanho de entrada (letterbox imgsz x imgsz)
+            options: Parâmetros que substituem os do backend nesta chamada (perfil do pipeline)
+
+        Returns:
+            Caixas e confianças de cada imagem, na mesma ordem
+        """
+        if not images:
+            return []
+
+        # BGR uint8 HWC -> RGB float32 NCHW em [0, 1], como no pré-processamento do ultralytics
+        batch = np.stack([cv2.cvtColor(image, cv2.COLOR_BGR2RGB) for image in images])
+        batch = np.ascontiguousarray(batch.transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: batch[idx:idx + 1]})[0] for idx in range(len(images))
+            ])
+
+        height, width = images[0].shape[:2]
+        options = dict(self.options, **(options or {}))
+        return [self._postprocess(output, width, height, options) for output in outputs]
+
+    def _postprocess(self, output: np.ndarray, width: int, height: int, options: Dict) -> Detections:
+        """Filtro de confiança + NMS por classe sobre a saída (4 + classes, N) de uma imagem"""
+        predictions = output.T  # (N, 4 + classes)
+        class_scores = predictions[:, 4:]
+        classes = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_scores)), classes]
+
+        keep = scores > options['conf']
+        if not np.any(keep):
+            return Detections(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32))
+
+        predictions, scores, classes = predictions[keep], scores[keep], classes[keep]
+
+        # (cx, cy, w, h) -> (x1, y1, x2, y2)
+        boxes = np.empty((len(predictions), 4), dtype=np.float32)
+        half_width, half_height = predictions[:, 2] / 2, predictions[:, 3] / 2
+        boxes[:, 0] = predictions[:, 0] - half_width
+        boxes[:, 1] = predictions[:, 1] - half_height
+        boxes[:, 2] = predictions[:, 0] + half_width
+        boxes[:, 3] = predictions[:, 1] + half_height
+
+        kept = non_max_suppression(boxes + (classes[:, None] * NMS_CLASS_OFFSET), scores, options['iou'])
+        kept = kept[:options['max_det']]
+
+        boxes = boxes[kept]
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+        return Detections(boxes, scores[kept].astype(np.float32))
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    NMS guloso (mesma regra do torchvision.ops.nms): mantém a caixa de maior score e
+    descarta as que se sobrepõem a ela com IoU acima do limiar
+
+    Returns:
+        Índices das caixas mantidas, em ordem decrescente de score
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+
+    kept = []
+    while order.size:
+        best = order[0]
+        kept.append(best)
+        rest = order[1:]
+
+        inter_width = np.maximum(0.0, np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]))
+        inter_height = np.maximum(0.0, np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]))
+        intersection = inter_width * inter_height
+        iou = intersection / (areas[best] + areas[rest] - intersection + 1e-9)
+
+        order = rest[iou <= iou_threshold]
+
+    return np.array(kept, dtype=int)
+
+
+DETECTOR_BACKENDS = {
+    UltralyticsBackend.name: UltralyticsBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+}
+
+
+def create_detector_backend(model_path: str, options: Dict):
+    """
+    Cria o backend de detecção definido em settings.PLATE_DETECTOR_BACKEND
+    ('ultralytics' ou 'onnxruntime'). Se o backend escolhido não puder ser carregado
+    (dependência ausente, falha na exportação), usa o ultralytics.
+
+    Args:
+        model_path: Caminho dos pesos .pt (settings.YOLO_MODEL_PATH)
+        options: Parâmetros de inferência (conf, iou, imgsz, max_det)
+    """
+    backend_name = getattr(settings, 'PLATE_DETECTOR_BACKEND', UltralyticsBackend.name)
+    backend_class = DETECTOR_BACKENDS.get(backend_name)
+
+    if backend_class is None:
+        logger.warning(f"Backend de detecção desconhecido '{backend_name}'. Usando '{UltralyticsBackend.name}'.")
+        backend_class = UltralyticsBackend
+
+    if backend_class is not UltralyticsBackend:
+        try:
+            return backend_class(model_path, options)
+        except Exception as e:
+            logger.warning(f"Não foi possível carregar o backend '{backend_name}' ({e}). Usando '{UltralyticsBackend.name}'.")
+
+    return UltralyticsBackend(model_path, options)
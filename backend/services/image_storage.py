@@ -0,0 +1,58 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+# Um único worker: a gravação das imagens originais sai do caminho da requisição
+_persist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='persist-original')
+
+
+def persist_original_image(detection_id, filename: str, data: bytes):
+    """
+    Grava a imagem original de uma PlateDetection no storage e atualiza o registro
+
+    Args:
+        detection_id: ID da PlateDetection
+        filename: Nome original do arquivo enviado
+        data: Conteúdo da imagem
+    """
+    from backend.models import PlateDetection
+
+    try:
+        detection = PlateDetection.objects.only('id', 'original_image').get(pk=detection_id)
+        detection.original_image.save(filename, ContentFile(data), save=False)
+        # update() evita sobrescrever status/processed_at alterados pelo processamento
+        PlateDetection.objects.filter(pk=detection_id).update(original_image=detection.original_image.name)
+    except PlateDetection.DoesNotExist:
+        logger.warning(f"PlateDetection {detection_id} removida antes de salvar a imagem original")
+    except Exception as e:
+        logger.error(f"Erro ao salvar a imagem original da detecção {detection_id}: {e}", exc_info=True)
+
+
+def _persist_in_background(detection_id, filename: str, data: bytes):
+    try:
+        persist_original_image(detection_id, filename, data)
+    finally:
+        close_old_connections()
+
+
+def schedule_original_image_persist(detection_id, filename: str, data: bytes):
+    """
+    Agenda a gravação da imagem original conforme settings.PERSIST_ORIGINAL_IMAGES
+    ('async', 'sync' ou 'off'). No modo 'async' a gravação ocorre após o commit,
+    em uma thread separada.
+    """
+    mode = getattr(settings, 'PERSIST_ORIGINAL_IMAGES', 'async')
+
+    if mode == 'off':
+        return
+    if mode == 'sync':
+        persist_original_image(detection_id, filename, data)
+        return
+
+    transaction.on_commit(lambda: _persist_executor.submit(_persist_in_background, detection_id, filename, data))
@@ -0,0 +1,200 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict
+
+from django.conf import settings
+
+from .metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Classes de prioridade, da mais urgente para a menos urgente
+PRIORITY_LIVE = 'live'  # Stream de vídeo e process_frame
+PRIORITY_INTERACTIVE = 'interactive'  # Uploads com o usuário aguardando a resposta
+PRIORITY_BATCH = 'batch'  # Lotes e detecções assíncronas
+PRIORITY_CLASSES = (PRIORITY_LIVE, PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+STAGE_YOLO = 'yolo'
+STAGE_OCR = 'ocr'
+
+# Peso da última duração na média móvel usada para o Retry-After
+DURATION_SMOOTHING = 0.2
+
+
+class InferenceQueueFull(Exception):
+    """A fila da classe de prioridade está cheia; o cliente deve tentar de novo depois de retry_after segundos"""
+
+    def __init__(self, priority: str, retry_after: int):
+        super().__init__(f"Fila de inferência '{priority}' cheia. Tente novamente em {retry_after}s.")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class PrioritySlots:
+    """
+    Limite de execuções simultâneas de uma etapa (YOLO, OCR ou as instâncias do pool de
+    modelos). Quando um slot é liberado, ele vai para o pedido mais antigo da classe mais
+    urgente que estiver aguardando.
+    """
+
+    def __init__(self, stage: str, slots: int):
+        self.stage = stage
+        self.slots = max(1, slots)
+        self.active = 0
+        self._condition = threading.Condition()
+        self._waiting = {priority: deque() for priority in PRIORITY_CLASSES}
+
+    def _next_ticket(self):
+        for priority in PRIORITY_CLASSES:
+            if self._waiting[priority]:
+                return self._waiting[priority][0]
+        return None
+
+    def _report(self, priority: str):
+        metrics.set_gauge('inference_queue', f'{self.stage}_{priority}', len(self._waiting[priority]))
+        metrics.set_gauge('inference_queue', f'{self.stage}_active', self.active)
+
+    def acquire(self, priority: str, timeout: float = None):
+        """
+        Ocupa um slot, aguardando a vez da classe de prioridade
+
+        Raises:
+            TimeoutError: Nenhum slot liberado para este pedido dentro de timeout segundos
+        """
+        start = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._condition:
+            if self.active >= self.slots or self._next_ticket() is not None:
+                ticket = object()
+                self._waiting[priority].append(ticket)
+                self._report(priority)
+                try:
+                    while self.active >= self.slots or self._next_ticket() is not ticket:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            metrics.increment('inference_timeout', f'{self.stage}_{priority}')
+                            raise TimeoutError(f"Nenhum slot de '{self.stage}' liberado em {timeout}s")
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting[priority].remove(ticket)
+                    # O primeiro da fila mudou: os demais reavaliam a vez
+                    self._condition.notify_all()
+
+            self.active += 1
+            self._report(priority)
+
+        metrics.record_timing('inference_wait', f'{self.stage}_{priority}', time.perf_counter() - start)
+
+    def release(self, priority: str):
+        with self._condition:
+            self.active -= 1
+            self._report(priority)
+            self._condition.notify_all()
+
+
+class InferenceScheduler:
+    """
+    Agendador central das inferências do processo (YOLO e OCR).
+
+    - admit(prioridade): admissão de uma requisição. Cada classe aceita no máximo
+      settings.INFERENCE_MAX_PENDING[classe] requisições em andamento; acima disso levanta
+      InferenceQueueFull (as views respondem 429 com Retry-After).
+    - priority(prioridade): apenas define a classe da thread atual, sem limite de admissão
+      (workers que já têm a sua própria fila, como o stream e as detecções assíncronas).
+    - slot(etapa): usado pelo pipeline em volta do YOLO e do OCR; no máximo
+      settings.INFERENCE_YOLO_SLOTS / INFERENCE_OCR_SLOTS execuções simultâneas, servidas
+      por classe de prioridade (live > interactive > batch).
+
+    A classe vale para a thread que chamou admit/priority (padrão: 'interactive') e também
+    ordena a espera pelas instâncias do pool de modelos (ver ModelRegistry.acquire).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stages: Dict[str, PrioritySlots] = {}
+        self._pending = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._durations: Dict[str, float] = {}
+
+    def _stage(self, stage: str) -> PrioritySlots:
+        with self._lock:
+            slots = self._stages.get(stage)
+            if slots is None:
+                setting = f'INFERENCE_{stage.upper()}_SLOTS'
+                slots = self._stages[stage] = PrioritySlots(stage, int(getattr(settings, setting, 1)))
+            return slots
+
+    @property
+    def current_priority(self) -> str:
+        return getattr(self._local, 'priority', None) or PRIORITY_INTERACTIVE
+
+    @contextmanager
+    def priority(self, priority: str):
+        """Define a classe de prioridade das etapas executadas pela thread atual"""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Classe de prioridade desconhecida: {priority}")
+
+        previous = getattr(self._local, 'priority', None)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def retry_after(self, priority: str) -> int:
+        """Segundos sugeridos ao cliente: duração média das requisições da classe"""
+        duration = self._durations.get(priority)
+        if duration is None:
+            return int(getattr(settings, 'INFERENCE_RETRY_AFTER', 2))
+        return max(1, math.ceil(duration))
+
+    @contextmanager
+    def admit(self, priority: str):
+        """
+        Admite uma requisição da classe, se a fila dela não estiver cheia
+
+        Raises:
+            InferenceQueueFull: Requisições da classe em andamento no limite
+        """
+        limit = getattr(settings, 'INFERENCE_MAX_PENDING', {}).get(priority)
+
+        with self._lock:
+            if limit is not None and self._pending[priority] >= limit:
+                metrics.increment('inference_rejected', priority)
+                raise InferenceQueueFull(priority, self.retry_after(priority))
+            self._pending[priority] += 1
+            metrics.set_gauge('inference_pending', priority, self._pending[priority])
+
+        start = time.perf_counter()
+        try:
+            with self.priority(priority):
+                yield
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self._pending[priority] -= 1
+                metrics.set_gauge('inference_pending', priority, self._pending[priority])
+                previous = self._durations.get(priority)
+                self._durations[priority] = duration if previous is None else (
+                    previous + DURATION_SMOOTHING * (duration - previous)
+                )
+
+    @contextmanager
+    def slot(self, stage: str):
+        """Ocupa um slot da etapa ('yolo' ou 'ocr') com a prioridade da thread atual"""
+        slots = self._stage(stage)
+        priority = self.current_priority
+        slots.acquire(priority)
+        try:
+            yield
+        finally:
+            slots.release(priority)
+
+
+inference_scheduler = InferenceScheduler()
@@ -0,0 +1,216 @@
+import logging
+import math
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from thefuzz import fuzz
+
+try:
+    from rapidfuzz.distance import Indel
+except ImportError:  # rapidfuzz é dependência do thefuzz, mas pode faltar em versões antigas
+    Indel = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def indel_distance(a: str, b: str) -> int:
+    """
+    Distância de inserção/remoção entre dois textos (a mesma usada pelo fuzz.ratio).
+    É uma métrica, o que permite podar a busca na BK-tree pela desigualdade triangular.
+    """
+    if Indel is not None:
+        return Indel.distance(a, b)
+
+    # LCS por programação dinâmica (placas têm poucos caracteres)
+    previous = [0] * (len(b) + 1)
+    for char_a in a:
+        current = [0]
+        for j, char_b in enumerate(b):
+            if char_a == char_b:
+                current.append(previous[j] + 1)
+            else:
+                current.append(max(previous[j + 1], current[j]))
+        previous = current
+    return len(a) + len(b) - 2 * previous[-1]
+
+
+class KnownPlateMatch(NamedTuple):
+    plate_id: int
+    plate_number: str
+    score: int
+
+
+class KnownPlateIndex:
+    """
+    Índice em memória (BK-tree) dos números de KnownPlate para busca por similaridade.
+
+    Substitui a varredura de KnownPlate.objects.all() com fuzz.ratio em cada placa:
+    a busca só compara os números cuja distância pode atingir o limiar pedido, e o
+    score retornado é o próprio fuzz.ratio usado pelas views. O índice é construído
+    na primeira busca e mantido pelos sinais post_save/post_delete de KnownPlate
+    (ver backend/signals.py). Operações em massa (update/bulk_create) não disparam
+    sinais; nesses casos chame invalidate(). Processos que não recebem os sinais do
+    servidor web (workers das detecções assíncronas) usam refresh_if_stale().
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._root = None  # (número, {distância: nó filho})
+        self._ids_by_number: Dict[str, Set[int]] = {}
+        self._number_by_id: Dict[int, str] = {}
+        self._max_length = 0
+        self._built = False
+        self._version = None  # (quantidade, último updated_at) das KnownPlate na construção
+
+    def _insert_number(self, plate_number: str):
+        if self._root is None:
+            self._root = (plate_number, {})
+            return
+
+        node = self._root
+        while True:
+            word, children = node
+            distance = indel_distance(plate_number, word)
+            if distance == 0:
+                return
+            if distance not in children:
+                children[distance] = (plate_number, {})
+                return
+            node = children[distance]
+
+    def _add(self, plate_id: int, plate_number: str):
+        if plate_number not in self._ids_by_number:
+            self._ids_by_number[plate_number] = set()
+            self._insert_number(plate_number)
+        self._ids_by_number[plate_number].add(plate_id)
+        self._number_by_id[plate_id] = plate_number
+        self._max_length = max(self._max_length, len(plate_number))
+
+    def _discard(self, plate_id: int):
+        plate_number = self._number_by_id.pop(plate_id, None)
+        if plate_number is not None:
+            # O número continua na árvore; sem ids ele é ignorado nas buscas
+            self._ids_by_number[plate_number].discard(plate_id)
+
+    @staticmethod
+    def _db_version():
+        from django.db.models import Count, Max
+
+        from backend.models import KnownPlate
+
+        stats = KnownPlate.objects.aggregate(count=Count('id'), updated_at=Max('updated_at'))
+        return stats['count'], stats['updated_at']
+
+    def build(self):
+        """(Re)constrói o índice a partir do banco de dados"""
+        from backend.models import KnownPlate
+
+        with self._lock:
+            self._version = self._db_version()
+            self._root = None
+            self._ids_by_number = {}
+            self._number_by_id = {}
+            self._max_length = 0
+
+            for plate_id, plate_number in KnownPlate.objects.values_list('id', 'plate_number').iterator():
+                if plate_number:
+                    self._add(plate_id, plate_number)
+
+            self._built = True
+            logger.info(f"Índice de placas conhecidas construído com {len(self._number_by_id)} placa(s)")
+
+    def invalidate(self):
+        """Descarta o índice; ele será reconstruído na próxima busca"""
+        with self._lock:
+            self._built = False
+
+    def refresh_if_stale(self):
+        """
+        Descarta o índice se as KnownPlate mudaram desde a construção (quantidade de placas
+        ou último updated_at): inclusões, edições e remoções feitas por outro processo
+        """
+        with self._lock:
+            if self._built and self._db_version() != self._version:
+                logger.info("Placas conhecidas alteradas em outro processo; o índice será reconstruído")
+                self._built = False
+
+    def upsert(self, plate_id: int, plate_number: str):
+        with self._lock:
+            if not self._built:
+                return
+            self._discard(plate_id)
+            if plate_number:
+                self._add(plate_id, plate_number)
+
+    def remove(self, plate_id: int):
+        with self._lock:
+            if self._built:
+                self._discard(plate_id)
+
+    def search(self, text: str, threshold: int = 0, top_k: int = 1) -> List[KnownPlateMatch]:
+        """
+        Busca as placas conhecidas mais similares a um texto
+
+        Args:
+            text: Texto da placa (após OCR e validação)
+            threshold: Similaridade mínima (0-100, mesma escala do fuzz.ratio)
+            top_k: Quantidade máxima de resultados
+
+        Returns:
+            Lista de KnownPlateMatch ordenada por similaridade (empate: ordem do número da placa)
+        """
+        if not text:
+            return []
+
+        with self._lock:
+            if not self._built:
+                self.build()
+            if self._root is None:
+                return []
+
+            # fuzz.ratio = round(100 * (1 - d / (len_a + len_b))): limite superior da distância para o limiar
+            max_total_length = len(text) + self._max_length
+            radius = math.floor((1 - (threshold - 0.5) / 100) * max_total_length)
+
+            candidates = []
+            stack = [self._root]
+            while stack:
+                word, children = stack.pop()
+                distance = indel_distance(text, word)
+                if distance <= radius and self._ids_by_number.get(word):
+                    candidates.append(word)
+                for child_distance, child in children.items():
+                    if distance - radius <= child_distance <= distance + radius:
+                        stack.append(child)
+
+            matches = []
+            for plate_number in candidates:
+                score = fuzz.ratio(text, plate_number)
+                if score >= threshold and score > 0:
+                    plate_id = min(self._ids_by_number[plate_number])
+                    matches.append(KnownPlateMatch(plate_id, plate_number, score))
+
+        matches.sort(key=lambda match: (-match.score, match.plate_number))
+        return matches[:top_k]
+
+    def best_match(self, text: str, threshold: int) -> Tuple[Optional[object], int]:
+        """
+        Retorna a KnownPlate mais similar que atinge o limiar
+
+        Returns:
+            Tupla (KnownPlate ou None, similaridade)
+        """
+        from backend.models import KnownPlate
+
+        matches = self.search(text, threshold, top_k=1)
+        if not matches:
+            return None, 0
+
+        known_plate = KnownPlate.objects.filter(pk=matches[0].plate_id).first()
+        if known_plate is None:
+            return None, 0
+        return known_plate, matches[0].score
+
+
+known_plate_index = KnownPlateIndex()
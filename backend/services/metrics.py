@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict
+
+
+class MetricsRegistry:
+    """
+    Métricas simples em memória (tempos e contadores) do processo atual.
+
+    Os valores são agrupados por etapa ('preprocessing', 'ocr', ...) e nome, e
+    podem ser consultados em /api/detections/metrics/. Cada processo (workers
+    do 'process' backend, por exemplo) mantém as suas próprias métricas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = defaultdict(dict)
+        self._counters = defaultdict(lambda: defaultdict(int))
+        self._gauges = defaultdict(dict)
+
+    def record_timing(self, group: str, name: str, seconds: float):
+        """Registra a duração (em segundos) de uma execução"""
+        with self._lock:
+            timing = self._timings[group].get(name)
+            if timing is None:
+                timing = self._timings[group][name] = {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0}
+            timing['count'] += 1
+            timing['total'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+            timing['last'] = seconds
+
+    @contextmanager
+    def timer(self, group: str, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_timing(group, name, time.perf_counter() - start)
+
+    def increment(self, group: str, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[group][name] += amount
+
+    def set_gauge(self, group: str, name: str, value: float):
+        """Registra o valor atual de uma medida (ex.: tamanho de fila)"""
+        with self._lock:
+            self._gauges[group][name] = value
+
+    def snapshot(self) -> Dict:
+        """
+        Retorna uma cópia das métricas
+
+        Returns:
+            Dicionário {'timings': {grupo: {nome: {count, avg_ms, max_ms, last_ms, total_ms}}},
+                        'counters': {grupo: {nome: valor}}, 'gauges': {grupo: {nome: valor}}}
+        """
+        with self._lock:
+            timings = {
+                group: {
+                    name: {
+                        'count': timing['count'],
+                        'avg_ms': round(timing['total'] / timing['count'] * 1000, 3),
+                        'max_ms': round(timing['max'] * 1000, 3),
+                        'last_ms': round(timing['last'] * 1000, 3),
+                        'total_ms': round(timing['total'] * 1000, 3),
+                    }
+                    for name, timing in group_timings.items()
+                }
+                for group, group_timings in self._timings.items()
+            }
+            counters = {group: dict(group_counters) for group, group_counters in self._counters.items()}
+            gauges = {group: dict(group_gauges) for group, group_gauges in self._gauges.items()}
+
+        return {'timings': timings, 'counters': counters, 'gauges': gauges}
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,199 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .inference_scheduler import PrioritySlots, inference_scheduler
+from .plate_detector import PlateDetectorService
+
+
+logger = logging.getLogger(__name__)
+
+
+def _current_memory_mb():
+    """
+    Retorna a memória residente do processo em MB (ou None se indisponível)
+    """
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+
+    try:
+        # Linux sem psutil: o segundo campo de /proc/self/statm são as páginas residentes
+        # (ru_maxrss não serve: é o pico, não a memória atual)
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class DetectorUnavailable(TimeoutError):
+    """Nenhuma instância do pool foi liberada dentro do tempo de espera"""
+
+
+# Marca o timeout padrão de acquire/borrow (settings.PLATE_DETECTOR_ACQUIRE_TIMEOUT)
+_SETTINGS_TIMEOUT = object()
+
+
+class ModelRegistry:
+    """
+    Pool de instâncias do PlateDetectorService compartilhado por todo o processo.
+
+    Os modelos YOLO e EasyOCR são carregados sob demanda (na primeira requisição)
+    e reaproveitados pelas views e consumers, que apenas emprestam uma instância
+    do pool. O tamanho do pool é definido por settings.PLATE_DETECTOR_POOL_SIZE.
+
+    Com todas as instâncias emprestadas, os pedidos aguardam na ordem das classes de
+    prioridade do agendador (live > interactive > batch; ver inference_scheduler): a
+    próxima instância devolvida vai para o stream antes dos uploads e dos lotes.
+    """
+
+    def __init__(self, pool_size=None, factory=PlateDetectorService):
+        self._pool_size = pool_size
+        self._factory = factory
+        self._available = []  # Instâncias livres (a última devolvida é a próxima emprestada)
+        self._slots = None  # Uma vaga por instância, distribuída por prioridade
+        self._lock = threading.Lock()
+        self._instance_ready = threading.Condition(self._lock)  # Instância devolvida ou carregada por warm_up
+        self._created = 0
+        self._load_reported = False
+
+    @property
+    def pool_size(self):
+        if self._pool_size is not None:
+            return self._pool_size
+        return max(1, int(getattr(settings, 'PLATE_DETECTOR_POOL_SIZE', 1)))
+
+    @property
+    def slots(self) -> PrioritySlots:
+        with self._lock:
+            if self._slots is None:
+                self._slots = PrioritySlots('detector', self.pool_size)
+            return self._slots
+
+    @property
+    def is_loaded(self):
+        return self._created > 0
+
+    def _load_instance(self):
+        """Carrega uma nova instância dos modelos e registra tempo e memória"""
+        memory_before = _current_memory_mb()
+        start = time.perf_counter()
+
+        detector = self._factory()
+
+        elapsed = time.perf_counter() - start
+        memory_after = _current_memory_mb()
+
+        with self._lock:
+            first_load = not self._load_reported
+            self._load_reported = True
+
+        if first_load:
+            if memory_before is not None and memory_after is not None:
+                logger.info(
+                    f"✓ Modelos carregados em {elapsed:.2f}s "
+                    f"(memória: {memory_before:.0f} MB → {memory_after:.0f} MB, "
+                    f"pool de até {self.pool_size} instância(s))"
+                )
+            else:
+                logger.info(f"✓ Modelos carregados em {elapsed:.2f}s (pool de até {self.pool_size} instância(s))")
+        else:
+            logger.debug(f"Instância adicional do detector carregada em {elapsed:.2f}s")
+
+        return detector
+
+    def acquire(self, timeout=_SETTINGS_TIMEOUT):
+        """
+        Empresta uma instância do detector, carregando-a se o pool ainda não estiver cheio.
+        Se todas estiverem emprestadas, aguarda na fila da classe de prioridade da thread atual.
+
+        Args:
+            timeout: Tempo máximo (s) de espera por uma instância livre
+                     (padrão: settings.PLATE_DETECTOR_ACQUIRE_TIMEOUT; None aguarda indefinidamente)
+
+        Returns:
+            Instância de PlateDetectorService
+
+        Raises:
+            DetectorUnavailable: Nenhuma instância liberada dentro do timeout
+        """
+        if timeout is _SETTINGS_TIMEOUT:
+            timeout = getattr(settings, 'PLATE_DETECTOR_ACQUIRE_TIMEOUT', 30)
+
+        priority = inference_scheduler.current_priority
+        slots = self.slots
+        try:
+            slots.acquire(priority, timeout)
+        except TimeoutError:
+            raise DetectorUnavailable(
+                f"Nenhuma instância do detector de placas disponível no pool em {timeout}s"
+            )
+
+        # Com a vaga garantida, há uma instância livre, ainda é possível criar uma ou
+        # warm_up está carregando a que falta para completar o pool
+        with self._lock:
+            while not self._available and self._created >= self.pool_size:
+                self._instance_ready.wait()
+            if self._available:
+                return self._available.pop()
+            self._created += 1
+
+        try:
+            return self._load_instance()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+                self._instance_ready.notify_all()
+            slots.release(priority)
+            raise
+
+    def release(self, detector):
+        """Devolve uma instância emprestada ao pool"""
+        if detector is not None:
+            with self._lock:
+                self._available.append(detector)
+                self._instance_ready.notify()
+            self.slots.release(inference_scheduler.current_priority)
+
+    @contextmanager
+    def borrow(self, timeout=_SETTINGS_TIMEOUT):
+        detector = self.acquire(timeout)
+        try:
+            yield detector
+        finally:
+            self.release(detector)
+
+    def warm_up(self):
+        """
+        Garante que ao menos uma instância esteja carregada (ou em carregamento).
+
+        Não ocupa uma vaga do pool: com os modelos já carregados retorna na hora, mesmo com
+        todas as instâncias emprestadas (conexões WebSocket e inícios de stream não esperam
+        por lotes ou uploads em andamento).
+        """
+        with self._lock:
+            if self._created > 0:
+                return
+            self._created += 1
+
+        try:
+            detector = self._load_instance()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+                self._instance_ready.notify_all()
+            raise
+
+        with self._lock:
+            self._available.append(detector)
+            self._instance_ready.notify()
+
+
+model_registry = ModelRegistry()
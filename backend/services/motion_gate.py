@@ -0,0 +1,89 @@
+import logging
+import time
+from typing import Optional, Sequence
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class MotionGate:
+    """
+    Filtro barato antes do YOLO nos streams: só libera a inferência quando a cena mudou.
+
+    Cada frame é reduzido (largura settings.STREAM_MOTION_GATE_WIDTH), convertido para
+    escala de cinza e suavizado; a fração de pixels que diferem mais que
+    STREAM_MOTION_PIXEL_THRESHOLD da referência (o último frame liberado) é comparada com
+    STREAM_MOTION_SENSITIVITY. Mudanças lentas se acumulam em relação à referência e acabam
+    liberando a inferência. Mesmo com a cena parada, um frame é liberado a cada
+    STREAM_MOTION_MAX_SKIP_SECONDS.
+    """
+
+    def __init__(self, width: int = None, sensitivity: float = None, pixel_threshold: int = None,
+                 roi: Optional[Sequence[float]] = None, max_skip_seconds: float = None):
+        self.width = width or getattr(settings, 'STREAM_MOTION_GATE_WIDTH', 160)
+        self.sensitivity = sensitivity if sensitivity is not None else getattr(
+            settings, 'STREAM_MOTION_SENSITIVITY', 0.01)
+        self.pixel_threshold = pixel_threshold if pixel_threshold is not None else getattr(
+            settings, 'STREAM_MOTION_PIXEL_THRESHOLD', 25)
+        # Região de interesse normalizada (x1, y1, x2, y2), em frações da largura/altura
+        self.roi = roi if roi is not None else getattr(settings, 'STREAM_MOTION_ROI', None)
+        self.max_skip_seconds = max_skip_seconds if max_skip_seconds is not None else getattr(
+            settings, 'STREAM_MOTION_MAX_SKIP_SECONDS', 30.0)
+
+        self._reference = None
+        self._reference_at = 0.0
+        self.checked = 0
+        self.skipped = 0
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.checked if self.checked else 0.0
+
+    def _signature(self, frame: np.ndarray) -> np.ndarray:
+        """Versão reduzida, em escala de cinza e suavizada do frame (recortada na ROI, se houver)"""
+        height, width = frame.shape[:2]
+
+        if self.roi:
+            x1, y1, x2, y2 = self.roi
+            frame = frame[int(y1 * height):int(y2 * height), int(x1 * width):int(x2 * width)]
+            height, width = frame.shape[:2]
+
+        target_width = min(self.width, width)
+        target_height = max(1, int(height * target_width / width))
+        small = cv2.resize(frame, (target_width, target_height), interpolation=cv2.INTER_AREA)
+
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def changed_ratio(self, signature: np.ndarray) -> float:
+        """Fração dos pixels que mudaram em relação à referência"""
+        if self._reference is None or self._reference.shape != signature.shape:
+            return 1.0
+        difference = cv2.absdiff(signature, self._reference)
+        return float(np.count_nonzero(difference > self.pixel_threshold)) / difference.size
+
+    def should_detect(self, frame: np.ndarray) -> bool:
+        """
+        Indica se o frame deve ir para a inferência (e, nesse caso, passa a ser a referência)
+
+        Args:
+            frame: Frame BGR do stream
+        """
+        self.checked += 1
+        now = time.monotonic()
+
+        signature = self._signature(frame)
+        changed = self.changed_ratio(signature) >= self.sensitivity
+
+        if changed or now - self._reference_at >= self.max_skip_seconds:
+            self._reference = signature
+            self._reference_at = now
+            return True
+
+        self.skipped += 1
+        return False
@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from .metrics import metrics
+from .tesseract_ocr import read_plate_text
+
+
+logger = logging.getLogger(__name__)
+
+# Confiança mínima de uma leitura do EasyOCR para ser considerada
+EASYOCR_MIN_SCORE = 0.3
+
+_engine_executor = None
+_engine_executor_lock = threading.Lock()
+
+
+class OcrReading(NamedTuple):
+    engine: str
+    text: str  # Apenas caracteres alfanuméricos, em maiúsculas
+    confidence: float  # 0-1, em todos os motores
+    latency: float  # Segundos
+
+
+def clean_plate_text(text: str) -> str:
+    return ''.join(c for c in text.upper() if c.isalnum())
+
+
+def vote_readings(readings: Sequence[Tuple[str, float]]) -> Tuple[Optional[str], float]:
+    """
+    Combina leituras por votação caractere a caractere, ponderada pela confiança
+
+    Args:
+        readings: Tuplas (texto, confiança 0-1)
+
+    Returns:
+        Tupla (texto, confiança média dos caracteres vencedores) ou (None, 0.0) sem leituras
+    """
+    readings = [(text, confidence) for text, confidence in readings if text]
+    if not readings:
+        return None, 0.0
+
+    # O comprimento com maior peso define quais leituras participam da votação
+    length_weights = defaultdict(float)
+    for text, confidence in readings:
+        length_weights[len(text)] += confidence or 1e-6
+    length = max(length_weights, key=lambda size: (length_weights[size], size))
+
+    votes = [defaultdict(float) for _ in range(length)]
+    for text, confidence in readings:
+        if len(text) == length:
+            for position, char in enumerate(text):
+                votes[position][char] += confidence or 1e-6
+
+    chars = []
+    confidences = []
+    for position_votes in votes:
+        char = max(position_votes, key=position_votes.get)
+        chars.append(char)
+        confidences.append(position_votes[char] / sum(position_votes.values()))
+
+    # Confiança: média das leituras com o comprimento escolhido, ponderada pelo consenso por caractere
+    readings_confidence = [confidence for text, confidence in readings if len(text) == length]
+    agreement = sum(confidences) / len(confidences)
+    return ''.join(chars), agreement * (sum(readings_confidence) / len(readings_confidence))
+
+
+class OcrEngine:
+    """
+    Motor de OCR de um recorte de placa. As subclasses implementam _read; read mede
+    a latência de cada chamada (métricas 'ocr_engine') e nunca propaga exceções.
+    """
+
+    name = None
+
+    def __init__(self, detector_service):
+        self.detector_service = detector_service
+
+    def _read(self, image: np.ndarray) -> Tuple[str, float]:
+        raise NotImplementedError
+
+    def read(self, image: np.ndarray) -> OcrReading:
+        start = time.perf_counter()
+        try:
+            text, confidence = self._read(image)
+        except Exception as e:
+            logger.error(f"Erro no OCR ({self.name}): {e}")
+            text, confidence = '', 0.0
+        latency = time.perf_counter() - start
+
+        metrics.record_timing('ocr_engine', self.name, latency)
+        return OcrReading(self.name, clean_plate_text(text), float(confidence or 0.0), latency)
+
+    @staticmethod
+    def best_raw_result(raw_results: List) -> Tuple[str, float]:
+        """Melhor leitura (mais longa ou mais confiável) entre os resultados (bbox, texto, confiança)"""
+        best_text = ""
+        best_confidence = 0.0
+
+        for bbox, text, score in raw_results:
+            if score > EASYOCR_MIN_SCORE:
+                clean_text = ''.join(c for c in text if c.isalnum())
+                if len(clean_text) > len(best_text) or score > best_confidence:
+                    best_text = clean_text
+                    best_confidence = score
+
+        return best_text, best_confidence
+
+
+class EasyOcrEngine(OcrEngine):
+    """Pipeline completo do EasyOCR (detector CRAFT + reconhecedor) sobre o recorte em escala de cinza"""
+
+    name = 'easyocr'
+
+    def _read(self, image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        return self.best_raw_result(self.detector_service.reader.readtext(gray))
+
+
+class RecognizerOcrEngine(OcrEngine):
+    """Apenas o reconhecedor do EasyOCR (o recorte do YOLO já delimita a placa), com separação de linhas"""
+
+    name = 'recognizer'
+
+    def _read(self, image):
+        return self.best_raw_result(self.detector_service.recognize_plate_text(image))
+
+
+class TesseractOcrEngine(OcrEngine):
+    """Tesseract (tesserocr ou pytesseract) sobre o recorte binarizado; confiança convertida para 0-1"""
+
+    name = 'tesseract'
+
+    def _read(self, image):
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB) if image.ndim == 3 else image
+        text, confidence = read_plate_text(self.detector_service.preprocess_for_ocr(rgb_image))
+        return text, confidence / 100.0
+
+
+OCR_ENGINES = {
+    engine_class.name: engine_class
+    for engine_class in (EasyOcrEngine, RecognizerOcrEngine, TesseractOcrEngine)
+}
+
+
+def build_ocr_engines(detector_service, names: Sequence[str] = None) -> Dict[str, OcrEngine]:
+    """Instancia os motores de OCR (padrão: todos) para um PlateDetectorService"""
+    if names is None:
+        names = list(OCR_ENGINES)
+    return {name: OCR_ENGINES[name](detector_service) for name in names}
+
+
+def get_ocr_engine_executor():
+    """
+    Pool de threads compartilhado para rodar vários motores ao mesmo tempo
+    (None se settings.OCR_ENGINE_WORKERS for 0: os motores rodam em sequência)
+    """
+    global _engine_executor
+
+    with _engine_executor_lock:
+        if _engine_executor is None:
+            workers = int(getattr(settings, 'OCR_ENGINE_WORKERS', 3))
+            if workers <= 0:
+                return None
+            _engine_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr-engine')
+
+        return _engine_executor
+
+
+def run_ocr_engines(engines: Sequence[OcrEngine], image: np.ndarray) -> Dict:
+    """
+    Executa os motores no recorte (em paralelo, quando há mais de um) e combina as leituras
+    por votação ponderada pela confiança
+
+    Args:
+        engines: Motores a usar
+        image: Recorte da placa (BGR)
+
+    Returns:
+        Dicionário {'best_text', 'best_confidence', 'engines': {motor: {'text', 'confidence', 'latency_ms'}}}
+    """
+    executor = get_ocr_engine_executor() if len(engines) > 1 else None
+
+    if executor is None:
+        readings = [engine.read(image) for engine in engines]
+    else:
+        # O primeiro motor roda na thread atual enquanto os demais ficam no pool
+        futures = [executor.submit(engine.read, image) for engine in engines[1:]]
+        readings = [engines[0].read(image)] + [future.result() for future in futures]
+
+    best_text, best_confidence = vote_readings([(reading.text, reading.confidence) for reading in readings])
+
+    return {
+        'best_text': best_text or '',
+        'best_confidence': best_confidence,
+        'engines': {
+            reading.engine: {
+                'text': reading.text,
+                'confidence': reading.confidence,
+                'latency_ms': round(reading.latency * 1000, 3)
+            }
+            for reading in readings
+        }
+    }
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+_cache_lock = threading.Lock()
+_cached_order = None
+_cached_at = 0.0
+_refreshing = False
+
+
+def default_cascade_order() -> List[str]:
+    """Ordem usada enquanto não há histórico suficiente (settings.OCR_CASCADE_DEFAULT_ORDER)"""
+    return list(settings.OCR_CASCADE_DEFAULT_ORDER)
+
+
+def compute_method_accuracy() -> Dict[str, Dict[str, int]]:
+    """
+    Calcula acertos por método de pré-processamento a partir das placas detectadas
+    associadas a uma KnownPlate (mesmo critério do script/generate_report.py)
+
+    Apenas leituras com todas as variantes entram na conta: as da cascata (entradas
+    marcadas com 'cascade') só têm os métodos que a ordem atual mandou testar.
+
+    Returns:
+        Dicionário {método: {'correct': acertos, 'total': total}}
+    """
+    # Importação tardia: este módulo é carregado antes do registro de apps do Django
+    from backend.models import DetectedPlate
+
+    method_metrics = defaultdict(lambda: {'correct': 0, 'total': 0})
+
+    detected_plates = DetectedPlate.objects.filter(known_plate__isnull=False).values_list(
+        'known_plate__plate_number', 'ocr_results'
+    )
+
+    for known_number, ocr_results in detected_plates.iterator():
+        if not known_number or not isinstance(ocr_results, list):
+            continue
+        if any(isinstance(ocr_result, dict) and ocr_result.get('cascade') for ocr_result in ocr_results):
+            continue
+
+        correct_plate = known_number.strip().upper()
+
+        for ocr_result in ocr_results:
+            method = ocr_result.get('method')
+            ocr_text = ocr_result.get('text')
+
+            if method and ocr_text is not None:
+                method_metrics[method]['total'] += 1
+                if ocr_text.strip().upper() == correct_plate:
+                    method_metrics[method]['correct'] += 1
+
+    return dict(method_metrics)
+
+
+def refresh_cascade_order() -> List[str]:
+    """
+    Recalcula a ordem da cascata pela taxa de acerto histórica e a guarda em cache.
+    Métodos com menos de settings.OCR_CASCADE_MIN_SAMPLES amostras mantêm a ordem
+    padrão, depois dos medidos.
+    """
+    global _cached_order, _cached_at
+
+    default_order = default_cascade_order()
+
+    try:
+        method_metrics = compute_method_accuracy()
+    except Exception as e:
+        logger.error(f"Erro ao calcular a acurácia dos métodos de OCR: {e}")
+        method_metrics = {}
+
+    min_samples = getattr(settings, 'OCR_CASCADE_MIN_SAMPLES', 10)
+    measured = {
+        method: metrics['correct'] / metrics['total']
+        for method, metrics in method_metrics.items()
+        if method in default_order and metrics['total'] >= min_samples
+    }
+
+    order = sorted(measured, key=lambda method: (-measured[method], default_order.index(method)))
+    order += [method for method in default_order if method not in measured]
+
+    with _cache_lock:
+        _cached_order = order
+        _cached_at = time.monotonic()
+
+    logger.info(f"Ordem da cascata de OCR: {', '.join(order)}")
+    return order
+
+
+def _refresh_in_background():
+    global _refreshing
+
+    try:
+        refresh_cascade_order()
+    finally:
+        with _cache_lock:
+            _refreshing = False
+        close_old_connections()
+
+
+def get_cascade_order() -> List[str]:
+    """
+    Retorna os métodos de pré-processamento ordenados pela taxa de acerto histórica.
+
+    Nunca consulta o banco no caminho da requisição: devolve a ordem em cache (ou a
+    padrão, antes do primeiro cálculo) e, se ela tiver mais de settings.OCR_CASCADE_STATS_TTL
+    segundos, agenda o recálculo em uma thread.
+    """
+    global _refreshing
+
+    ttl = getattr(settings, 'OCR_CASCADE_STATS_TTL', 3600)
+
+    with _cache_lock:
+        order = _cached_order
+        expired = order is None or time.monotonic() - _cached_at >= ttl
+        start_refresh = expired and not _refreshing
+        if start_refresh:
+            _refreshing = True
+
+    if start_refresh:
+        threading.Thread(target=_refresh_in_background, daemon=True, name='ocr-cascade-stats').start()
+
+    return order if order is not None else default_cascade_order()
@@ -0,0 +1,139 @@
+import logging
+from typing import List, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+logger = logging.getLogger(__name__)
+
+PERSIST_ALL = 'all'
+PERSIST_KNOWN = 'known'
+PERSIST_NONE = 'none'
+PERSIST_MODES = (PERSIST_ALL, PERSIST_KNOWN, PERSIST_NONE)
+
+OCR_MODES = ('fast', 'full')
+
+# Perfis padrão; settings.PIPELINE_PROFILES substitui ou acrescenta perfis (campos omitidos vêm de 'balanced').
+# None em um campo usa a configuração global correspondente (YOLO_IMGSZ, YOLO_CONF, OCR_FAST_ENGINES,
+# OCR_FULL_ENGINES, PREPROCESSING_METHODS, OCR_CASCADE_ENABLED).
+DEFAULT_PIPELINE_PROFILES = {
+    'realtime': {
+        'imgsz': None,
+        'conf': None,
+        'ocr': 'fast',
+        'ocr_engines': None,
+        'preprocessing_methods': None,
+        'cascade': None,
+        'match_threshold': 60,
+        'persist': PERSIST_KNOWN,
+        'quality_gate': True,
+    },
+    'stream': {
+        'imgsz': None,
+        'conf': None,
+        'ocr': 'fast',
+        'ocr_engines': None,
+        'preprocessing_methods': None,
+        'cascade': None,
+        'match_threshold': 50,
+        'persist': PERSIST_ALL,
+        'quality_gate': True,
+    },
+    'balanced': {
+        'imgsz': None,
+        'conf': None,
+        'ocr': 'full',
+        'ocr_engines': None,
+        'preprocessing_methods': None,
+        'cascade': None,
+        'match_threshold': 50,
+        'persist': PERSIST_ALL,
+        'quality_gate': False,
+    },
+    'forensic': {
+        'imgsz': 1280,
+        'conf': 0.15,
+        'ocr': 'full',
+        'ocr_engines': ['recognizer', 'tesseract'],
+        'preprocessing_methods': None,
+        'cascade': False,
+        'match_threshold': 50,
+        'persist': PERSIST_ALL,
+        'quality_gate': False,
+    },
+}
+
+
+class UnknownProfileError(ValueError):
+    """Perfil de pipeline não definido"""
+
+
+class PipelineProfile(NamedTuple):
+    name: str
+    imgsz: Optional[int]  # Entrada do YOLO (letterbox)
+    conf: Optional[float]  # Confiança mínima das caixas do YOLO
+    ocr: str  # 'fast' (motores de ocr_engines) ou 'full' (variantes de pré-processamento)
+    ocr_engines: Optional[List[str]]  # 'fast': motores usados; 'full': motores extras que votam com as variantes
+    preprocessing_methods: Optional[List[str]]  # Variantes do OCR completo
+    cascade: Optional[bool]  # OCR completo em cascata, com parada antecipada
+    match_threshold: int  # Similaridade mínima (0-100) para associar a uma KnownPlate
+    persist: str  # Stream e process_frame: 'all', 'known' (só placas conhecidas) ou 'none'
+    quality_gate: bool  # Descartar recortes ruins antes do OCR (só onde um frame seguinte pode trazer a placa)
+
+    @property
+    def yolo_options(self):
+        """Parâmetros do YOLO que substituem os globais (apenas os definidos no perfil)"""
+        return {key: value for key, value in (('imgsz', self.imgsz), ('conf', self.conf)) if value is not None}
+
+
+def _profile_definitions():
+    definitions = dict(DEFAULT_PIPELINE_PROFILES)
+    definitions.update(getattr(settings, 'PIPELINE_PROFILES', {}))
+    return definitions
+
+
+def profile_names() -> List[str]:
+    return list(_profile_definitions())
+
+
+def get_profile(name: Optional[str] = None, context: Optional[str] = None) -> PipelineProfile:
+    """
+    Perfil do pipeline pelo nome ou, sem nome, o padrão do contexto
+
+    Args:
+        name: Nome do perfil ('realtime', 'stream', 'balanced', 'forensic' ou definido em settings)
+        context: 'upload', 'batch', 'frame' ou 'stream' (settings.PIPELINE_PROFILE_DEFAULTS)
+
+    Raises:
+        UnknownProfileError: Perfil inexistente
+        ImproperlyConfigured: Perfil de settings.PIPELINE_PROFILES com 'ocr' ou 'persist' inválido
+    """
+    if not name:
+        name = getattr(settings, 'PIPELINE_PROFILE_DEFAULTS', {}).get(context) or getattr(
+            settings, 'DEFAULT_PIPELINE_PROFILE', 'balanced')
+
+    definitions = _profile_definitions()
+    if name not in definitions:
+        raise UnknownProfileError(
+            f"Perfil desconhecido: '{name}'. Perfis disponíveis: {', '.join(definitions)}"
+        )
+
+    values = dict(DEFAULT_PIPELINE_PROFILES['balanced'])
+    values.update(definitions[name])
+
+    if values['ocr'] not in OCR_MODES:
+        raise ImproperlyConfigured(
+            f"Perfil '{name}': ocr '{values['ocr']}' inválido (use {', '.join(OCR_MODES)})"
+        )
+    if values['persist'] not in PERSIST_MODES:
+        raise ImproperlyConfigured(
+            f"Perfil '{name}': persist '{values['persist']}' inválido (use {', '.join(PERSIST_MODES)})"
+        )
+
+    return PipelineProfile(name=name, **{field: values[field] for field in PipelineProfile._fields if field != 'name'})
+
+
+def stream_profile_name(source_key: str) -> Optional[str]:
+    """Perfil configurado para uma fonte de vídeo (settings.PIPELINE_PROFILE_BY_SOURCE), se houver"""
+    return getattr(settings, 'PIPELINE_PROFILE_BY_SOURCE', {}).get(source_key)
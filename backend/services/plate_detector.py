@@ -1,38 +1,138 @@
+import io
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import cv2
 import numpy as np
-import pytesseract
 from PIL import Image
 import logging
 from typing import List, Dict, Tuple
-from ultralytics import YOLO
 import easyocr
 from django.conf import settings
 from django.core.files.base import ContentFile
 
+from .detector_backends import create_detector_backend
+from .inference_scheduler import STAGE_YOLO, inference_scheduler
+from .metrics import metrics
+from .ocr_engines import build_ocr_engines, clean_plate_text, run_ocr_engines, vote_readings
+from .ocr_stats import get_cascade_order
+from .tesseract_ocr import PLATE_ALPHABET
+
 
 logger = logging.getLogger(__name__)
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+# Placas de moto (2 linhas) são quase quadradas; placas de carro têm proporção ~3:1
+TWO_LINE_PLATE_MAX_ASPECT = 2.0
+
+# Altura de entrada do reconhecedor do EasyOCR
+EASYOCR_MODEL_HEIGHT = 64
+
+# Margem (px) adicionada ao redor de cada caixa do YOLO antes do recorte
+CROP_PADDING = 5
+
+# Cor das bordas do letterbox (a mesma usada pelo ultralytics)
+LETTERBOX_COLOR = (114, 114, 114)
+
+# Técnicas de pré-processamento aplicadas antes do OCR, na ordem original
+PREPROCESSING_METHODS = [
+    'Original', 'Grayscale', 'Otsu', 'Adaptive', 'Bilateral', 'Sharpened', 'Resized2x', 'Inverted'
+]
+
+# Variantes sem custo relevante (não vale a pena enviá-las ao pool)
+INLINE_PREPROCESSING_METHODS = {'Original', 'Grayscale'}
+
+_preprocess_executor = None
+_preprocess_executor_lock = threading.Lock()
+
+
+def get_preprocess_executor():
+    """
+    Retorna o pool de threads do pré-processamento, compartilhado por todas as requisições
+    (None se settings.PREPROCESS_WORKERS for 0). As funções do OpenCV liberam o GIL,
+    então as variantes de todas as placas são calculadas em paralelo.
+    """
+    global _preprocess_executor
+
+    with _preprocess_executor_lock:
+        if _preprocess_executor is None:
+            workers = int(getattr(settings, 'PREPROCESS_WORKERS', 4))
+            if workers <= 0:
+                return None
+            _preprocess_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='preprocess')
+
+        return _preprocess_executor
+
+
+def letterbox(image: np.ndarray, size: int) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Reduz a imagem para caber em size x size, mantendo a proporção, e completa com bordas
+
+    Args:
+        image: Imagem BGR em qualquer resolução
+        size: Lado da entrada do YOLO (imgsz)
+
+    Returns:
+        Tupla (imagem size x size, razão aplicada, (borda esquerda, borda superior))
+    """
+    height, width = image.shape[:2]
+    ratio = min(size / height, size / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+
+    if (new_width, new_height) != (width, height):
+        interpolation = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR
+        image = cv2.resize(image, (new_width, new_height), interpolation=interpolation)
+
+    pad_x = (size - new_width) // 2
+    pad_y = (size - new_height) // 2
+    boxed = cv2.copyMakeBorder(
+        image, pad_y, size - new_height - pad_y, pad_x, size - new_width - pad_x,
+        cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR
+    )
+    return boxed, ratio, (pad_x, pad_y)
 
 
 class PlateDetectorService:
     def __init__(self):
-        self.model = None
+        self.detector_backend = None
         self.reader = None
+        # 'readtext': detector CRAFT + reconhecedor; 'recognize': apenas o reconhecedor sobre o recorte do YOLO
+        self.ocr_mode = getattr(settings, 'EASYOCR_MODE', 'readtext')
+        self.split_lines_enabled = getattr(settings, 'EASYOCR_SPLIT_LINES', True)
+        self.ocr_batch_size = getattr(settings, 'EASYOCR_BATCH_SIZE', 32)
+        self.cascade_enabled = getattr(settings, 'OCR_CASCADE_ENABLED', False)
+        self.cascade_min_confidence = getattr(settings, 'OCR_CASCADE_MIN_CONFIDENCE', 0.6)
+        self.cascade_sample_rate = getattr(settings, 'OCR_CASCADE_SAMPLE_RATE', 0.05)
+        self.preprocessing_methods = getattr(settings, 'PREPROCESSING_METHODS', PREPROCESSING_METHODS)
+        # Motores do OCR rápido (combinados por votação) e motores extras do OCR completo (ver ocr_engines)
+        self.fast_ocr_engines = getattr(settings, 'OCR_FAST_ENGINES', ['tesseract'])
+        self.full_ocr_engines = getattr(settings, 'OCR_FULL_ENGINES', [])
+        self.ocr_engines = {}
+        # Parâmetros de inferência do YOLO (os padrões são os do ultralytics)
+        self.yolo_options = {
+            'conf': getattr(settings, 'YOLO_CONF', 0.25),
+            'iou': getattr(settings, 'YOLO_IOU', 0.7),
+            'imgsz': getattr(settings, 'YOLO_IMGSZ', 640),
+            'max_det': getattr(settings, 'YOLO_MAX_DET', 300),
+        }
         self._initialize_models()
 
     def _initialize_models(self):
         """Inicializa os modelos YOLO e EasyOCR"""
         try:
-            # Inicializar YOLO
+            # Inicializar YOLO (ultralytics ou ONNX Runtime, conforme settings.PLATE_DETECTOR_BACKEND)
             logger.info("Carregando modelo YOLO...")
-            self.model = YOLO(settings.YOLO_MODEL_PATH)
-            logger.info("✓ Modelo YOLO carregado com sucesso")
+            self.detector_backend = create_detector_backend(settings.YOLO_MODEL_PATH, self.yolo_options)
+            logger.info(f"✓ Modelo YOLO carregado com sucesso (backend: {self.detector_backend.name})")
 
             # Inicializar EasyOCR
             logger.info("Inicializando EasyOCR...")
             self.reader = easyocr.Reader(settings.EASYOCR_LANGUAGES)
             logger.info("✓ EasyOCR inicializado com sucesso")
 
+            self.ocr_engines = build_ocr_engines(self)
+
         except Exception as e:
             logger.error(f"Erro ao inicializar modelos: {e}")
             raise
@@ -52,118 +152,526 @@ class PlateDetectorService:
         if image is None:
             raise ValueError(f"Não foi possível carregar a imagem: {image_path}")
 
+        return self.detect_plates_in_image(image)
+
+    def decode_image(self, data: bytes, max_dimension: int = None) -> Tuple[np.ndarray, float]:
+        """
+        Decodifica uma imagem em memória (sem gravar em disco).
+
+        Imagens cujo maior lado passa de max_dimension são decodificadas em resolução
+        reduzida (1/2, 1/4 ou 1/8), o que no JPEG evita decodificar todos os pixels.
+
+        Args:
+            data: Conteúdo do arquivo de imagem
+            max_dimension: Maior lado desejado (padrão: settings.UPLOAD_MAX_DECODE_DIMENSION; 0 desativa)
+
+        Returns:
+            Tupla (imagem BGR, escala da imagem original em relação à decodificada)
+        """
+        if max_dimension is None:
+            max_dimension = getattr(settings, 'UPLOAD_MAX_DECODE_DIMENSION', 0)
+
+        original_size = None
+        reduced_flag = cv2.IMREAD_COLOR
+
+        if max_dimension:
+            try:
+                # Apenas o cabeçalho é lido para obter as dimensões
+                with Image.open(io.BytesIO(data)) as header:
+                    original_size = max(header.size)
+            except Exception as e:
+                logger.warning(f"Não foi possível ler as dimensões da imagem: {e}")
+
+        if original_size:
+            for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                                 (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                 (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                if original_size / factor >= max_dimension:
+                    reduced_flag = flag
+                    break
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), reduced_flag)
+        if image is None:
+            raise ValueError("Não foi possível decodificar a imagem enviada")
+
+        scale = original_size / max(image.shape[:2]) if original_size else 1.0
+        return image, scale
+
+    def detect_plates_from_bytes(self, data: bytes, profile=None) -> List[Dict]:
+        """
+        Detecta placas em uma imagem recebida em memória (upload ou frame)
+
+        Args:
+            data: Conteúdo do arquivo de imagem
+            profile: PipelineProfile opcional (imgsz/conf do YOLO)
+
+        Returns:
+            Lista de dicionários com informações das placas detectadas,
+            com as coordenadas na resolução original da imagem
+        """
+        image, scale = self.decode_image(data)
+        return self._scale_bounding_boxes(self.detect_plates_in_image(image, profile), scale)
+
+    def _scale_bounding_boxes(self, detected_plates: List[Dict], scale: float) -> List[Dict]:
+        """Converte as caixas de uma imagem decodificada em resolução reduzida para a resolução original"""
+        if scale != 1.0:
+            for plate in detected_plates:
+                plate['bounding_box'] = {
+                    key: int(round(value * scale)) for key, value in plate['bounding_box'].items()
+                }
+        return detected_plates
+
+    def detect_plates_batch(self, images: List[np.ndarray], scales: List[float] = None,
+                            batch_size: int = None, profile=None) -> List[List[Dict]]:
+        """
+        Executa o YOLO em várias imagens, em lotes de tamanho fixo
+
+        Args:
+            images: Lista de imagens BGR
+            scales: Escala de cada imagem em relação à original (ver decode_image)
+            batch_size: Imagens por inferência (padrão: settings.YOLO_BATCH_SIZE)
+            profile: PipelineProfile opcional (imgsz/conf do YOLO)
+
+        Returns:
+            Lista com as placas detectadas em cada imagem, na mesma ordem
+        """
+        if batch_size is None:
+            batch_size = getattr(settings, 'YOLO_BATCH_SIZE', 8)
+        if scales is None:
+            scales = [1.0] * len(images)
+
+        options = self.yolo_options_for(profile)
+        detected_plates_per_image = []
+
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            boxed_batch = [letterbox(image, options['imgsz']) for image in batch]
+            with inference_scheduler.slot(STAGE_YOLO):
+                results = self.detector_backend.predict([boxed for boxed, _, _ in boxed_batch], options)
+
+            for image, (_, ratio, pad), detections, scale in zip(batch, boxed_batch, results,
+                                                                 scales[start:start + batch_size]):
+                detected_plates = self._plates_from_result(image, detections, ratio=ratio, pad=pad)
+                detected_plates_per_image.append(self._scale_bounding_boxes(detected_plates, scale))
+
+        return detected_plates_per_image
+
+    def yolo_options_for(self, profile=None) -> Dict:
+        """Parâmetros do YOLO com o imgsz/conf do perfil do pipeline, se houver"""
+        if profile is None:
+            return self.yolo_options
+        return dict(self.yolo_options, **profile.yolo_options)
+
+    def detect_plates_in_image(self, image: np.ndarray, profile=None) -> List[Dict]:
+        """
+        Executa o YOLO em uma cópia reduzida (letterbox) da imagem e recorta as placas
+        da imagem original, em resolução completa
+
+        O custo da inferência não depende da resolução da imagem; o OCR recebe os recortes
+        com todos os pixels disponíveis.
+
+        Args:
+            image: Imagem BGR (em resolução completa)
+            profile: PipelineProfile opcional (imgsz/conf do YOLO)
+
+        Returns:
+            Lista de dicionários com informações das placas detectadas,
+            com as coordenadas na resolução da imagem recebida
+        """
+        options = self.yolo_options_for(profile)
+        boxed, ratio, pad = letterbox(image, options['imgsz'])
+
         # Executar detecção YOLO
-        results = self.model(image)
+        with inference_scheduler.slot(STAGE_YOLO):
+            detections = self.detector_backend.predict([boxed], options)[0]
+
+        return self._plates_from_result(image, detections, ratio=ratio, pad=pad)
+
+    def detect_plates_in_roi(self, image: np.ndarray, roi_mask, profile=None) -> List[Dict]:
+        """
+        Executa a detecção apenas no retângulo que envolve as regiões de interesse
 
+        As caixas são convertidas para as coordenadas da imagem inteira e as que têm o
+        centro fora dos polígonos são descartadas.
+
+        Args:
+            image: Imagem BGR inteira
+            roi_mask: RoiMask da fonte de vídeo
+            profile: PipelineProfile opcional (imgsz/conf do YOLO)
+
+        Returns:
+            Lista de dicionários com informações das placas detectadas
+        """
+        height, width = image.shape[:2]
+        (rx1, ry1, rx2, ry2), pixel_polygons = roi_mask.geometry(width, height)
+        if rx2 <= rx1 or ry2 <= ry1:
+            return []
+
+        # View da imagem: os recortes das placas continuam apontando para os pixels originais
         detected_plates = []
+        for plate in self.detect_plates_in_image(image[ry1:ry2, rx1:rx2], profile):
+            box = plate['bounding_box']
+            box = {'x1': box['x1'] + rx1, 'y1': box['y1'] + ry1, 'x2': box['x2'] + rx1, 'y2': box['y2'] + ry1}
+            center = ((box['x1'] + box['x2']) / 2, (box['y1'] + box['y2']) / 2)
 
-        for result_idx, result in enumerate(results):
-            boxes = result.boxes
+            if not roi_mask.contains(pixel_polygons, center):
+                metrics.increment('roi', 'discarded_boxes')
+                continue
 
-            if len(boxes) == 0:
+            plate['bounding_box'] = box
+            plate['plate_number'] = len(detected_plates) + 1
+            detected_plates.append(plate)
+
+        return detected_plates
+
+    def _plates_from_result(self, image: np.ndarray, detections, first_number: int = 1,
+                            ratio: float = 1.0, pad: Tuple[int, int] = (0, 0)) -> List[Dict]:
+        """
+        Extrai as caixas de um resultado do YOLO e recorta as placas da imagem
+
+        As caixas e confianças (já em arrays numpy, qualquer que seja o backend) são convertidas
+        do letterbox para a resolução da imagem e limitadas às suas bordas em operações
+        vetorizadas. Os recortes ('cropped_image') são views da imagem original: quem for
+        alterá-los ou mantê-los além da vida da imagem deve usar .copy().
+
+        Args:
+            image: Imagem original (em que as placas são recortadas)
+            detections: Detections do backend para a cópia letterbox dessa imagem
+            first_number: Número da primeira placa ('plate_number')
+            ratio: Razão de redução aplicada pelo letterbox
+            pad: Bordas (esquerda, superior) adicionadas pelo letterbox
+
+        Returns:
+            Lista de dicionários com informações das placas detectadas
+        """
+        detected_plates = []
+
+        if len(detections.conf) == 0:
+            return detected_plates
+
+        coordinates = detections.xyxy
+        confidences = detections.conf
+
+        # Coordenadas do letterbox -> resolução da imagem original
+        height, width = image.shape[:2]
+        coordinates = (coordinates - np.array([pad[0], pad[1], pad[0], pad[1]])) / ratio
+        coordinates[:, [0, 2]] = np.clip(coordinates[:, [0, 2]], 0, width)
+        coordinates[:, [1, 3]] = np.clip(coordinates[:, [1, 3]], 0, height)
+        coordinates = np.rint(coordinates).astype(int)
+
+        padded = coordinates + np.array([-CROP_PADDING, -CROP_PADDING, CROP_PADDING, CROP_PADDING])
+        padded[:, [0, 2]] = np.clip(padded[:, [0, 2]], 0, width)
+        padded[:, [1, 3]] = np.clip(padded[:, [1, 3]], 0, height)
+
+        for (x1, y1, x2, y2), (x1_pad, y1_pad, x2_pad, y2_pad), confidence in zip(
+                coordinates.tolist(), padded.tolist(), confidences.tolist()):
+            # Caixa vazia depois do recorte nas bordas
+            if x2_pad <= x1_pad or y2_pad <= y1_pad:
                 continue
 
-            for plate_idx, box in enumerate(boxes):
-                try:
-                    # Extrair coordenadas
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                    confidence = float(box.conf[0])
-
-                    # Adicionar padding
-                    padding = 5
-                    y1_pad = max(0, y1 - padding)
-                    y2_pad = min(image.shape[0], y2 + padding)
-                    x1_pad = max(0, x1 - padding)
-                    x2_pad = min(image.shape[1], x2 + padding)
-
-                    # Cortar placa
-                    cropped_plate = image[y1_pad:y2_pad, x1_pad:x2_pad].copy()
-
-                    if cropped_plate.size == 0:
-                        continue
-
-                    detected_plates.append({
-                        'plate_number': len(detected_plates) + 1,
-                        'bounding_box': {
-                            'x1': int(x1), 'y1': int(y1),
-                            'x2': int(x2), 'y2': int(y2)
-                        },
-                        'confidence': confidence,
-                        'cropped_image': cropped_plate
-                    })
-
-                except Exception as e:
-                    logger.error(f"Erro ao processar placa {plate_idx}: {e}")
-                    continue
+            detected_plates.append({
+                'plate_number': first_number + len(detected_plates),
+                'bounding_box': {
+                    'x1': x1, 'y1': y1,
+                    'x2': x2, 'y2': y2
+                },
+                'confidence': confidence,
+                'cropped_image': image[y1_pad:y2_pad, x1_pad:x2_pad]
+            })
 
         return detected_plates
 
-    def preprocess_images(self, image: np.ndarray) -> List[Tuple[str, np.ndarray]]:
+    def preprocess_images(self, image: np.ndarray, methods: List[str] = None) -> List[Tuple[str, np.ndarray]]:
         """
         Aplica diferentes técnicas de pré-processamento na imagem
 
         Args:
             image: Imagem original
+            methods: Técnicas a aplicar (padrão: settings.PREPROCESSING_METHODS, na ordem de PREPROCESSING_METHODS)
 
         Returns:
             Lista de tuplas (descrição, imagem_processada)
         """
-        processed_images = []
+        return self.preprocess_images_batch([image], methods)[0]
+
+    def preprocess_images_batch(self, images: List[np.ndarray], methods: List[str] = None,
+                                gray_images: List[np.ndarray] = None) -> List[List[Tuple[str, np.ndarray]]]:
+        """
+        Aplica as técnicas de pré-processamento em várias imagens, calculando as
+        variantes em paralelo no pool compartilhado (ver get_preprocess_executor)
+
+        Args:
+            images: Imagens originais (placas cortadas)
+            methods: Técnicas a aplicar (padrão: self.preprocessing_methods)
+            gray_images: Versões em escala de cinza já calculadas, se houver
+
+        Returns:
+            Para cada imagem, lista de tuplas (descrição, imagem_processada)
+        """
+        if methods is None:
+            methods = self.preprocessing_methods
+
+        # Escala de cinza (base de todas as técnicas, exceto a Original)
+        if gray_images is None:
+            needs_gray = any(method != 'Original' for method in methods)
+            gray_images = [cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if needs_gray else None for image in images]
+
+        executor = get_preprocess_executor()
+
+        variants = []
+        for image, gray_image in zip(images, gray_images):
+            image_variants = []
+            for method in methods:
+                if executor is None or method in INLINE_PREPROCESSING_METHODS:
+                    image_variants.append((method, self._timed_preprocessing(method, image, gray_image)))
+                else:
+                    image_variants.append(
+                        (method, executor.submit(self._timed_preprocessing, method, image, gray_image))
+                    )
+            variants.append(image_variants)
+
+        return [
+            [(method, result.result() if isinstance(result, Future) else result) for method, result in image_variants]
+            for image_variants in variants
+        ]
+
+    def _timed_preprocessing(self, method: str, image: np.ndarray, gray_plate: np.ndarray) -> np.ndarray:
+        """Executa apply_preprocessing registrando o tempo da variante nas métricas"""
+        start = time.perf_counter()
+        processed = self.apply_preprocessing(method, image, gray_plate)
+        metrics.record_timing('preprocessing', method, time.perf_counter() - start)
+        return processed
+
+    def apply_preprocessing(self, method: str, image: np.ndarray, gray_plate: np.ndarray) -> np.ndarray:
+        """
+        Aplica uma técnica de pré-processamento
+
+        Args:
+            method: Nome da técnica (ver PREPROCESSING_METHODS)
+            image: Imagem original
+            gray_plate: Imagem em escala de cinza
+
+        Returns:
+            Imagem processada
+        """
+        if method == "Original":
+            return image
+
+        if method == "Grayscale":
+            return gray_plate
+
+        if method == "Otsu":
+            # Limiarização Otsu
+            _, otsu_thresh = cv2.threshold(gray_plate, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            return otsu_thresh
+
+        if method == "Adaptive":
+            # Limiarização adaptativa
+            return cv2.adaptiveThreshold(
+                gray_plate, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+            )
+
+        if method == "Bilateral":
+            # Filtro bilateral
+            return cv2.bilateralFilter(gray_plate, 11, 17, 17)
+
+        if method == "Sharpened":
+            # Nitidez
+            kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
+            return cv2.filter2D(gray_plate, -1, kernel)
+
+        if method == "Resized2x":
+            # Redimensionado 2x
+            height, width = gray_plate.shape
+            return cv2.resize(gray_plate, (width * 2, height * 2), interpolation=cv2.INTER_CUBIC)
+
+        if method == "Inverted":
+            # Invertido
+            return cv2.bitwise_not(gray_plate)
+
+        raise ValueError(f"Método de pré-processamento desconhecido: {method}")
+
+    def read_text(self, image: np.ndarray) -> List:
+        """
+        Executa o EasyOCR de acordo com o modo configurado (settings.EASYOCR_MODE)
+
+        Args:
+            image: Imagem da placa (BGR ou escala de cinza)
+
+        Returns:
+            Lista de tuplas (bbox, texto, confiança), no mesmo formato do readtext
+        """
+        if self.ocr_mode == 'recognize':
+            return self.recognize_plate_text(image)
+        return self.reader.readtext(image)
+
+    def split_plate_lines(self, gray: np.ndarray) -> List[List[int]]:
+        """
+        Separa as linhas de placas de duas linhas (motos Mercosul) pelo perfil horizontal
+
+        Args:
+            gray: Imagem da placa em escala de cinza
+
+        Returns:
+            Lista de caixas [x_min, x_max, y_min, y_max], uma por linha de texto
+        """
+        height, width = gray.shape[:2]
+        full_plate = [[0, width, 0, height]]
+
+        if height < 8 or width / height > TWO_LINE_PLATE_MAX_ASPECT:
+            return full_plate
+
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # Os caracteres são a classe minoritária; garantir que fiquem em branco
+        if binary.mean() > 127:
+            binary = cv2.bitwise_not(binary)
+
+        profile = binary.sum(axis=1).astype(np.float32)
+        top, bottom = int(height * 0.3), int(height * 0.7)
+        split_row = top + int(np.argmin(profile[top:bottom]))
+
+        # Sem vale nítido entre as linhas: tratar como linha única
+        if profile[split_row] > 0.25 * np.percentile(profile, 90):
+            return full_plate
+
+        return [[0, width, 0, split_row], [0, width, split_row, height]]
+
+    def _merge_plate_lines(self, raw_results: List, width: int, height: int) -> List:
+        """
+        Junta as leituras das linhas de uma placa de duas linhas (de cima para baixo)
+        """
+        if len(raw_results) <= 1:
+            return raw_results
 
-        # Original
-        processed_images.append(("Original", image))
+        raw_results = sorted(raw_results, key=lambda res: res[0][0][1])
+        text = ''.join(res[1] for res in raw_results)
+        score = sum(res[2] for res in raw_results) / len(raw_results)
+        bbox = [[0, 0], [width, 0], [width, height], [0, height]]
 
-        # Escala de cinza
-        gray_plate = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        processed_images.append(("Grayscale", gray_plate))
+        return [(bbox, text, score)]
 
-        # Limiarização Otsu
-        _, otsu_thresh = cv2.threshold(gray_plate, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        processed_images.append(("Otsu", otsu_thresh))
+    def _plate_lines(self, gray: np.ndarray) -> List[List[int]]:
+        height, width = gray.shape[:2]
+        if self.split_lines_enabled:
+            return self.split_plate_lines(gray)
+        return [[0, width, 0, height]]
 
-        # Limiarização adaptativa
-        adaptive_thresh = cv2.adaptiveThreshold(
-            gray_plate, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+    def recognize_plate_text(self, image: np.ndarray) -> List:
+        """
+        OCR apenas com o reconhecedor do EasyOCR, sem o detector de texto CRAFT.
+        O recorte do YOLO já delimita a placa, então ele é enviado direto ao reconhecedor.
+
+        Args:
+            image: Imagem da placa (BGR ou escala de cinza)
+
+        Returns:
+            Lista de tuplas (bbox, texto, confiança), no mesmo formato do readtext
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+        height, width = gray.shape[:2]
+
+        raw_results = self.reader.recognize(
+            gray, horizontal_list=self._plate_lines(gray), free_list=[], allowlist=PLATE_ALPHABET, detail=1
         )
-        processed_images.append(("Adaptive", adaptive_thresh))
 
-        # Filtro bilateral
-        bilateral = cv2.bilateralFilter(gray_plate, 11, 17, 17)
-        processed_images.append(("Bilateral", bilateral))
+        return self._merge_plate_lines(raw_results, width, height)
+
+    def recognize_plate_text_batch(self, images: List[np.ndarray]) -> List[List]:
+        """
+        Reconhece várias imagens (variantes e/ou placas) em uma única chamada ao reconhecedor.
 
-        # Nitidez
-        kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
-        sharpened = cv2.filter2D(gray_plate, -1, kernel)
-        processed_images.append(("Sharpened", sharpened))
+        Cada linha de texto é redimensionada para a altura do modelo e o lote é completado
+        com padding até a maior largura, como o EasyOCR faz internamente com várias caixas.
 
-        # Redimensionado 2x
-        height, width = gray_plate.shape
-        resized2x = cv2.resize(gray_plate, (width * 2, height * 2), interpolation=cv2.INTER_CUBIC)
-        processed_images.append(("Resized2x", resized2x))
+        Args:
+            images: Lista de imagens de placas (BGR ou escala de cinza)
 
-        # Invertido
-        inverted = cv2.bitwise_not(gray_plate)
-        processed_images.append(("Inverted", inverted))
+        Returns:
+            Lista com os resultados (bbox, texto, confiança) de cada imagem, na mesma ordem
+        """
+        from easyocr.recognition import get_text
 
-        return processed_images
+        line_crops = []
+        sizes = []
+        max_ratio = 1.0
 
-    def run_ocr_with_thresholds(self, image: np.ndarray, thresholds: List[float] = None) -> Tuple[Dict, List]:
+        for image_idx, image in enumerate(images):
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+            height, width = gray.shape[:2]
+            sizes.append((width, height))
+
+            for x_min, x_max, y_min, y_max in self._plate_lines(gray):
+                line = gray[y_min:y_max, x_min:x_max]
+                if line.size == 0:
+                    continue
+
+                line_height, line_width = line.shape[:2]
+                new_width = max(1, int(round(line_width * EASYOCR_MODEL_HEIGHT / line_height)))
+                resized = cv2.resize(line, (new_width, EASYOCR_MODEL_HEIGHT), interpolation=cv2.INTER_LINEAR)
+                max_ratio = max(max_ratio, new_width / EASYOCR_MODEL_HEIGHT)
+
+                box = [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+                line_crops.append(((image_idx, box), resized))
+
+        if not line_crops:
+            return [[] for _ in images]
+
+        ignore_char = ''.join(set(self.reader.character) - set(PLATE_ALPHABET))
+        recognized = get_text(
+            self.reader.character, EASYOCR_MODEL_HEIGHT, int(np.ceil(max_ratio) * EASYOCR_MODEL_HEIGHT),
+            self.reader.recognizer, self.reader.converter, line_crops,
+            ignore_char=ignore_char, batch_size=self.ocr_batch_size, workers=0, device=self.reader.device
+        )
+
+        # Devolver cada leitura à imagem de origem
+        results_per_image = [[] for _ in images]
+        for (image_idx, box), text, score in recognized:
+            results_per_image[image_idx].append((box, text, score))
+
+        return [
+            self._merge_plate_lines(raw_results, *sizes[image_idx])
+            for image_idx, raw_results in enumerate(results_per_image)
+        ]
+
+    def read_text_batch(self, images: List[np.ndarray]) -> List[List]:
         """
-        Executa OCR com diferentes limiares de confiança
+        Executa o OCR em várias imagens, em lote quando o modo 'recognize' está ativo
 
         Args:
-            image: Imagem para OCR
+            images: Lista de imagens
+
+        Returns:
+            Lista com os resultados brutos de cada imagem (formato do readtext)
+        """
+        if self.ocr_mode == 'recognize' and images:
+            try:
+                return self.recognize_plate_text_batch(images)
+            except Exception as e:
+                logger.error(f"Erro no OCR em lote, processando imagem a imagem: {e}")
+
+        results = []
+        for image in images:
+            try:
+                results.append(self.read_text(image))
+            except Exception as e:
+                logger.error(f"Erro no OCR: {e}")
+                results.append([])
+        return results
+
+    def filter_by_thresholds(self, raw_results: List, thresholds: List[float] = None) -> Dict:
+        """
+        Agrupa os resultados brutos do OCR por limiar de confiança
+
+        Args:
+            raw_results: Resultados brutos (bbox, texto, confiança)
             thresholds: Lista de limiares de confiança
 
         Returns:
-            Tupla (resultados_por_limiar, resultados_brutos)
+            Dicionário {limiar: {'combined_text', 'text_details', 'raw_detections'}}
         """
         if thresholds is None:
             thresholds = settings.CONFIDENCE_THRESHOLDS
 
-        # Resultados brutos do EasyOCR
-        raw_results = self.reader.readtext(image)
-
         threshold_results = {}
 
         for threshold in thresholds:
@@ -189,43 +697,26 @@ class PlateDetectorService:
                         'raw_detections': filtered_results
                     }
 
-        return threshold_results, raw_results
+        return threshold_results
 
-    def process_plate_ocr(self, cropped_plate: np.ndarray) -> Dict:
+    def run_ocr_with_thresholds(self, image: np.ndarray, thresholds: List[float] = None) -> Tuple[Dict, List]:
         """
-        Processa OCR em uma placa cortada
+        Executa OCR com diferentes limiares de confiança
 
         Args:
-            cropped_plate: Imagem da placa cortada
+            image: Imagem para OCR
+            thresholds: Lista de limiares de confiança
 
         Returns:
-            Dicionário com resultados do OCR
+            Tupla (resultados_por_limiar, resultados_brutos)
         """
-        # Aplicar pré-processamento
-        processed_images = self.preprocess_images(cropped_plate)
-
-        all_results = []
-
-        for desc, img in processed_images:
-            try:
-                threshold_results, raw_results = self.run_ocr_with_thresholds(img)
-
-                for threshold, results in threshold_results.items():
-                    combined_text = results['combined_text']
-                    text_details = results['text_details']
-
-                    all_results.append({
-                        'method': desc,
-                        'threshold': threshold,
-                        'text': combined_text,
-                        'details': text_details
-                    })
+        # Resultados brutos do EasyOCR
+        raw_results = self.read_text(image)
 
-            except Exception as e:
-                logger.error(f"Erro no OCR com método {desc}: {e}")
-                continue
+        return self.filter_by_thresholds(raw_results, thresholds), raw_results
 
-        # Encontrar melhor resultado
+    def _select_best_result(self, all_results: List[Dict]) -> Dict:
+        """Escolhe o melhor texto entre os resultados de todas as variantes"""
         best_text = ""
         best_confidence = 0.0
 
@@ -246,166 +737,231 @@ class PlateDetectorService:
             'all_results': all_results
         }
 
-    def process_plate_ocr_fast(self, cropped_plate: np.ndarray) -> Dict:
+    def _ocr_entries(self, desc: str, raw_results: List, cascade: bool = False) -> List[Dict]:
         """
-        Versão rápida do OCR - apenas grayscale + melhor threshold
+        Converte os resultados brutos de uma variante no formato de all_results. As entradas
+        da cascata são marcadas ('cascade'): elas não entram no cálculo da acurácia por
+        método, pois só existem para as variantes que a própria ordem mandou testar.
         """
-        try:
-            # Apenas processamento básico para velocidade
-            gray_plate = cv2.cvtColor(cropped_plate, cv2.COLOR_BGR2GRAY)
+        entries = []
+        for threshold, results in self.filter_by_thresholds(raw_results).items():
+            entry = {
+                'method': desc,
+                'threshold': threshold,
+                'text': results['combined_text'],
+                'details': results['text_details']
+            }
+            if cascade:
+                entry['cascade'] = True
+            entries.append(entry)
+        return entries
+
+    def _accepted_entry(self, entries: List[Dict]):
+        """Retorna o primeiro resultado com formato de placa válido e confiança acima do limiar da cascata"""
+        for entry in entries:
+            avg_confidence = sum(conf for _, conf in entry['details']) / len(entry['details'])
+            is_valid, _, _ = self.validate_plate_text(entry['text'])
+            if is_valid and avg_confidence >= self.cascade_min_confidence:
+                return entry, avg_confidence
+        return None
+
+    def process_plates_ocr(self, cropped_plates: List[np.ndarray], cascade: bool = None,
+                           methods: List[str] = None, engines: List[str] = None) -> List[Dict]:
+        """
+        Processa o OCR de várias placas cortadas, com todas as variantes de
+        pré-processamento reconhecidas em um único lote
 
-            # OCR direto
-            raw_results = self.reader.readtext(gray_plate)
+        Args:
+            cropped_plates: Lista de imagens de placas cortadas
+            cascade: Usar a cascata com parada antecipada (padrão: settings.OCR_CASCADE_ENABLED)
+            methods: Técnicas de pré-processamento a usar (padrão: settings.PREPROCESSING_METHODS)
+            engines: Motores extras combinados por votação com o resultado das variantes
+                     (padrão: settings.OCR_FULL_ENGINES)
 
-            best_text = ""
-            best_confidence = 0.0
+        Returns:
+            Lista de dicionários com resultados do OCR, um por placa
+        """
+        if cascade is None:
+            cascade = self.cascade_enabled
+        if cascade and random.random() < self.cascade_sample_rate:
+            # Amostra com todas as variantes: mantém a acurácia de todos os métodos medida
+            cascade = False
+        if cascade:
+            plates_results = self.process_plates_ocr_cascade(cropped_plates, methods)
+        else:
+            plates_results = self.process_plates_ocr_variants(cropped_plates, methods)
 
-            for bbox, text, score in raw_results:
-                if score > 0.3:  # Threshold mínimo
-                    clean_text = ''.join(c for c in text if c.isalnum())
-                    if len(clean_text) > len(best_text) or score > best_confidence:
-                        best_text = clean_text
-                        best_confidence = score
+        extra_engines = self.get_ocr_engines(self.full_ocr_engines if engines is None else engines)
+        if extra_engines:
+            for cropped_plate, result in zip(cropped_plates, plates_results):
+                self._combine_with_engines(result, extra_engines, cropped_plate)
 
-            return {
-                'best_text': best_text,
-                'best_confidence': best_confidence
-            }
+        return plates_results
 
-        except Exception as e:
-            return {'best_text': '', 'best_confidence': 0.0}
+    def _combine_with_engines(self, result: Dict, engines: List, cropped_plate: np.ndarray):
+        """
+        Roda os motores extras na placa e vota entre eles e a melhor leitura das variantes.
+        As leituras dos motores entram em all_results como métodos 'engine:<nome>'.
+        """
+        engines_result = run_ocr_engines(engines, cropped_plate)
+        readings = [(clean_plate_text(result['best_text']), result['best_confidence'])]
+
+        for name, reading in engines_result['engines'].items():
+            readings.append((reading['text'], reading['confidence']))
+            if reading['text']:
+                result['all_results'].append({
+                    'method': f'engine:{name}',
+                    'threshold': None,
+                    'text': reading['text'],
+                    'details': [(reading['text'], reading['confidence'])],
+                    'latency_ms': reading['latency_ms']
+                })
+
+        best_text, best_confidence = vote_readings(readings)
+        if best_text:
+            result['best_text'] = best_text
+            result['best_confidence'] = best_confidence
+
+    def process_plates_ocr_variants(self, cropped_plates: List[np.ndarray], methods: List[str] = None) -> List[Dict]:
+        """
+        OCR do EasyOCR em todas as variantes de pré-processamento de todas as placas
 
-    def save_cropped_plate(self, cropped_plate: np.ndarray, filename: str) -> str:
+        Returns:
+            Lista de dicionários com resultados do OCR, um por placa
         """
-        Salva uma imagem de placa cortada
+        variants = []
+        for plate_idx, plate_variants in enumerate(self.preprocess_images_batch(cropped_plates, methods)):
+            for desc, img in plate_variants:
+                variants.append((plate_idx, desc, img))
+
+        raw_results_per_variant = self.read_text_batch([img for _, _, img in variants])
+
+        all_results_per_plate = [[] for _ in cropped_plates]
+
+        for (plate_idx, desc, _), raw_results in zip(variants, raw_results_per_variant):
+            all_results_per_plate[plate_idx].extend(self._ocr_entries(desc, raw_results))
+
+        return [self._select_best_result(all_results) for all_results in all_results_per_plate]
+
+    def process_plates_ocr_cascade(self, cropped_plates: List[np.ndarray], methods: List[str] = None) -> List[Dict]:
+        """
+        OCR em cascata: as variantes são testadas na ordem da taxa de acerto histórica
+        e cada placa para assim que uma leitura passa na validação de formato com
+        confiança suficiente. Cada etapa reconhece em lote as placas ainda pendentes.
 
         Args:
-            cropped_plate: Imagem da placa
-            filename: Nome do arquivo
+            cropped_plates: Lista de imagens de placas cortadas
+            methods: Técnicas de pré-processamento a usar (padrão: settings.PREPROCESSING_METHODS)
 
         Returns:
-            Caminho do arquivo salvo
+            Lista de dicionários com resultados do OCR, um por placa
         """
-        # Converter para bytes
-        is_success, buffer = cv2.imencode(".jpg", cropped_plate)
-        if not is_success:
-            raise ValueError("Erro ao codificar imagem")
+        if methods is None:
+            methods = self.preprocessing_methods
 
-        # Criar arquivo Django
-        image_file = ContentFile(buffer.tobytes(), name=filename)
+        all_results_per_plate = [[] for _ in cropped_plates]
+        accepted = [None] * len(cropped_plates)
+        pending = list(range(len(cropped_plates)))
 
-        return image_file
+        # A escala de cinza é calculada uma vez e reaproveitada em todas as etapas
+        gray_plates = [cv2.cvtColor(cropped_plate, cv2.COLOR_BGR2GRAY) for cropped_plate in cropped_plates]
+
+        for desc in get_cascade_order():
+            if not pending:
+                break
+            if desc not in methods:
+                continue
 
-    def detect_plates_from_array(self, image_array):
+            images = [
+                plate_variants[0][1]
+                for plate_variants in self.preprocess_images_batch(
+                    [cropped_plates[plate_idx] for plate_idx in pending],
+                    [desc],
+                    [gray_plates[plate_idx] for plate_idx in pending]
+                )
+            ]
+            raw_results_per_plate = self.read_text_batch(images)
+
+            still_pending = []
+            for plate_idx, raw_results in zip(pending, raw_results_per_plate):
+                entries = self._ocr_entries(desc, raw_results, cascade=True)
+                all_results_per_plate[plate_idx].extend(entries)
+
+                accepted[plate_idx] = self._accepted_entry(entries)
+                if accepted[plate_idx] is None:
+                    still_pending.append(plate_idx)
+            pending = still_pending
+
+        plates_results = []
+        for all_results, accepted_entry in zip(all_results_per_plate, accepted):
+            result = self._select_best_result(all_results)
+            if accepted_entry is not None:
+                entry, avg_confidence = accepted_entry
+                result['best_text'] = entry['text']
+                result['best_confidence'] = avg_confidence
+            plates_results.append(result)
+
+        return plates_results
+
+    def process_plate_ocr(self, cropped_plate: np.ndarray) -> Dict:
+        """
+        Processa OCR em uma placa cortada
+
+        Args:
+            cropped_plate: Imagem da placa cortada
+
+        Returns:
+            Dicionário com resultados do OCR
+        """
+        return self.process_plates_ocr([cropped_plate])[0]
+
+    def save_cropped_plate(self, cropped_plate: np.ndarray, filename: str) -> str:
+        """Salva uma imagem de placa cortada (ver save_cropped_plate do módulo)"""
+        return save_cropped_plate(cropped_plate, filename)
+
+    def detect_plates_from_array(self, image_array, roi_mask=None, profile=None):
         """
         Detecta placas diretamente de um array numpy sem salvar arquivo temporário
         Args:
             image_array: Array numpy da imagem (formato BGR do OpenCV)
+            roi_mask: RoiMask opcional da fonte de vídeo (ver detect_plates_in_roi)
+            profile: PipelineProfile opcional (imgsz/conf do YOLO)
         Returns:
             Lista de dicionários com informações das placas detectadas
         """
         try:
-            # Executar detecção YOLO diretamente no array
-            results = self.model(image_array)
-
-            detected_plates = []
-
-            for result_idx, result in enumerate(results):
-                boxes = result.boxes
-
-                if len(boxes) == 0:
-                    continue
-
-                for plate_idx, box in enumerate(boxes):
-                    try:
-                        # Extrair coordenadas
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                        confidence = float(box.conf[0])
-
-                        # Adicionar padding
-                        padding = 5
-                        y1_pad = max(0, y1 - padding)
-                        y2_pad = min(image_array.shape[0], y2 + padding)
-                        x1_pad = max(0, x1 - padding)
-                        x2_pad = min(image_array.shape[1], x2 + padding)
-
-                        # Cortar placa
-                        cropped_plate = image_array[y1_pad:y2_pad, x1_pad:x2_pad].copy()
-
-                        if cropped_plate.size == 0:
-                            continue
-
-                        detected_plates.append({
-                            'plate_number': len(detected_plates) + 1,
-                            'bounding_box': {
-                                'x1': int(x1), 'y1': int(y1),
-                                'x2': int(x2), 'y2': int(y2)
-                            },
-                            'confidence': confidence,
-                            'cropped_image': cropped_plate
-                        })
-
-                    except Exception as e:
-                        logger.error(f"Erro ao processar placa {plate_idx}: {e}")
-                        continue
-
-            return detected_plates
+            if roi_mask:
+                return self.detect_plates_in_roi(image_array, roi_mask, profile)
+            return self.detect_plates_in_image(image_array, profile)
 
         except Exception as e:
             logger.error(f"Erro na detecção de placas do array: {e}")
             return []
 
-    def process_plate_ocr_fast(self, cropped_image):
+    def get_ocr_engines(self, names: List[str]) -> List:
+        """Motores de OCR pelo nome (ver ocr_engines.OCR_ENGINES), ignorando nomes desconhecidos"""
+        engines = []
+        for name in names:
+            engine = self.ocr_engines.get(name)
+            if engine is None:
+                logger.warning(f"Motor de OCR desconhecido: {name}")
+                continue
+            engines.append(engine)
+        return engines
+
+    def process_plate_ocr_fast(self, cropped_image: np.ndarray, engines: List[str] = None) -> Dict:
         """
-        Versão otimizada do OCR para processamento em tempo real
+        OCR rápido para processamento em tempo real: cada motor lê o recorte uma vez
+        (em paralelo, se houver mais de um) e as leituras são combinadas por votação
 
         Args:
             cropped_image: Imagem recortada da placa
+            engines: Motores a usar (padrão: settings.OCR_FAST_ENGINES)
 
         Returns:
-            Dicionário com o melhor texto e confiança
+            Dicionário {'best_text', 'best_confidence' (0-1), 'engines'}
         """
-        try:
-            # Converter de BGR para RGB se necessário
-            if len(cropped_image.shape) == 3:
-                rgb_image = cv2.cvtColor(cropped_image, cv2.COLOR_BGR2RGB)
-            else:
-                rgb_image = cropped_image
-
-            # Pré-processamento para melhorar OCR
-            processed_image = self.preprocess_for_ocr(rgb_image)
-
-            # Configuração do Tesseract para placas brasileiras
-            custom_config = r'--oem 3 --psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-
-            # Executar OCR
-            text = pytesseract.image_to_string(
-                Image.fromarray(processed_image),
-                config=custom_config
-            ).strip()
-
-            # Calcular confiança (implementação simplificada)
-            confidence_data = pytesseract.image_to_data(
-                Image.fromarray(processed_image),
-                config=custom_config,
-                output_type=pytesseract.Output.DICT
-            )
-
-            # Calcular confiança média
-            confidences = [int(conf) for conf in confidence_data['conf'] if int(conf) > 0]
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-
-            return {
-                'best_text': text,
-                'best_confidence': avg_confidence
-            }
-
-        except Exception as e:
-            print(f"Erro no OCR rápido: {e}")
-            return {
-                'best_text': '',
-                'best_confidence': 0.0
-            }
+        return run_ocr_engines(self.get_ocr_engines(engines or self.fast_ocr_engines), cropped_image)
 
     def preprocess_for_ocr(self, image):
         """
@@ -451,31 +1007,58 @@ class PlateDetectorService:
             return image
 
     def validate_plate_text(self, text):
-        """
-        Valida se o texto detectado segue o padrão de placas brasileiras
+        """Valida o texto de uma placa (ver validate_plate_text do módulo)"""
+        return validate_plate_text(text)
 
-        Args:
-            text: Texto detectado pelo OCR
 
-        Returns:
-            Tuple (is_valid, formatted_text, plate_type)
-        """
-        import re
+def save_cropped_plate(cropped_plate: np.ndarray, filename: str) -> str:
+    """
+    Salva uma imagem de placa cortada
 
-        # Remover espaços e caracteres especiais
-        clean_text = re.sub(r'[^A-Z0-9]', '', text.upper())
+    Args:
+        cropped_plate: Imagem da placa
+        filename: Nome do arquivo
 
-        # Padrão antigo: ABC1234
-        old_pattern = r'^[A-Z]{3}[0-9]{4}$'
+    Returns:
+        Caminho do arquivo salvo
+    """
+    # Converter para bytes
+    is_success, buffer = cv2.imencode(".jpg", cropped_plate)
+    if not is_success:
+        raise ValueError("Erro ao codificar imagem")
 
-        # Padrão Mercosul: ABC1D23
-        mercosul_pattern = r'^[A-Z]{3}[0-9][A-Z][0-9]{2}$'
+    # Criar arquivo Django
+    image_file = ContentFile(buffer.tobytes(), name=filename)
 
-        if re.match(old_pattern, clean_text):
-            formatted = f"{clean_text[:3]}-{clean_text[3:]}"
-            return True, formatted, "old"
-        elif re.match(mercosul_pattern, clean_text):
-            formatted = f"{clean_text[:3]}{clean_text[3]}{clean_text[4]}{clean_text[5:]}"
-            return True, formatted, "mercosul"
-        else:
-            return False, clean_text, "unknown"
\ No newline at end of file
+    return image_file
+
+
+def validate_plate_text(text):
+    """
+    Valida se o texto detectado segue o padrão de placas brasileiras
+
+    Args:
+        text: Texto detectado pelo OCR
+
+    Returns:
+        Tuple (is_valid, formatted_text, plate_type)
+    """
+    import re
+
+    # Remover espaços e caracteres especiais
+    clean_text = re.sub(r'[^A-Z0-9]', '', text.upper())
+
+    # Padrão antigo: ABC1234
+    old_pattern = r'^[A-Z]{3}[0-9]{4}$'
+
+    # Padrão Mercosul: ABC1D23
+    mercosul_pattern = r'^[A-Z]{3}[0-9][A-Z][0-9]{2}$'
+
+    if re.match(old_pattern, clean_text):
+        formatted = f"{clean_text[:3]}-{clean_text[3:]}"
+        return True, formatted, "old"
+    elif re.match(mercosul_pattern, clean_text):
+        formatted = f"{clean_text[:3]}{clean_text[3]}{clean_text[4]}{clean_text[5:]}"
+        return True, formatted, "mercosul"
+    else:
+        return False, clean_text, "unknown"
@@ -0,0 +1,178 @@
+import itertools
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .ocr_engines import clean_plate_text, vote_readings
+
+
+logger = logging.getLogger(__name__)
+
+
+def box_iou(box_a: Tuple[float, float, float, float], box_b: Tuple[float, float, float, float]) -> float:
+    """Interseção sobre união de duas caixas (x1, y1, x2, y2)"""
+    inter_x1 = max(box_a[0], box_b[0])
+    inter_y1 = max(box_a[1], box_b[1])
+    inter_x2 = min(box_a[2], box_b[2])
+    inter_y2 = min(box_a[3], box_b[3])
+
+    intersection = max(0.0, inter_x2 - inter_x1) * max(0.0, inter_y2 - inter_y1)
+    if intersection <= 0:
+        return 0.0
+
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return intersection / (area_a + area_b - intersection)
+
+
+def bounding_box_tuple(bounding_box: Dict) -> Tuple[float, float, float, float]:
+    return (bounding_box['x1'], bounding_box['y1'], bounding_box['x2'], bounding_box['y2'])
+
+
+class PlateTrack:
+    """Uma placa acompanhada ao longo dos frames, com as leituras de OCR acumuladas"""
+
+    def __init__(self, track_id: int, box: Tuple[float, float, float, float], timestamp: float):
+        self.track_id = track_id
+        self.box = box
+        self.velocity = (0.0, 0.0)  # Deslocamento do centro, em px/s
+        self.last_seen = timestamp
+        self.hits = 1
+
+        self.readings: List[Tuple[str, float]] = []  # (texto, confiança)
+        self.ocr_attempts = 0  # Execuções do OCR, inclusive as que não leram nenhum texto
+        self.best_quality = 0.0
+        self.best_crop = None
+
+    def predicted_box(self, timestamp: float) -> Tuple[float, float, float, float]:
+        """Posição esperada da caixa no instante informado (velocidade constante)"""
+        dt = timestamp - self.last_seen
+        dx, dy = self.velocity[0] * dt, self.velocity[1] * dt
+        x1, y1, x2, y2 = self.box
+        return (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+
+    def update(self, box: Tuple[float, float, float, float], timestamp: float):
+        dt = timestamp - self.last_seen
+        if dt > 0:
+            old_cx, old_cy = (self.box[0] + self.box[2]) / 2, (self.box[1] + self.box[3]) / 2
+            new_cx, new_cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+            measured = ((new_cx - old_cx) / dt, (new_cy - old_cy) / dt)
+            # Suavização da velocidade (as caixas do YOLO oscilam alguns pixels)
+            self.velocity = (
+                0.5 * self.velocity[0] + 0.5 * measured[0],
+                0.5 * self.velocity[1] + 0.5 * measured[1]
+            )
+        self.box = box
+        self.last_seen = timestamp
+        self.hits += 1
+
+    def add_reading(self, text: str, confidence: float):
+        clean_text = clean_plate_text(text)
+        if clean_text:
+            self.readings.append((clean_text, confidence or 0.0))
+
+    def consensus(self) -> Tuple[Optional[str], float]:
+        """
+        Combina as leituras por votação caractere a caractere, ponderada pela confiança
+
+        Returns:
+            Tupla (texto, confiança média dos caracteres vencedores) ou (None, 0.0) sem leituras
+        """
+        return vote_readings(self.readings)
+
+
+class PlateTracker:
+    """
+    Rastreador de placas por IoU com predição de movimento.
+
+    Cada caixa do YOLO é associada à trilha cuja posição prevista tem maior IoU
+    (associação gulosa, acima de settings.STREAM_TRACK_IOU_THRESHOLD); caixas sem
+    trilha criam uma nova. Trilhas não vistas por STREAM_TRACK_MAX_AGE segundos são
+    descartadas. O OCR só roda em trilhas novas ou quando o recorte melhora
+    (STREAM_TRACK_QUALITY_GAIN), até STREAM_TRACK_MAX_OCR execuções por trilha.
+    """
+
+    def __init__(self, iou_threshold: float = None, max_age: float = None,
+                 max_ocr_per_track: int = None, quality_gain: float = None):
+        self.iou_threshold = iou_threshold if iou_threshold is not None else getattr(
+            settings, 'STREAM_TRACK_IOU_THRESHOLD', 0.3)
+        self.max_age = max_age if max_age is not None else getattr(settings, 'STREAM_TRACK_MAX_AGE', 2.0)
+        self.max_ocr_per_track = max_ocr_per_track if max_ocr_per_track is not None else getattr(
+            settings, 'STREAM_TRACK_MAX_OCR', 5)
+        self.quality_gain = quality_gain if quality_gain is not None else getattr(
+            settings, 'STREAM_TRACK_QUALITY_GAIN', 1.2)
+
+        self.tracks: Dict[int, PlateTrack] = {}
+        self._ids = itertools.count(1)
+
+    def update(self, detected_plates: List[Dict], timestamp: float) -> List[Tuple[PlateTrack, Dict]]:
+        """
+        Associa as placas detectadas em um frame às trilhas existentes
+
+        Args:
+            detected_plates: Placas do YOLO ('bounding_box', 'confidence', 'cropped_image')
+            timestamp: Instante do frame (s)
+
+        Returns:
+            Lista de tuplas (trilha, placa detectada), na ordem das placas
+        """
+        # Descartar trilhas antigas
+        self.tracks = {
+            track_id: track for track_id, track in self.tracks.items()
+            if timestamp - track.last_seen <= self.max_age
+        }
+
+        boxes = [bounding_box_tuple(plate['bounding_box']) for plate in detected_plates]
+        predicted = {track_id: track.predicted_box(timestamp) for track_id, track in self.tracks.items()}
+
+        candidates = []
+        for plate_idx, box in enumerate(boxes):
+            for track_id, predicted_box in predicted.items():
+                iou = box_iou(box, predicted_box)
+                if iou >= self.iou_threshold:
+                    candidates.append((iou, plate_idx, track_id))
+        candidates.sort(reverse=True)
+
+        assigned = {}
+        used_tracks = set()
+        for iou, plate_idx, track_id in candidates:
+            if plate_idx in assigned or track_id in used_tracks:
+                continue
+            assigned[plate_idx] = track_id
+            used_tracks.add(track_id)
+
+        matches = []
+        for plate_idx, (plate, box) in enumerate(zip(detected_plates, boxes)):
+            track_id = assigned.get(plate_idx)
+            if track_id is None:
+                track = PlateTrack(next(self._ids), box, timestamp)
+                self.tracks[track.track_id] = track
+            else:
+                track = self.tracks[track_id]
+                track.update(box, timestamp)
+            matches.append((track, plate))
+
+        return matches
+
+    def needs_ocr(self, track: PlateTrack, quality: float) -> bool:
+        """
+        OCR na primeira vez que a trilha é vista e, depois, só quando o recorte é claramente
+        melhor que o anterior. O limite conta as execuções, não as leituras: uma placa que
+        o OCR nunca consegue ler não é reprocessada a cada frame.
+        """
+        if track.ocr_attempts == 0:
+            return True
+        if track.ocr_attempts >= self.max_ocr_per_track:
+            return False
+        return quality > track.best_quality * self.quality_gain
+
+    def record_crop(self, track: PlateTrack, crop, quality: float):
+        """Registra uma execução do OCR e guarda o melhor recorte da trilha (usado ao gravar a detecção)"""
+        track.ocr_attempts += 1
+        if quality > track.best_quality or track.best_crop is None:
+            track.best_quality = quality
+            track.best_crop = crop.copy()
+
+    def active_ids(self):
+        return set(self.tracks)
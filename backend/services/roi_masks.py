@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class RoiMask:
+    """
+    Polígonos (coordenadas normalizadas 0-1) em que as placas de uma fonte de vídeo são procuradas.
+
+    A detecção roda apenas no retângulo que envolve todos os polígonos; as caixas
+    cujo centro fica fora deles são descartadas. A geometria em pixels é calculada
+    uma vez por resolução de frame.
+    """
+
+    def __init__(self, polygons: Sequence[Sequence[Sequence[float]]]):
+        self.polygons = [np.array(points, dtype=np.float32) for points in polygons if len(points) >= 3]
+        self._geometry: Dict[Tuple[int, int], Tuple[Tuple[int, int, int, int], List[np.ndarray]]] = {}
+
+    def __bool__(self):
+        return bool(self.polygons)
+
+    def geometry(self, width: int, height: int) -> Tuple[Tuple[int, int, int, int], List[np.ndarray]]:
+        """
+        Retângulo envolvente e polígonos em pixels para um frame width x height
+
+        Returns:
+            Tupla ((x1, y1, x2, y2), polígonos em pixels)
+        """
+        key = (width, height)
+        geometry = self._geometry.get(key)
+        if geometry is None:
+            pixel_polygons = [polygon * np.array([width, height], dtype=np.float32) for polygon in self.polygons]
+            all_points = np.concatenate(pixel_polygons)
+            x1, y1 = np.floor(all_points.min(axis=0)).astype(int)
+            x2, y2 = np.ceil(all_points.max(axis=0)).astype(int)
+            rect = (max(0, int(x1)), max(0, int(y1)), min(width, int(x2)), min(height, int(y2)))
+            geometry = self._geometry[key] = (rect, pixel_polygons)
+        return geometry
+
+    @staticmethod
+    def contains(pixel_polygons: List[np.ndarray], point: Tuple[float, float]) -> bool:
+        return any(cv2.pointPolygonTest(polygon, point, False) >= 0 for polygon in pixel_polygons)
+
+
+class RoiRegistry:
+    """
+    Cache em memória das regiões de interesse ativas de cada fonte de vídeo (RegionOfInterest).
+
+    Cada fonte é consultada no banco no máximo uma vez a cada settings.STREAM_ROI_CACHE_SECONDS;
+    os sinais post_save/post_delete de RegionOfInterest limpam o cache (ver backend/signals.py).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._masks: Dict[str, Tuple[Optional[RoiMask], float]] = {}
+
+    def needs_refresh(self, source_key: str) -> bool:
+        """True se a próxima chamada a get consultará o banco (cache ausente ou expirado)"""
+        ttl = getattr(settings, 'STREAM_ROI_CACHE_SECONDS', 30.0)
+        with self._lock:
+            cached = self._masks.get(source_key)
+        return cached is None or time.monotonic() - cached[1] >= ttl
+
+    def get(self, source_key: str) -> Optional[RoiMask]:
+        """
+        Máscara da fonte ou None (sem regiões cadastradas: o frame inteiro é usado)
+
+        Args:
+            source_key: Identificador da fonte ('webcam:<id>' ou 'mjpeg:<url>')
+        """
+        ttl = getattr(settings, 'STREAM_ROI_CACHE_SECONDS', 30.0)
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._masks.get(source_key)
+        if cached is not None and now - cached[1] < ttl:
+            return cached[0]
+
+        from backend.models import RegionOfInterest
+
+        try:
+            polygons = list(
+                RegionOfInterest.objects.filter(source_key=source_key, enabled=True).values_list('points', flat=True)
+            )
+        except Exception as e:
+            logger.error(f"Erro ao carregar as regiões de interesse de {source_key}: {e}")
+            # Mantém a máscara anterior até a próxima tentativa
+            polygons = None
+
+        if polygons is None:
+            mask = cached[0] if cached else None
+        else:
+            mask = RoiMask(polygons) or None
+            if mask:
+                logger.info(f"{len(mask.polygons)} região(ões) de interesse carregada(s) para {source_key}")
+
+        with self._lock:
+            self._masks[source_key] = (mask, now)
+        return mask
+
+    def invalidate(self):
+        with self._lock:
+            self._masks.clear()
+
+
+roi_registry = RoiRegistry()
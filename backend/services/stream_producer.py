@@ -0,0 +1,792 @@
+import hashlib
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import cv2
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections
+
+from .crop_quality import assess_crop, crop_quality_enabled, record_skipped_crop
+from .detection_pipeline import match_known_plate, read_plates, save_stream_detection
+from .inference_scheduler import PRIORITY_LIVE, inference_scheduler
+from .metrics import metrics
+from .model_registry import model_registry
+from .motion_gate import MotionGate
+from .pipeline_profiles import PERSIST_KNOWN, PERSIST_NONE, get_profile, stream_profile_name
+from .plate_tracker import PlateTracker
+from .roi_masks import roi_registry
+
+
+logger = logging.getLogger(__name__)
+
+# Gravação das detecções do stream fora da thread de captura
+_persist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stream-persist')
+
+
+class StreamSourceError(Exception):
+    """A fonte de vídeo não pôde ser aberta"""
+
+
+def make_source_key(source_type: str, camera_id=0, mjpeg_url: str = None) -> str:
+    """Identificador da fonte de vídeo: 'webcam:<id>' ou 'mjpeg:<url>'"""
+    if source_type == 'webcam':
+        return f"webcam:{camera_id}"
+    if source_type == 'mjpeg':
+        return f"mjpeg:{mjpeg_url}"
+    raise StreamSourceError(f"Tipo de fonte de vídeo desconhecido: {source_type}")
+
+
+def scale_bounding_box(bounding_box: Dict, scale: float) -> Dict:
+    """Converte uma caixa da resolução da captura para a do frame exibido"""
+    if scale == 1.0:
+        return bounding_box
+    return {key: int(round(value * scale)) for key, value in bounding_box.items()}
+
+
+class LatestFrameGrabber:
+    """
+    Lê a fonte continuamente em uma thread própria e mantém apenas o frame mais recente.
+
+    Assim o buffer da câmera / socket MJPEG nunca acumula frames enquanto a detecção
+    roda: o processamento sempre pega o frame mais novo e os intermediários são descartados.
+    """
+
+    def __init__(self, cap, name: str):
+        self.cap = cap
+        self.name = name
+        self.running = False
+        self.failed = False
+        self.thread = None
+        self._condition = threading.Condition()
+        self._frame = None
+        self._captured_at = 0.0
+        self._sequence = 0
+        self._consumed_sequence = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"grabber-{self.name}")
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=3)
+            if self.thread.is_alive():
+                logger.warning("Thread de captura não finalizou no tempo esperado.")
+        self.thread = None
+
+    def _run(self):
+        while self.running:
+            try:
+                ret, frame = self.cap.read()
+            except cv2.error as e:
+                logger.error(f"Erro OpenCV na captura: {e}. Tentando continuar...")
+                time.sleep(1)
+                continue
+
+            captured_at = time.time()
+
+            with self._condition:
+                if not ret or frame is None:
+                    self.failed = True
+                    self._condition.notify_all()
+                    break
+
+                if self._sequence > self._consumed_sequence:
+                    # O frame anterior foi substituído sem ser processado
+                    metrics.increment('stream', 'dropped_frames')
+
+                self._frame = frame
+                self._captured_at = captured_at
+                self._sequence += 1
+                self._condition.notify_all()
+
+        self.running = False
+
+    def latest(self, after_sequence: int, timeout: float = 1.0):
+        """
+        Aguarda um frame mais novo que 'after_sequence'
+
+        Returns:
+            Tupla (sequência, frame, momento da captura) ou None (tempo esgotado ou captura encerrada)
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._sequence > after_sequence or self.failed or not self.running,
+                timeout
+            )
+            if self._sequence <= after_sequence:
+                return None
+            self._consumed_sequence = self._sequence
+            return self._sequence, self._frame, self._captured_at
+
+
+class AdaptiveDetectionScheduler:
+    """
+    Decide quando enviar um frame para a inferência, conforme o custo medido.
+
+    O intervalo entre detecções acompanha a duração média da inferência (média móvel
+    exponencial) de forma que o worker fique ocupado no máximo a fração
+    settings.STREAM_DETECTION_MAX_LOAD do tempo, limitado a
+    [STREAM_DETECTION_MIN_INTERVAL, STREAM_DETECTION_MAX_INTERVAL] segundos.
+    """
+
+    def __init__(self):
+        self.max_load = min(1.0, max(0.05, getattr(settings, 'STREAM_DETECTION_MAX_LOAD', 0.5)))
+        self.min_interval = getattr(settings, 'STREAM_DETECTION_MIN_INTERVAL', 0.2)
+        self.max_interval = getattr(settings, 'STREAM_DETECTION_MAX_INTERVAL', 2.0)
+        self.average_duration = None
+        self.last_submitted_at = 0.0
+
+    @property
+    def interval(self) -> float:
+        if self.average_duration is None:
+            return self.min_interval
+        # Ocupação = duração / (duração + pausa) <= max_load
+        pause = self.average_duration * (1.0 / self.max_load - 1.0)
+        return min(self.max_interval, max(self.min_interval, self.average_duration + pause))
+
+    def should_submit(self, now: float, worker_busy: bool) -> bool:
+        return not worker_busy and now - self.last_submitted_at >= self.interval
+
+    def submitted(self, now: float):
+        self.last_submitted_at = now
+
+    def record(self, duration: float):
+        if self.average_duration is None:
+            self.average_duration = duration
+        else:
+            self.average_duration = 0.7 * self.average_duration + 0.3 * duration
+
+
+class StreamProducer:
+    """
+    Captura, detecção e codificação de uma fonte de vídeo, feitas uma única vez
+    e distribuídas pelo channel layer a todos os consumers que assistem a fonte.
+
+    Os consumers entram no grupo 'group_name' e recebem as mensagens 'stream.frame',
+    'stream.detection_saved' e 'stream.error'. O produtor é criado e encerrado pelo
+    StreamProducerRegistry, conforme a quantidade de espectadores.
+    """
+
+    def __init__(self, key: str, source_type: str, camera_id=0, mjpeg_url: str = None, user=None,
+                 profile: str = None):
+        self.key = key
+        # Nomes de grupo aceitam apenas caracteres ASCII simples e até 100 caracteres
+        self.group_name = f"stream_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]}"
+        self.source_type = source_type
+        self.camera_id = camera_id
+        self.mjpeg_url = mjpeg_url
+        self.user = user  # Dono das detecções gravadas (usuário que abriu a fonte)
+        self.description = key
+        # Perfil do pipeline: o pedido pelo espectador, o configurado para a fonte ou o padrão do stream
+        self.profile = get_profile(profile or stream_profile_name(key), 'stream')
+
+        self.cap = None
+        self.grabber = None
+        self.running = False
+        self.thread = None
+        self.target_fps = getattr(settings, 'STREAM_TARGET_FPS', 15)
+        # A detecção usa o frame na resolução da captura; apenas o frame enviado é reduzido
+        self.display_width = getattr(settings, 'STREAM_DISPLAY_WIDTH', 640)
+        self.display_scale = 1.0
+        self._start_lock = threading.Lock()
+        self._viewers_lock = threading.Lock()
+        self._viewers = {}  # channel_name -> detecção habilitada
+
+        self.plate_detector_ready = False
+        self.frame_count = 0
+
+        # Inferência em um worker separado: fila de tamanho 1 (o frame mais antigo é descartado)
+        self.inference_thread = None
+        self._inference_queue = queue.Queue(maxsize=1)
+        self._inference_busy = False
+        self.scheduler = AdaptiveDetectionScheduler()
+        # Filtro de movimento: cenas paradas não vão para a inferência
+        self.motion_gate = MotionGate() if getattr(settings, 'STREAM_MOTION_GATE_ENABLED', True) else None
+        self._result_lock = threading.Lock()
+        self.latest_result = None  # (frame_id, placas, momento da conclusão)
+        self.overlay_max_age = getattr(settings, 'STREAM_OVERLAY_MAX_AGE', 1.0)
+
+        self.roi_enabled = getattr(settings, 'STREAM_ROI_ENABLED', True)
+
+        # Trilhas das placas entre frames: OCR só em placas novas ou com recorte melhor
+        self.tracker = PlateTracker()
+
+        # Gravação das detecções do stream (no máximo uma por intervalo)
+        self.persist_enabled = getattr(settings, 'STREAM_PERSIST_DETECTIONS', True)
+        self.persist_min_interval = getattr(settings, 'STREAM_PERSIST_MIN_INTERVAL', 5.0)
+        self.persist_dedup_seconds = getattr(settings, 'STREAM_PERSIST_DEDUP_SECONDS', 60.0)
+        self.is_persisting = False
+        self.last_persist_time = 0
+        self.persisted_plate_times = {}  # texto da placa -> momento da última gravação
+        self.persisted_track_ids = set()  # Trilhas já gravadas (uma gravação por veículo)
+
+    # Espectadores
+
+    def add_viewer(self, channel_name: str, detection_enabled: bool = True):
+        with self._viewers_lock:
+            self._viewers[channel_name] = detection_enabled
+
+    def remove_viewer(self, channel_name: str) -> int:
+        """Remove um espectador e retorna quantos restam"""
+        with self._viewers_lock:
+            self._viewers.pop(channel_name, None)
+            return len(self._viewers)
+
+    def set_viewer_detection(self, channel_name: str, enabled: bool):
+        with self._viewers_lock:
+            if channel_name in self._viewers:
+                self._viewers[channel_name] = enabled
+
+    def set_profile(self, name: str):
+        """
+        Troca o perfil do pipeline da fonte (vale para todos os espectadores)
+
+        Raises:
+            UnknownProfileError: Perfil inexistente
+        """
+        self.profile = get_profile(name, 'stream')
+        logger.info(f"Perfil do pipeline de {self.description}: {self.profile.name}")
+
+    @property
+    def detection_enabled(self) -> bool:
+        """A detecção roda enquanto ao menos um espectador a mantiver habilitada"""
+        with self._viewers_lock:
+            return any(self._viewers.values())
+
+    # Ciclo de vida
+
+    def ensure_started(self):
+        """Abre a fonte e inicia a thread de captura, se ainda não estiverem ativas"""
+        with self._start_lock:
+            if self.running:
+                return
+
+            try:
+                model_registry.warm_up()
+                self.plate_detector_ready = True
+            except Exception as e:
+                logger.error(f"Erro ao inicializar detector para {self.description}: {e}")
+                self.plate_detector_ready = False
+
+            self._open_capture()
+            self.grabber = LatestFrameGrabber(self.cap, self.group_name)
+            self.grabber.start()
+
+            self.running = True
+            self.frame_count = 0
+            self.latest_result = None
+            self.inference_thread = threading.Thread(
+                target=self._inference_loop, daemon=True, name=f"inference-{self.group_name}"
+            )
+            self.inference_thread.start()
+            self.thread = threading.Thread(target=self._run, daemon=True, name=f"stream-{self.group_name}")
+            self.thread.start()
+
+    def _open_capture(self):
+        """Abre o cv2.VideoCapture da fonte (levanta StreamSourceError se não for possível)"""
+        self.cap = None
+
+        if self.source_type == 'webcam':
+            self.description = f"Webcam ID {self.camera_id}"
+            camera_ids_to_try = [self.camera_id, 0, 1, 2, -1]  # Lógica original para encontrar webcam
+            for cam_id_attempt in camera_ids_to_try:
+                logger.info(f"Tentando webcam ID: {cam_id_attempt}")
+                cap_test = None
+                try:
+                    cap_test = cv2.VideoCapture(cam_id_attempt)
+                    if not cap_test.isOpened():  # Tentar com CAP_DSHOW se falhar
+                        cap_test.release()
+                        cap_test = cv2.VideoCapture(cam_id_attempt, cv2.CAP_DSHOW)
+
+                    if cap_test.isOpened():
+                        ret, frame = cap_test.read()
+                        if ret and frame is not None:
+                            self.cap = cap_test
+                            self.description = f"Webcam {cam_id_attempt}"
+                            logger.info(f"Webcam {cam_id_attempt} funcionando!")
+                            break
+                    cap_test.release()
+                except Exception as e:
+                    logger.warning(f"Erro ao tentar webcam {cam_id_attempt}: {e}")
+                    if cap_test:
+                        cap_test.release()  # Garante a liberação
+                    continue
+
+        elif self.source_type == 'mjpeg':
+            self.description = f"MJPEG stream de {self.mjpeg_url}"
+            logger.info(f"Tentando conectar ao MJPEG stream: {self.mjpeg_url}")
+            try:
+                self.cap = cv2.VideoCapture(self.mjpeg_url)
+            except Exception as e:
+                logger.error(f"Exceção ao tentar abrir MJPEG stream {self.mjpeg_url}: {e}")
+                self.cap = None
+
+        if not self.cap or not self.cap.isOpened():
+            error_message = f"Não foi possível acessar {self.description}."
+            if self.source_type == 'mjpeg':
+                error_message += " Verifique o URL e as credenciais, se aplicável."
+            if self.cap:
+                self.cap.release()  # Libera o recurso se foi parcialmente aberto
+            self.cap = None
+            raise StreamSourceError(error_message)
+
+        # Configurações da câmera (podem não se aplicar a todos os streams MJPEG)
+        try:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, getattr(settings, 'STREAM_CAPTURE_WIDTH', 1280))
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, getattr(settings, 'STREAM_CAPTURE_HEIGHT', 720))
+            self.cap.set(cv2.CAP_PROP_FPS, 15)
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        except Exception as e:
+            logger.warning(
+                f"Aviso: Algumas configurações de câmera podem não ser aplicáveis ao stream {self.description}: {e}")
+
+    def stop(self):
+        """Encerra a thread de captura e libera a fonte"""
+        logger.info(f"Parando stream de vídeo {self.description}...")
+        self.running = False
+
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=3)
+            if self.thread.is_alive():
+                logger.warning("Thread do stream não finalizou no tempo esperado.")
+        self.thread = None
+
+        if self.inference_thread and self.inference_thread.is_alive():
+            self.inference_thread.join(timeout=3)
+            if self.inference_thread.is_alive():
+                logger.warning("Thread de inferência não finalizou no tempo esperado.")
+        self.inference_thread = None
+
+        if self.grabber:
+            self.grabber.stop()
+            self.grabber = None
+
+        if self.cap:
+            try:
+                self.cap.release()
+            except Exception as e:
+                logger.error(f"Erro ao liberar captura de vídeo: {e}")
+            self.cap = None
+
+        logger.info(f"Stream de vídeo {self.description} parado e recursos liberados.")
+
+    # Distribuição
+
+    def _broadcast(self, message: Dict):
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            async_to_sync(channel_layer.group_send)(self.group_name, message)
+        except Exception as e:
+            logger.error(f"Erro ao distribuir mensagem do stream {self.description}: {e}")
+
+    def _run(self):
+        logger.info(f"Iniciando loop do stream {self.description} com detecção de placas...")
+        grabber = self.grabber
+        last_sequence = 0
+        frame_interval = 1.0 / self.target_fps
+        next_frame_at = time.monotonic()
+
+        while self.running:
+            try:
+                latest = grabber.latest(last_sequence, timeout=1.0)
+                if latest is None:
+                    if grabber.failed or not grabber.running:
+                        logger.warning("Não foi possível ler frame do stream. Encerrando loop.")
+                        self._broadcast({'type': 'stream.error', 'message': "Perda de conexão com o stream de vídeo."})
+                        break
+                    continue
+
+                last_sequence, frame, captured_at = latest
+
+                self.frame_count += 1
+
+                # Frame reduzido para exibição; o frame da captura segue inteiro para a detecção
+                height, width = frame.shape[:2]
+                if width > self.display_width:
+                    self.display_scale = self.display_width / width
+                    display_frame = cv2.resize(
+                        frame, (self.display_width, int(height * self.display_scale)), interpolation=cv2.INTER_AREA
+                    )
+                else:
+                    self.display_scale = 1.0
+                    display_frame = frame.copy()  # Trabalhar com uma cópia para desenhar
+
+                # A detecção roda no worker de inferência; aqui só se envia o frame quando o
+                # escalonador permite e se desenha o resultado mais recente
+                now = time.monotonic()
+                if (self.detection_enabled and self.plate_detector_ready and
+                        self.scheduler.should_submit(now, self._inference_busy)):
+                    if self.motion_gate_allows(display_frame):
+                        self.submit_for_inference(self.frame_count, frame)
+                        self.scheduler.submitted(now)
+
+                detected_plates_info = self.current_overlay()
+
+                if detected_plates_info:  # Usar o resultado da detecção mais recente
+                    display_frame = self.draw_plate_detections(display_frame, detected_plates_info, self.display_scale)
+
+                success, buffer = cv2.imencode('.jpg', display_frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+                if not success:
+                    logger.warning("Falha ao encodar frame para JPEG.")
+                    continue
+
+                # Codificado uma única vez para todos os espectadores; cada consumer envia
+                # os bytes do JPEG como mensagem binária ou em base64 (clientes antigos).
+                # 'timestamp' é o momento da captura, para medir a latência até a exibição.
+                self._broadcast({
+                    'type': 'stream.frame',
+                    'frame_id': self.frame_count,
+                    'jpeg': buffer.tobytes(),
+                    'plates': self.plates_payload(detected_plates_info, self.display_scale),
+                    'timestamp': captured_at
+                })
+                metrics.record_timing('stream', 'capture_to_send', time.time() - captured_at)
+
+                # Controlar FPS: aguarda até o próximo instante da cadência, descontando o processamento
+                next_frame_at += frame_interval
+                delay = next_frame_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Atrasado: recomeça a cadência em vez de tentar recuperar os frames perdidos
+                    next_frame_at = time.monotonic()
+
+            except cv2.error as e:  # Erros específicos do OpenCV
+                logger.error(f"Erro OpenCV no loop do stream: {e}. Tentando continuar...")
+                time.sleep(1)  # Pausa antes de tentar o próximo frame
+                continue  # Tenta continuar o loop se possível
+            except Exception as e:
+                logger.error(f"Erro inesperado no loop do stream: {e}")
+                self._broadcast({'type': 'stream.error', 'message': f"Erro no processamento do stream: {str(e)}"})
+                break  # Encerra o loop em caso de erro grave
+
+        self.running = False
+        logger.info(f"Loop do stream {self.description} finalizado.")
+
+    # Inferência
+
+    def submit_for_inference(self, frame_id: int, frame):
+        """Envia um frame ao worker de inferência, descartando o que ainda estiver na fila"""
+        # Sem cópia: os desenhos são feitos no frame de exibição e o grabber não reaproveita os arrays
+        item = (frame_id, frame)
+        try:
+            self._inference_queue.put_nowait(item)
+        except queue.Full:
+            try:
+                self._inference_queue.get_nowait()
+                metrics.increment('stream', 'inference_dropped_frames')
+            except queue.Empty:
+                pass
+            try:
+                self._inference_queue.put_nowait(item)
+            except queue.Full:
+                pass
+
+    def motion_gate_allows(self, frame) -> bool:
+        """Consulta o filtro de movimento e publica a taxa de frames descartados"""
+        if self.motion_gate is None:
+            return True
+
+        allowed = self.motion_gate.should_detect(frame)
+        metrics.increment('stream', 'motion_passed' if allowed else 'motion_skipped')
+        metrics.set_gauge('motion_skip_ratio', self.group_name, round(self.motion_gate.skip_ratio, 4))
+        return allowed
+
+    def _inference_loop(self):
+        while self.running:
+            try:
+                frame_id, frame = self._inference_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            self._inference_busy = True
+            start = time.perf_counter()
+            try:
+                detected_plates_info = self.detect_plates_in_frame(frame)
+            finally:
+                duration = time.perf_counter() - start
+                self._inference_busy = False
+
+            self.scheduler.record(duration)
+            metrics.record_timing('stream', 'inference', duration)
+
+            with self._result_lock:
+                self.latest_result = (frame_id, detected_plates_info, time.monotonic())
+
+            # Placas enviadas assim que ficam prontas, com o id do frame em que foram detectadas
+            self._broadcast({
+                'type': 'stream.plates',
+                'frame_id': frame_id,
+                'plates': self.plates_payload(detected_plates_info, self.display_scale),
+                'timestamp': time.time()
+            })
+
+            if detected_plates_info and self.persist_enabled:
+                self.schedule_persist(frame, detected_plates_info)
+
+    def current_overlay(self) -> List[Dict]:
+        """Placas da detecção mais recente, enquanto não forem antigas demais para desenhar"""
+        with self._result_lock:
+            if self.latest_result is None:
+                return []
+            _, detected_plates_info, completed_at = self.latest_result
+        if time.monotonic() - completed_at > self.overlay_max_age:
+            return []
+        return detected_plates_info
+
+    # Detecção
+
+    def detect_plates_in_frame(self, frame_to_detect):
+        if not self.plate_detector_ready:
+            return []
+        try:
+            # Prioridade máxima no agendador: o YOLO e o OCR do stream passam na frente dos uploads
+            with inference_scheduler.priority(PRIORITY_LIVE), model_registry.borrow() as plate_detector:
+                return self._detect_plates_with(plate_detector, frame_to_detect)
+        except Exception as e_detect:
+            logger.error(f"Erro na detecção de placas (detect_plates_from_array): {e_detect}")
+            time.sleep(0.2)  # Evitar loops rápidos de erro
+            return []
+
+    def _roi_mask(self):
+        if not roi_registry.needs_refresh(self.key):
+            return roi_registry.get(self.key)
+
+        # Thread de longa duração: como em _persist, descarta conexões quebradas ou expiradas
+        # antes e depois da consulta ao banco
+        close_old_connections()
+        try:
+            return roi_registry.get(self.key)
+        finally:
+            close_old_connections()
+
+    def _detect_plates_with(self, plate_detector, frame_to_detect):
+        # Regiões de interesse da fonte (cache em memória, recarregado periodicamente)
+        roi_mask = self._roi_mask() if self.roi_enabled else None
+        profile = self.profile
+        detected_plates_yolo = plate_detector.detect_plates_from_array(frame_to_detect, roi_mask, profile)
+        now = time.monotonic()
+
+        plates_with_text_and_info = []
+        for track, plate_info_yolo in self.tracker.update(detected_plates_yolo, now):
+            try:
+                cropped_img = plate_info_yolo.get('cropped_image')
+                if cropped_img is None or cropped_img.size == 0:
+                    continue
+
+                # Nitidez, tamanho e proporção do recorte; recortes ruins ficam para um frame melhor da trilha
+                crop_quality = assess_crop(cropped_img)
+                quality = crop_quality.score
+
+                if not crop_quality.acceptable and crop_quality_enabled() and profile.quality_gate:
+                    record_skipped_crop(crop_quality)
+                elif self.tracker.needs_ocr(track, quality):
+                    # Conta a tentativa antes do OCR: uma falha também consome o limite da trilha
+                    self.tracker.record_crop(track, cropped_img, quality)
+                    ocr_result = read_plates(plate_detector, [cropped_img], profile)[0]
+                    metrics.increment('stream', 'ocr_runs')
+                    if ocr_result and ocr_result.get('best_text'):
+                        track.add_reading(ocr_result['best_text'], ocr_result.get('best_confidence', 0.0))
+                else:
+                    metrics.increment('stream', 'ocr_skipped_tracked')
+
+                # Texto estável da trilha: votação por caractere entre todas as leituras
+                text, ocr_confidence = track.consensus()
+                if not text:
+                    continue
+
+                is_valid, formatted_text, plate_type = plate_detector.validate_plate_text(text)
+
+                plates_with_text_and_info.append({
+                    'track_id': track.track_id,
+                    'bounding_box': plate_info_yolo['bounding_box'],
+                    'confidence': plate_info_yolo['confidence'],  # Confiança YOLO
+                    'text': text,
+                    'formatted_text': formatted_text if is_valid else text,
+                    'ocr_confidence': ocr_confidence,
+                    'is_valid': is_valid,
+                    'plate_type': plate_type if is_valid else 'unknown',
+                    'timestamp': time.time(),  # Timestamp da detecção
+                    'cropped_image': track.best_crop,  # Usado apenas na gravação (não é enviado ao cliente)
+                    'quality_score': track.best_quality
+                })
+            except Exception as e_ocr:
+                logger.error(f"Erro no processamento OCR de uma placa: {e_ocr}")
+                continue
+
+        return plates_with_text_and_info
+
+    def draw_plate_detections(self, frame, detected_plates_info, scale: float = 1.0):
+        for plate in detected_plates_info:
+            # As caixas estão na resolução da captura
+            bbox = scale_bounding_box(plate['bounding_box'], scale)
+            color = (0, 255, 0) if plate.get('is_valid', False) else (
+            0, 0, 255)  # Verde para válida, Vermelho para inválida/desconhecida
+
+            cv2.rectangle(frame, (bbox['x1'], bbox['y1']), (bbox['x2'], bbox['y2']), color, 2)
+
+            text_to_display = plate.get('formatted_text', plate.get('text', 'N/A'))
+            ocr_conf_text = f"OCR: {plate.get('ocr_confidence', 0) * 100:.1f}%" if plate.get(
+                'ocr_confidence') is not None else "OCR: N/A"
+            yolo_conf_text = f"YOLO: {plate.get('confidence', 0) * 100:.1f}%" if plate.get(
+                'confidence') is not None else "YOLO: N/A"
+
+            # Posição para o texto da placa (acima do bbox)
+            (text_width, text_height), baseline = cv2.getTextSize(text_to_display, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+            cv2.rectangle(frame, (bbox['x1'], bbox['y1'] - text_height - baseline - 5),
+                          (bbox['x1'] + text_width, bbox['y1'] - 5), color, -1)
+            cv2.putText(frame, text_to_display, (bbox['x1'], bbox['y1'] - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+            # Posição para confianças (abaixo do bbox)
+            cv2.putText(frame, ocr_conf_text, (bbox['x1'], bbox['y2'] + 15),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+            cv2.putText(frame, yolo_conf_text, (bbox['x1'], bbox['y2'] + 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+        return frame
+
+    @staticmethod
+    def plates_payload(detected_plates_info, scale: float = 1.0) -> List[Dict]:
+        """Representação das placas enviada aos clientes (caixas na resolução do frame exibido)"""
+        return [
+            {
+                'text': plate.get('formatted_text', plate.get('text')),
+                'confidence': plate.get('ocr_confidence', 0.0),
+                # Enviar confiança do OCR como 'confidence' principal para UI
+                'yolo_confidence': plate.get('confidence', 0.0),  # Confiança da detecção YOLO
+                'is_valid': plate.get('is_valid', False),
+                'plate_type': plate.get('plate_type', 'unknown'),
+                'bounding_box': scale_bounding_box(plate['bounding_box'], scale),
+                'track_id': plate.get('track_id')
+            }
+            for plate in detected_plates_info
+        ]
+
+    # Gravação
+
+    def schedule_persist(self, frame, detected_plates_info):
+        """
+        Agenda a gravação das placas lidas (PlateDetection + DetectedPlate), sem reprocessar o frame.
+        Limita a uma gravação por STREAM_PERSIST_MIN_INTERVAL e ignora placas já gravadas
+        nos últimos STREAM_PERSIST_DEDUP_SECONDS.
+        """
+        current_time = time.time()
+        if self.is_persisting or current_time - self.last_persist_time < self.persist_min_interval:
+            return
+
+        self.persisted_plate_times = {
+            text: saved_at for text, saved_at in self.persisted_plate_times.items()
+            if current_time - saved_at < self.persist_dedup_seconds
+        }
+        self.persisted_track_ids &= self.tracker.active_ids()
+        profile = self.profile
+        if profile.persist == PERSIST_NONE:
+            return
+
+        plates_to_save = [
+            plate for plate in detected_plates_info
+            if plate.get('track_id') not in self.persisted_track_ids
+            and plate.get('formatted_text', plate['text']) not in self.persisted_plate_times
+        ]
+        if profile.persist == PERSIST_KNOWN:
+            # Busca no índice em memória: só placas conhecidas são gravadas
+            plates_to_save = [
+                plate for plate in plates_to_save
+                if match_known_plate(plate['text'], profile.match_threshold)[0]
+            ]
+        if not plates_to_save:
+            return
+
+        self.is_persisting = True
+        self.last_persist_time = current_time
+        _persist_executor.submit(self._persist, frame, plates_to_save, current_time, profile)
+
+    def _persist(self, frame, plates_to_save, detected_at, profile):
+        try:
+            saved = save_stream_detection(frame, plates_to_save, self.user, profile)
+
+            for plate in plates_to_save:
+                self.persisted_plate_times[plate.get('formatted_text', plate['text'])] = detected_at
+                self.persisted_track_ids.add(plate.get('track_id'))
+
+            self._broadcast({
+                'type': 'stream.detection_saved',
+                'detection_id': str(saved['detection'].id),
+                'plates': saved['plates']
+            })
+        except Exception as e:
+            logger.error(f"Erro ao gravar detecção do stream: {e}", exc_info=True)
+        finally:
+            self.is_persisting = False
+            close_old_connections()
+
+
+class StreamProducerRegistry:
+    """
+    Produtores ativos do processo, um por fonte de vídeo, com contagem de espectadores.
+    O produtor é criado pelo primeiro espectador e encerrado quando o último sai.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._producers: Dict[str, StreamProducer] = {}
+
+    def acquire(self, channel_name: str, source_type: str, camera_id=0, mjpeg_url: str = None,
+                detection_enabled: bool = True, user=None, profile: str = None) -> StreamProducer:
+        """
+        Registra um espectador na fonte, iniciando o produtor se necessário
+
+        Args:
+            profile: Perfil do pipeline de um produtor novo (um produtor já ativo mantém o seu;
+                     use StreamProducer.set_profile para trocá-lo)
+
+        Returns:
+            StreamProducer da fonte (levanta StreamSourceError se a fonte não abrir)
+        """
+        key = make_source_key(source_type, camera_id, mjpeg_url)
+
+        with self._lock:
+            producer = self._producers.get(key)
+            if producer is None or (producer.thread is not None and not producer.running):
+                producer = StreamProducer(key, source_type, camera_id, mjpeg_url, user, profile)
+                self._producers[key] = producer
+            producer.add_viewer(channel_name, detection_enabled)
+
+        # Abrir a fonte pode demorar: fora do lock global (espectadores da mesma fonte aguardam o produtor)
+        try:
+            producer.ensure_started()
+        except Exception:
+            self.release(producer, channel_name)
+            raise
+
+        return producer
+
+    def release(self, producer: StreamProducer, channel_name: str):
+        """Remove um espectador; o produtor é encerrado quando não resta nenhum"""
+        with self._lock:
+            remaining = producer.remove_viewer(channel_name)
+            if remaining == 0 and self._producers.get(producer.key) is producer:
+                del self._producers[producer.key]
+
+        if remaining == 0:
+            producer.stop()
+
+    def get(self, source_type: str, camera_id=0, mjpeg_url: str = None) -> Optional[StreamProducer]:
+        with self._lock:
+            return self._producers.get(make_source_key(source_type, camera_id, mjpeg_url))
+
+
+stream_producers = StreamProducerRegistry()
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from typing import Tuple
+
+import numpy as np
+import pytesseract
+from django.conf import settings
+from PIL import Image
+
+from .metrics import metrics
+
+try:
+    import tesserocr
+except ImportError:  # Binding opcional (pip install tesserocr); sem ele, usa o executável via pytesseract
+    tesserocr = None
+
+
+logger = logging.getLogger(__name__)
+pytesseract.pytesseract.tesseract_cmd = getattr(
+    settings, 'TESSERACT_CMD', r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+)
+
+# Caracteres possíveis em placas brasileiras (antigas e Mercosul)
+PLATE_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+# Uma palavra por imagem (--psm 8), motor LSTM ou legado (--oem 3)
+PYTESSERACT_CONFIG = f'--oem 3 --psm 8 -c tessedit_char_whitelist={PLATE_ALPHABET}'
+
+# Uma instância inicializada do Tesseract por thread (a API do tesserocr não é thread-safe)
+_engines = threading.local()
+
+
+def use_tesserocr() -> bool:
+    """settings.TESSERACT_BACKEND: 'auto' (tesserocr se instalado), 'tesserocr' ou 'pytesseract'"""
+    backend = getattr(settings, 'TESSERACT_BACKEND', 'auto')
+    if backend == 'pytesseract':
+        return False
+    if tesserocr is None:
+        if backend == 'tesserocr':
+            logger.warning("TESSERACT_BACKEND='tesserocr', mas o pacote tesserocr não está instalado. Usando pytesseract.")
+        return False
+    return True
+
+
+def _thread_engine():
+    """API do tesserocr da thread atual, inicializada (modelo carregado) uma única vez"""
+    engine = getattr(_engines, 'api', None)
+    if engine is None:
+        options = {'lang': getattr(settings, 'TESSERACT_LANG', 'eng'), 'psm': tesserocr.PSM.SINGLE_WORD}
+        tessdata_path = getattr(settings, 'TESSDATA_PATH', None)
+        if tessdata_path:
+            options['path'] = tessdata_path
+        engine = tesserocr.PyTessBaseAPI(**options)
+        engine.SetVariable('tessedit_char_whitelist', PLATE_ALPHABET)
+        _engines.api = engine
+        logger.info(f"Tesseract (tesserocr) inicializado na thread {threading.current_thread().name}")
+    return engine
+
+
+def _read_with_tesserocr(image: np.ndarray) -> Tuple[str, float]:
+    engine = _thread_engine()
+    image = np.ascontiguousarray(image)
+    height, width = image.shape[:2]
+    bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+
+    # Os pixels são passados diretamente, sem conversão para PIL
+    engine.SetImageBytes(image.tobytes(), width, height, bytes_per_pixel, width * bytes_per_pixel)
+    text = engine.GetUTF8Text().strip()
+    confidences = [confidence for confidence in engine.AllWordConfidences() if confidence > 0]
+    engine.Clear()
+
+    return text, (sum(confidences) / len(confidences) if confidences else 0)
+
+
+def _read_with_pytesseract(image: np.ndarray) -> Tuple[str, float]:
+    # Uma única chamada (um processo do Tesseract) retorna as palavras e as confianças
+    data = pytesseract.image_to_data(
+        Image.fromarray(image),
+        config=PYTESSERACT_CONFIG,
+        output_type=pytesseract.Output.DICT
+    )
+
+    words = []
+    confidences = []
+    for word, confidence in zip(data['text'], data['conf']):
+        confidence = float(confidence)
+        if word.strip():
+            words.append(word.strip())
+        if confidence > 0:
+            confidences.append(confidence)
+
+    return ' '.join(words), (sum(confidences) / len(confidences) if confidences else 0)
+
+
+def read_plate_text(image: np.ndarray) -> Tuple[str, float]:
+    """
+    Lê o texto de uma placa já pré-processada com o Tesseract
+
+    Usa uma instância persistente do tesserocr por thread quando disponível (sem criar
+    processo nem carregar o modelo a cada placa); caso contrário, uma única chamada
+    image_to_data do pytesseract.
+
+    Args:
+        image: Imagem da placa (escala de cinza/binarizada ou RGB)
+
+    Returns:
+        Tupla (texto, confiança média das palavras, 0-100)
+    """
+    start = time.perf_counter()
+    if use_tesserocr():
+        backend = 'tesserocr'
+        result = _read_with_tesserocr(image)
+    else:
+        backend = 'pytesseract'
+        result = _read_with_pytesseract(image)
+    metrics.record_timing('ocr', f'tesseract_{backend}', time.perf_counter() - start)
+    return result
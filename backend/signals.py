@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import KnownPlate, RegionOfInterest
+from .services.known_plate_index import known_plate_index
+from .services.roi_masks import roi_registry
+
+
+@receiver(post_save, sender=KnownPlate)
+def update_known_plate_index(sender, instance, **kwargs):
+    """Mantém o índice de similaridade em memória sincronizado com o banco"""
+    known_plate_index.upsert(instance.pk, instance.plate_number)
+
+
+@receiver(post_delete, sender=KnownPlate)
+def remove_from_known_plate_index(sender, instance, **kwargs):
+    known_plate_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=RegionOfInterest)
+@receiver(post_delete, sender=RegionOfInterest)
+def invalidate_roi_cache(sender, instance, **kwargs):
+    """Os streams recarregam as regiões de interesse na próxima detecção"""
+    roi_registry.invalidate()
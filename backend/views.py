@@ -1,22 +1,39 @@
+import functools
+import os
 import uuid
+import zipfile
+from contextlib import ExitStack
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
+from django.conf import settings
 from django.utils import timezone
 from django.core.files import File
-from thefuzz import fuzz
-import os
 import logging
 
-from .models import PlateDetection, DetectedPlate, KnownPlate
+from .models import PlateDetection, DetectedPlate
 from .serializers import PlateDetectionSerializer, DetectedPlateSerializer
-from .services.plate_detector import PlateDetectorService
+from .services.detection_jobs import enqueue_detection
+from .services.detection_pipeline import (
+    finish_detection, match_known_plate, ocr_plates_with_quality_gate, process_detection, process_detection_batch,
+    serialize_plate_result
+)
+from .services.image_storage import schedule_original_image_persist
+from .services.inference_scheduler import (
+    PRIORITY_BATCH, PRIORITY_INTERACTIVE, PRIORITY_LIVE, InferenceQueueFull, inference_scheduler
+)
+from .services.metrics import metrics
+from .services.model_registry import DetectorUnavailable, model_registry
+from .services.pipeline_profiles import PERSIST_ALL, PERSIST_KNOWN, PERSIST_NONE, UnknownProfileError, get_profile
 
 logger = logging.getLogger(__name__)
 
+# Extensões aceitas dentro do ZIP enviado ao detect_batch
+BATCH_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
 
 class PlateDetectionViewSet(viewsets.ModelViewSet):
     queryset = PlateDetection.objects.all()
@@ -26,11 +43,56 @@ class PlateDetectionViewSet(viewsets.ModelViewSet):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    def _wants_async(self, request):
+        """Modo assíncrono: parâmetro 'async' (query ou formulário) ou settings.DETECTION_ASYNC_DEFAULT"""
+        value = request.query_params.get('async', request.data.get('async'))
+        if value is None:
+            return getattr(settings, 'DETECTION_ASYNC_DEFAULT', False)
+        return str(value).lower() in ('1', 'true', 'yes')
+
+    def _get_profile(self, request, context):
+        """
+        Perfil do pipeline: parâmetro 'profile' (query ou formulário) ou o padrão do contexto
+
+        Raises:
+            UnknownProfileError: Perfil inexistente
+        """
+        return get_profile(request.query_params.get('profile', request.data.get('profile')), context)
+
+    def _queue_full_response(self, error: InferenceQueueFull):
+        """429 com Retry-After quando a fila de inferência da classe está cheia"""
+        return Response(
+            {'error': str(error), 'retry_after': error.retry_after},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={'Retry-After': str(error.retry_after)}
+        )
+
+    def _detector_unavailable_response(self, error: DetectorUnavailable, priority: str):
+        """503 com Retry-After (estimativa da classe de prioridade) quando nenhuma instância do pool foi liberada a tempo"""
+        retry_after = inference_scheduler.retry_after(priority)
+        return Response(
+            {'error': str(error), 'retry_after': retry_after},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': str(retry_after)}
+        )
+
     @action(detail=False, methods=['post'])
     def detect_plates(self, request):
         """
         Endpoint para detectar placas em uma imagem
         """
+        if self._wants_async(request):
+            # O processamento fica com o pool de workers, na classe 'batch' do agendador
+            return self._detect_plates(request)
+
+        try:
+            with inference_scheduler.admit(PRIORITY_INTERACTIVE):
+                return self._detect_plates(request)
+        except InferenceQueueFull as e:
+            return self._queue_full_response(e)
+
+    def _detect_plates(self, request):
+        detector_service = None
         try:
             print(f"Request data: {request.data}")
             print(f"Request files: {request.FILES}")
@@ -42,123 +104,53 @@ class PlateDetectionViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            detector_service = PlateDetectorService()
+            try:
+                profile = self._get_profile(request, 'upload')
+            except UnknownProfileError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             image_file = request.FILES['original_image']
+            image_bytes = image_file.read()
+
+            run_async = self._wants_async(request)
+            if not run_async:
+                # Antes de criar o registro: sem instância livre, a requisição termina em 503
+                detector_service = model_registry.acquire()
 
-            # Criar registro de detecção
+            # Criar registro de detecção; a imagem original é gravada fora do caminho da requisição
             detection = PlateDetection.objects.create(
                 user=request.user if request.user.is_authenticated else None,
-                original_image=image_file,
-                status='processing'
+                profile=profile.name,  # Os jobs assíncronos leem o perfil do registro
+                status='pending' if run_async else 'processing'
             )
+            schedule_original_image_persist(detection.id, image_file.name, image_bytes)
+
+            if run_async:
+                # Processamento no pool de workers; o progresso é consultado em get_results
+                enqueue_detection(detection, image_bytes)
+                return Response({
+                    'id': detection.id,
+                    'status': detection.status,
+                    'message': 'Detecção enfileirada para processamento',
+                    'results_url': self.reverse_action(self.get_results.url_name, args=[detection.id])
+                }, status=status.HTTP_202_ACCEPTED)
 
             try:
-                # Processar imagem
-                image_path = detection.original_image.path
-                # 'detected_plates_yolo' é uma lista de dicts do serviço, cada um com:
-                # 'cropped_image' (np.array), 'bounding_box', 'confidence'
-                detected_plates_yolo = detector_service.detect_plates(image_path)
-
-                if not detected_plates_yolo:
-                    detection.status = 'completed'
-                    detection.processed_at = timezone.now()
-                    detection.save()
+                # Processar imagem direto da memória (sem reler o arquivo do disco)
+                plate_results = process_detection(detection, detector_service, image_bytes, profile=profile)
+                finish_detection(detection, 'completed')
+
+                if not plate_results:
                     return Response({
                         'id': detection.id,
                         'message': 'Nenhuma placa detectada na imagem',
                         'plates': []
                     })
 
-                processed_plates_response_data = []  # Renomeado para clareza
-
-                for plate_data_from_yolo in detected_plates_yolo:
-                    # Executar OCR (o método process_plate_ocr é mais completo que o process_plate_ocr_fast)
-                    ocr_results = detector_service.process_plate_ocr(
-                        plate_data_from_yolo['cropped_image']  # Passar o array numpy da imagem da placa cortada
-                    )
-                    plate_text_from_ocr = ocr_results.get('best_text', '').strip().upper()
-
-                    known_plate_association = None  # Para armazenar a KnownPlate se uma correspondência for encontrada
-                    current_highest_similarity = 0  # Para registrar a similaridade da associação
-
-                    # Só tenta a busca por similaridade se o OCR retornou algum texto
-                    if plate_text_from_ocr:
-                        # Validar e formatar o texto da placa para a consulta
-                        _, query_plate_text, _ = detector_service.validate_plate_text(plate_text_from_ocr)
-
-                        if query_plate_text:
-                            SIMILARITY_THRESHOLD = 50
-                            all_known_plates_qs = KnownPlate.objects.all()
-                            best_match_for_this_ocr = None
-
-                            for db_plate in all_known_plates_qs:
-                                score = fuzz.ratio(query_plate_text, db_plate.plate_number)
-                                if score > current_highest_similarity:
-                                    current_highest_similarity = score
-                                    best_match_for_this_ocr = db_plate
-
-                            if best_match_for_this_ocr and current_highest_similarity >= SIMILARITY_THRESHOLD:
-                                known_plate_association = best_match_for_this_ocr
-                                logger.info(
-                                    f"Para PlateDetection ID {detection.id}: Placa OCR '{plate_text_from_ocr}' (processada como '{query_plate_text}') "
-                                    f"será associada à KnownPlate '{known_plate_association.plate_number}' "
-                                    f"(similaridade: {current_highest_similarity}%)."
-                                )
-                            else:
-                                if best_match_for_this_ocr:  # Match encontrado, mas abaixo do limiar
-                                    logger.info(
-                                        f"Para PlateDetection ID {detection.id}: Placa OCR '{plate_text_from_ocr}' (processada como '{query_plate_text}'). "
-                                        f"Melhor correspondência KnownPlate: '{best_match_for_this_ocr.plate_number}' (similaridade: {current_highest_similarity}%). "
-                                        f"Não atingiu o limiar de {SIMILARITY_THRESHOLD}%. Será salva sem associação explícita."
-                                    )
-                                else:  # Nenhum match ou similaridade 0
-                                    logger.info(
-                                        f"Para PlateDetection ID {detection.id}: Nenhuma KnownPlate similar encontrada "
-                                        f"para OCR '{plate_text_from_ocr}' (processada como '{query_plate_text}'). Será salva sem associação explícita."
-                                    )
-                            # --- FIM DA LÓGICA DE BUSCA POR SIMILARIDADE ---
-
-                    # Salvar imagem cortada (como antes)
-                    filename = f"plate_{detection.id}_{uuid.uuid4().hex[:8]}.jpg"
-                    cropped_file_django_field = detector_service.save_cropped_plate(
-                        plate_data_from_yolo['cropped_image'], filename
-                    )
-
-                    # Criar registro da placa detectada.
-                    # 'known_plate' será preenchido com 'known_plate_association' (que pode ser None).
-                    detected_plate_object = DetectedPlate.objects.create(
-                        detection=detection,
-                        plate_number_detected=plate_text_from_ocr,
-                        known_plate=known_plate_association,  # Associação aqui (pode ser None)
-                        bounding_box=plate_data_from_yolo['bounding_box'],
-                        yolo_confidence=plate_data_from_yolo['confidence'],
-                        cropped_image=cropped_file_django_field,
-                        best_ocr_text=ocr_results.get('best_text', ''),
-                        best_ocr_confidence=ocr_results.get('best_confidence'),
-                        ocr_results=ocr_results.get('all_results', {})  # Usar .get para evitar KeyError
-                    )
-
-                    processed_plates_response_data.append({
-                        'id': detected_plate_object.id,
-                        'plate_number_detected': detected_plate_object.plate_number_detected,
-                        # Adicionar informação sobre a placa conhecida associada e a similaridade
-                        'known_plate_associated_number': known_plate_association.plate_number if known_plate_association else None,
-                        'association_similarity_score': current_highest_similarity if known_plate_association else None,
-                        # Score da associação feita
-                        'is_regularized_status': known_plate_association.is_regularized if known_plate_association else None,
-                        'bounding_box': detected_plate_object.bounding_box,
-                        'yolo_confidence': detected_plate_object.yolo_confidence,
-                        'cropped_image_url': request.build_absolute_uri(
-                            detected_plate_object.cropped_image.url) if detected_plate_object.cropped_image else None,
-                        'best_ocr_text': detected_plate_object.best_ocr_text,  # Pode ser igual a plate_number_detected
-                        'best_ocr_confidence': detected_plate_object.best_ocr_confidence
-                    })
-
-                # Atualizar status da detecção principal
-                detection.status = 'completed'
-                detection.processed_at = timezone.now()
-                detection.save()
+                processed_plates_response_data = [
+                    serialize_plate_result(plate_result, request.build_absolute_uri)
+                    for plate_result in plate_results
+                ]
 
                 return Response({
                     'id': detection.id,
@@ -168,22 +160,143 @@ class PlateDetectionViewSet(viewsets.ModelViewSet):
 
             except Exception as e:
                 logger.error(f"Erro ao processar detecção {detection.id}: {e}", exc_info=True)  # Adicionado exc_info
-                detection.status = 'error'
-                detection.error_message = str(e)
-                detection.processed_at = timezone.now()  # Marcar processed_at mesmo em erro
-                detection.save()
+                finish_detection(detection, 'error', str(e))  # Marcar processed_at mesmo em erro
 
                 return Response(
                     {'error': f'Erro ao processar imagem: {str(e)}'},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
 
+        except DetectorUnavailable as e:
+            logger.warning(f"Detecção recusada: {e}")
+            return self._detector_unavailable_response(e, PRIORITY_INTERACTIVE)
         except Exception as e:
             logger.error(f"Erro geral na detecção: {e}")
             return Response(
                 {'error': f'Erro interno: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        finally:
+            model_registry.release(detector_service)
+
+    def _collect_batch_images(self, request, stack):
+        """
+        Lista as imagens de detect_batch (arquivos no campo 'images' e/ou um ZIP no campo 'archive')
+        sem lê-las: cada uma é lida apenas quando o seu bloco é processado. A quantidade de imagens
+        e o tamanho total descompactado são conferidos antes de qualquer leitura.
+
+        Args:
+            stack: ExitStack que mantém o ZIP aberto até o fim do processamento
+
+        Returns:
+            Lista de tuplas (nome do arquivo, função que retorna o conteúdo)
+
+        Raises:
+            ValueError: ZIP inválido ou lote acima dos limites
+        """
+        max_images = getattr(settings, 'DETECTION_BATCH_MAX_IMAGES', 5000)
+        max_bytes = getattr(settings, 'DETECTION_BATCH_MAX_BYTES', 2 * 1024 ** 3)
+
+        uploaded_files = request.FILES.getlist('images')
+        images = [(image_file.name, image_file.read) for image_file in uploaded_files]
+        total_bytes = sum(image_file.size for image_file in uploaded_files)
+
+        archive = request.FILES.get('archive')
+        if archive is not None:
+            try:
+                zip_file = stack.enter_context(zipfile.ZipFile(archive))
+            except zipfile.BadZipFile:
+                raise ValueError('Arquivo ZIP inválido')
+
+            members = [
+                info for info in zip_file.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(BATCH_IMAGE_EXTENSIONS)
+            ]
+            if len(images) + len(members) > max_images:
+                raise ValueError(f'O lote excede o limite de {max_images} imagens')
+
+            # file_size (do diretório central) limita o que a leitura descompacta
+            total_bytes += sum(info.file_size for info in members)
+            images.extend(
+                (os.path.basename(info.filename), functools.partial(zip_file.read, info)) for info in members
+            )
+
+        if total_bytes > max_bytes:
+            raise ValueError(f'O lote excede o limite de {max_bytes // (1024 ** 2)} MB (descompactado)')
+
+        return images
+
+    @action(detail=False, methods=['post'])
+    def detect_batch(self, request):
+        """
+        Endpoint para detectar placas em várias imagens (arquivos 'images' ou um ZIP em 'archive').
+        O YOLO roda em lotes e o OCR de todas as placas é feito em conjunto.
+        """
+        # O ZIP continua aberto enquanto os blocos de imagens são lidos
+        with ExitStack() as stack:
+            return self._detect_batch(request, stack)
+
+    def _detect_batch(self, request, stack):
+        try:
+            profile = self._get_profile(request, 'batch')
+            images = self._collect_batch_images(request, stack)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not images:
+            return Response(
+                {'error': 'Envie ao menos uma imagem (campo "images") ou um arquivo ZIP (campo "archive")'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            # O detector é emprestado a cada bloco do lote (ver process_detection_batch)
+            with inference_scheduler.admit(PRIORITY_BATCH):
+                batch_results = process_detection_batch(
+                    images,
+                    user=request.user if request.user.is_authenticated else None,
+                    profile=profile
+                )
+        except InferenceQueueFull as e:
+            return self._queue_full_response(e)
+        except DetectorUnavailable as e:
+            logger.warning(f"Lote de {len(images)} imagem(ns) recusado: {e}")
+            return self._detector_unavailable_response(e, PRIORITY_BATCH)
+        except Exception as e:
+            logger.error(f"Erro ao processar lote de {len(images)} imagem(ns): {e}", exc_info=True)
+            return Response(
+                {'error': f'Erro ao processar lote: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        results = []
+        for batch_result in batch_results:
+            if batch_result['error']:
+                results.append({'filename': batch_result['filename'], 'error': batch_result['error']})
+                continue
+
+            plates = [
+                serialize_plate_result(plate_result, request.build_absolute_uri)
+                for plate_result in batch_result['plates']
+            ]
+            results.append({
+                'filename': batch_result['filename'],
+                'id': batch_result['detection'].id,
+                'message': (
+                    f'{len(plates)} placa(s) detectada(s) e processada(s) com sucesso na imagem.'
+                    if plates else 'Nenhuma placa detectada na imagem'
+                ),
+                'plates': plates
+            })
+
+        total_plates = sum(len(result.get('plates', [])) for result in results)
+        logger.info(f"Lote processado: {len(images)} imagem(ns), {total_plates} placa(s)")
+
+        return Response({
+            'count': len(results),
+            'total_plates': total_plates,
+            'results': results
+        }, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['get'])
     def get_results(self, request, pk=None):
@@ -210,45 +323,42 @@ class PlateDetectionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def process_frame(self, request):
         """
-        Processa um frame único. Detecta placas, realiza OCR,
-        e salva a detecção no banco de dados APENAS SE a placa OCRizada for conhecida.
+        Processa um frame único. Detecta placas, realiza OCR e salva a detecção no banco
+        conforme o perfil do pipeline (padrão 'realtime': APENAS SE a placa OCRizada for conhecida).
         """
-        temp_path = None  # Para garantir que temp_path seja definido para o bloco finally/except
+        try:
+            with inference_scheduler.admit(PRIORITY_LIVE):
+                return self._process_frame(request)
+        except InferenceQueueFull as e:
+            return self._queue_full_response(e)
+
+    def _process_frame(self, request):
         detection_instance_for_frame = None  # Para rastrear a instância de PlateDetection do frame
+        detector_service = None
 
         try:
             if 'frame' not in request.FILES:
                 return Response({'error': 'Frame obrigatório'}, status=status.HTTP_400_BAD_REQUEST)
 
+            try:
+                profile = self._get_profile(request, 'frame')
+            except UnknownProfileError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
             frame_file = request.FILES['frame']
+            # O frame é decodificado em memória, sem arquivo temporário
+            frame_bytes = frame_file.read()
+
+            detector_service = model_registry.acquire()
 
-            # Salvar temporariamente o frame para processamento
-            # É importante usar um método seguro para criar arquivos temporários
-            # e garantir que o diretório exista e seja gravável.
-            # O código original usa /tmp/, que pode não ser ideal para todas as plataformas.
-            # Considere usar o módulo `tempfile` do Python para maior portabilidade.
-            # Exemplo simplificado mantendo a lógica original de /tmp/:
-            temp_dir = '/tmp'
-            if not os.path.exists(temp_dir):
-                os.makedirs(temp_dir, exist_ok=True)  # Garante que o diretório exista
-            temp_frame_filename = f'frame_{uuid.uuid4().hex}.jpg'
-            temp_path = os.path.join(temp_dir, temp_frame_filename)
-
-            with open(temp_path, 'wb+') as destination:
-                for chunk in frame_file.chunks():
-                    destination.write(chunk)
-
-            detector_service = PlateDetectorService()
-
-            # Detectar placas no frame salvo.
-            # `detect_plates` retorna uma lista de dicts, cada um com 'cropped_image' (np.array),
+            # Detectar placas no frame.
+            # `detect_plates_from_bytes` retorna uma lista de dicts, cada um com 'cropped_image' (np.array),
             # 'bounding_box', e 'confidence'.
-            detected_plates_from_yolo = detector_service.detect_plates(temp_path)
+            detected_plates_from_yolo = detector_service.detect_plates_from_bytes(frame_bytes, profile)
 
             saved_plates_output_info = []  # Informações das placas salvas para a resposta
 
             if not detected_plates_from_yolo:
-                os.remove(temp_path)
                 return Response({
                     'detection_id': None,
                     'message': 'Nenhuma placa detectada no frame.',
@@ -256,92 +366,66 @@ class PlateDetectionViewSet(viewsets.ModelViewSet):
                     'frame_processed': True
                 }, status=status.HTTP_200_OK)
 
-            for plate_data_yolo in detected_plates_from_yolo:
+            # Recortes borrados, pequenos ou com proporção de placa improvável não vão para o OCR
+            plates_ocr_results = ocr_plates_with_quality_gate(detector_service, detected_plates_from_yolo, profile)
+
+            for plate_data_yolo, ocr_results in zip(detected_plates_from_yolo, plates_ocr_results):
                 cropped_image_np = plate_data_yolo['cropped_image']
-                ocr_results = detector_service.process_plate_ocr_fast(cropped_image_np)
                 plate_text_from_ocr = ocr_results.get('best_text', '').strip().upper()
 
                 if not plate_text_from_ocr:
                     continue
 
-                    # Validar e formatar o texto da placa para consulta (como antes)
-                _, query_plate_text, _ = detector_service.validate_plate_text(plate_text_from_ocr)
+                # Busca no índice em memória das placas conhecidas (mesmo score do fuzz.ratio),
+                # com o limiar de similaridade (0-100) do perfil.
+                # Um valor mais alto significa uma correspondência mais estrita.
+                known_plate_instance, highest_similarity_score, query_plate_text = match_known_plate(
+                    plate_text_from_ocr, profile.match_threshold
+                )
 
                 # Se após a validação/limpeza, o texto da placa estiver vazio, pule.
                 if not query_plate_text:
-                    print(f"Texto da placa OCR '{plate_text_from_ocr}' resultou em query vazia após validação.")
+                    logger.debug(f"Texto da placa OCR '{plate_text_from_ocr}' resultou em query vazia após validação.")
                     continue
 
-                # --- INÍCIO DA ALTERAÇÃO: Lógica de Busca por Similaridade ---
-                known_plate_instance = None
-
-                # Defina um limiar de similaridade (0-100).
-                # Este valor é crucial e pode precisar de ajuste experimental.
-                # Um valor mais alto significa uma correspondência mais estrita.
-                SIMILARITY_THRESHOLD = 60  # Exemplo: 85% de similaridade mínima
-
-                # Busca todas as placas conhecidas.
-                # ATENÇÃO: Se você tiver MUITAS placas conhecidas, buscar todas (`.all()`)
-                # e iterar pode ser ineficiente. Considere estratégias de pré-filtragem
-                # se a performance se tornar um problema.
-                # Ex: KnownPlate.objects.filter(plate_number__startswith=query_plate_text[0])
-                # ou usar funcionalidades de busca por similaridade do próprio banco de dados (ex: pg_trgm para PostgreSQL).
-                all_known_plates_qs = KnownPlate.objects.all()
-
-                best_match_found = None
-                highest_similarity_score = 0
-
-                for db_plate in all_known_plates_qs:
-                    # Calcula a similaridade entre o texto do OCR (query_plate_text)
-                    # e o número da placa no banco de dados (db_plate.plate_number).
-                    # fuzz.ratio() é uma boa escolha geral para similaridade de strings.
-                    current_similarity_score = fuzz.ratio(query_plate_text, db_plate.plate_number)
-
-                    if current_similarity_score > highest_similarity_score:
-                        highest_similarity_score = current_similarity_score
-                        best_match_found = db_plate
-
-                # Verifica se o melhor match encontrado atinge o limiar de similaridade
-                if best_match_found and highest_similarity_score >= SIMILARITY_THRESHOLD:
-                    known_plate_instance = best_match_found
-                    print(
+                if known_plate_instance:
+                    logger.info(
                         f"Placa OCR '{plate_text_from_ocr}' (processada como '{query_plate_text}') "
                         f"correspondeu à placa conhecida '{known_plate_instance.plate_number}' "
-                        f"com similaridade de {highest_similarity_score}% (limiar: {SIMILARITY_THRESHOLD}%)."
+                        f"com similaridade de {highest_similarity_score}% (limiar: {profile.match_threshold}%)."
                     )
                 else:
-                    # Log se um match foi encontrado mas estava abaixo do limiar, ou nenhum match.
-                    if best_match_found:
-                        print(
-                            f"Placa OCR '{plate_text_from_ocr}' (processada como '{query_plate_text}'). "
-                            f"Melhor correspondência: '{best_match_found.plate_number}' (similaridade: {highest_similarity_score}%). "
-                            f"Não atingiu o limiar de {SIMILARITY_THRESHOLD}%. Não será salva."
-                        )
-                    else:  # Nenhuma placa no DB para comparar ou todas tiveram score 0
-                        print(
-                            f"Nenhuma placa conhecida no banco de dados para comparar ou nenhuma similaridade significativa encontrada "
-                            f"para OCR '{plate_text_from_ocr}' (processada como '{query_plate_text}')."
-                        )
-                    # known_plate_instance permanece None, a placa não será salva.
-                # --- FIM DA ALTERAÇÃO: Lógica de Busca por Similaridade ---
-
-                if not known_plate_instance:
+                    logger.debug(
+                        f"Nenhuma placa conhecida atingiu o limiar de {profile.match_threshold}% "
+                        f"para OCR '{plate_text_from_ocr}' (processada como '{query_plate_text}')."
+                    )
+
+                if not known_plate_instance and profile.persist == PERSIST_KNOWN:
                     # Se nenhuma placa conhecida suficientemente similar foi encontrada,
                     # pule para a próxima placa detectada pelo YOLO.
                     continue
 
-                    # Se known_plate_instance FOI encontrado (por similaridade):
-                # O restante do código para criar PlateDetection (se necessário),
-                # salvar a imagem cortada, e criar o objeto DetectedPlate continua aqui,
-                # exatamente como na sua implementação anterior que esperava uma correspondência exata.
-                # Exemplo:
+                if profile.persist == PERSIST_NONE:
+                    # Perfil sem gravação: a leitura é apenas devolvida na resposta
+                    saved_plates_output_info.append({
+                        'detected_plate_id': None,
+                        'plate_number_ocr': plate_text_from_ocr,
+                        'known_plate_db_number': known_plate_instance.plate_number if known_plate_instance else None,
+                        'similarity_score': highest_similarity_score,
+                        'is_regularized': known_plate_instance.is_regularized if known_plate_instance else None,
+                        'bounding_box_yolo': plate_data_yolo['bounding_box'],
+                        'cropped_image_url': None,
+                        'ocr_confidence': ocr_results.get('best_confidence')
+                    })
+                    continue
+
                 if detection_instance_for_frame is None:
-                    frame_file.seek(0)
                     detection_instance_for_frame = PlateDetection.objects.create(
                         user=request.user if request.user.is_authenticated else None,
-                        original_image=frame_file,
+                        profile=profile.name,
                         status='processing'
                     )
+                    schedule_original_image_persist(detection_instance_for_frame.id, frame_file.name, frame_bytes)
 
                 cropped_image_filename = f"plate_{detection_instance_for_frame.id}_{uuid.uuid4().hex[:8]}.jpg"
                 django_cropped_image_file = detector_service.save_cropped_plate(
@@ -352,21 +436,22 @@ class PlateDetectionViewSet(viewsets.ModelViewSet):
                 detected_plate_obj = DetectedPlate.objects.create(
                     detection=detection_instance_for_frame,
                     plate_number_detected=plate_text_from_ocr,
-                    known_plate=known_plate_instance,  # <- Aqui usa a placa encontrada por similaridade
+                    known_plate=known_plate_instance,  # <- Placa encontrada por similaridade (None se desconhecida)
                     bounding_box=plate_data_yolo['bounding_box'],
                     yolo_confidence=plate_data_yolo['confidence'],
                     cropped_image=django_cropped_image_file,
                     best_ocr_text=ocr_results.get('best_text', ''),
                     best_ocr_confidence=ocr_results.get('best_confidence'),
-                    ocr_results={'fast_ocr_result': ocr_results}
+                    ocr_results=ocr_results.get('all_results', {}),
+                    quality_score=plate_data_yolo.get('quality_score')
                 )
 
                 saved_plates_output_info.append({
                     'detected_plate_id': detected_plate_obj.id,
                     'plate_number_ocr': detected_plate_obj.plate_number_detected,
-                    'known_plate_db_number': known_plate_instance.plate_number,
+                    'known_plate_db_number': known_plate_instance.plate_number if known_plate_instance else None,
                     'similarity_score': highest_similarity_score,  # Adicionar score para informação
-                    'is_regularized': known_plate_instance.is_regularized,
+                    'is_regularized': known_plate_instance.is_regularized if known_plate_instance else None,
                     'bounding_box_yolo': detected_plate_obj.bounding_box,
                     'cropped_image_url': request.build_absolute_uri(
                         detected_plate_obj.cropped_image.url) if detected_plate_obj.cropped_image else None,
@@ -377,23 +462,33 @@ class PlateDetectionViewSet(viewsets.ModelViewSet):
             if detection_instance_for_frame and saved_plates_output_info:
                 detection_instance_for_frame.status = 'completed'
                 detection_instance_for_frame.processed_at = timezone.now()
-                detection_instance_for_frame.save()
+                detection_instance_for_frame.save(update_fields=['status', 'processed_at'])
 
-                os.remove(temp_path)  # Remover arquivo temporário
                 return Response({
                     'detection_id': detection_instance_for_frame.id,
-                    'message': f'{len(saved_plates_output_info)} placa(s) conhecida(s) detectada(s) e salva(s) com sucesso.',
+                    'message': f'{len(saved_plates_output_info)} placa(s) detectada(s) e salva(s) com sucesso.',
                     'saved_plates': saved_plates_output_info,
                     'frame_processed': True
                 }, status=status.HTTP_201_CREATED)  # 201 CREATED pois novos recursos foram criados
 
+            if saved_plates_output_info:
+                # Perfil sem gravação (persist='none')
+                return Response({
+                    'detection_id': None,
+                    'message': f'{len(saved_plates_output_info)} placa(s) lida(s); o perfil "{profile.name}" não grava detecções.',
+                    'saved_plates': [],
+                    'plates': saved_plates_output_info,
+                    'frame_processed': True
+                }, status=status.HTTP_200_OK)
+
             # Se chegou aqui, ou nenhuma placa foi detectada pelo YOLO,
             # ou placas foram detectadas mas nenhuma era conhecida.
             # Em ambos os casos, nenhum PlateDetection foi criado ou nenhuma DetectedPlate foi salva.
-            os.remove(temp_path)  # Remover arquivo temporário
             message = 'Nenhuma placa detectada no frame.'
             if detected_plates_from_yolo:  # Se YOLO detectou algo, mas nada era conhecido
                 message = 'Placas foram detectadas no frame, mas nenhuma delas é conhecida no banco de dados e, portanto, não foram salvas.'
+                if profile.persist == PERSIST_ALL:
+                    message = 'Placas foram detectadas no frame, mas nenhuma teve o texto lido pelo OCR.'
 
             return Response({
                 'detection_id': None,
@@ -402,6 +497,9 @@ class PlateDetectionViewSet(viewsets.ModelViewSet):
                 'frame_processed': True
             }, status=status.HTTP_200_OK)
 
+        except DetectorUnavailable as e:
+            logger.warning(f"Frame recusado: {e}")
+            return self._detector_unavailable_response(e, PRIORITY_LIVE)
         except Exception as e:
             logger.error(f"Erro geral no processamento do frame: {e}", exc_info=True)
 
@@ -411,17 +509,17 @@ class PlateDetectionViewSet(viewsets.ModelViewSet):
                 detection_instance_for_frame.status = 'error'
                 detection_instance_for_frame.error_message = str(e)
                 detection_instance_for_frame.processed_at = timezone.now()
-                detection_instance_for_frame.save()
+                detection_instance_for_frame.save(update_fields=['status', 'error_message', 'processed_at'])
 
             return Response({'error': f'Erro interno no servidor ao processar o frame: {str(e)}'},
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         finally:
-            # Garantir que o arquivo temporário seja removido em caso de erro também, se ele existir
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    os.remove(temp_path)
-                except Exception as e_rm:
-                    logger.error(f"Erro ao tentar remover arquivo temporário {temp_path} no bloco finally: {e_rm}")
+            model_registry.release(detector_service)
+
+    @action(detail=False, methods=['get'])
+    def metrics(self, request):
+        """Métricas de desempenho do processo (tempos por etapa, contadores)"""
+        return Response(metrics.snapshot())
 
     @action(detail=False, methods=['get'])
     def list_detections(self, request):
@@ -207,7 +207,134 @@ DETECTION_RESULTS_DIR = os.path.join(MEDIA_ROOT, 'detection_results')
 
 YOLO_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'placa-veicular-model.pt')
 EASYOCR_LANGUAGES = ['en', 'pt']
+# Tesseract do OCR rápido: 'auto' usa o tesserocr (motor inicializado uma vez por thread) se estiver
+# instalado; 'pytesseract' executa o binário (uma chamada image_to_data por placa)
+TESSERACT_BACKEND = 'auto'
+TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # Executável usado pelo pytesseract
+TESSERACT_LANG = 'eng'
+TESSDATA_PATH = None  # Pasta tessdata do tesserocr (None = padrão da instalação)
 CONFIDENCE_THRESHOLDS = [0.0, 0.2, 0.4, 0.6, 0.8]
+# Parâmetros de inferência do YOLO
+YOLO_CONF = 0.25  # Confiança mínima das caixas
+YOLO_IOU = 0.7  # IoU do NMS
+YOLO_IMGSZ = 640  # Tamanho de entrada da rede (imagens e frames são reduzidos com letterbox)
+YOLO_MAX_DET = 300  # Máximo de caixas por imagem
+# Backend do detector: 'ultralytics' (PyTorch) ou 'onnxruntime' (exporta o .pt para ONNX uma vez, ao lado
+# dos pesos; requer o pacote onnxruntime ou onnxruntime-openvino). Sem o pacote, volta para o ultralytics.
+PLATE_DETECTOR_BACKEND = 'ultralytics'
+ONNX_QUANTIZE = False  # Quantização dinâmica INT8 dos pesos (arquivo .int8.onnx ao lado do .onnx)
+ONNX_PROVIDERS = ['CPUExecutionProvider']  # Ex.: ['OpenVINOExecutionProvider', 'CPUExecutionProvider']
+ONNX_INTRA_OP_THREADS = 0  # 0 = padrão do ONNX Runtime
+# 'readtext' (padrão) usa o pipeline completo do EasyOCR; 'recognize' (opcional) envia o recorte do YOLO
+# direto ao reconhecedor, sem o detector CRAFT: mais rápido, mas muda as leituras e a confiança dos uploads
+EASYOCR_MODE = 'readtext'
+EASYOCR_SPLIT_LINES = True  # Separar as duas linhas das placas de moto no modo 'recognize'
+EASYOCR_BATCH_SIZE = 32  # Linhas de texto por lote do reconhecedor (todas as variantes de todas as placas)
+# Variantes de pré-processamento usadas no OCR completo (subconjunto de PREPROCESSING_METHODS do serviço)
+PREPROCESSING_METHODS = [
+    'Original', 'Grayscale', 'Otsu', 'Adaptive', 'Bilateral', 'Sharpened', 'Resized2x', 'Inverted'
+]
+PREPROCESS_WORKERS = 4  # Threads do pool de pré-processamento compartilhado (0: sequencial)
+
+# Cascata de OCR: testa as variantes de pré-processamento na ordem da taxa de acerto histórica
+# (DetectedPlate.ocr_results x KnownPlate) e para na primeira leitura válida com confiança suficiente.
+# Desligada por padrão (todas as variantes, como antes); ligar muda as leituras do OCR completo dos uploads
+OCR_CASCADE_ENABLED = False
+OCR_CASCADE_MIN_CONFIDENCE = 0.6
+OCR_CASCADE_MIN_SAMPLES = 10  # Amostras mínimas para um método entrar na ordem medida
+OCR_CASCADE_STATS_TTL = 3600  # Segundos entre recálculos da ordem (feitos em segundo plano)
+OCR_CASCADE_SAMPLE_RATE = 0.05  # Fração das leituras feitas com todas as variantes (amostras da acurácia)
+OCR_CASCADE_DEFAULT_ORDER = [
+    'Resized2x', 'Inverted', 'Bilateral', 'Sharpened', 'Grayscale', 'Original', 'Otsu', 'Adaptive'
+]
+
+# Motores de OCR (backend/services/ocr_engines.py): 'easyocr', 'recognizer' (só o reconhecedor do EasyOCR)
+# e 'tesseract'. Com mais de um motor, as leituras rodam em paralelo e são combinadas por votação.
+OCR_FAST_ENGINES = ['tesseract']  # OCR rápido (stream e process_frame)
+OCR_FULL_ENGINES = []  # Motores extras votando com o resultado das variantes no OCR completo
+OCR_ENGINE_WORKERS = 3  # Threads do pool compartilhado dos motores (0: sequencial)
+
+# Perfis do pipeline (backend/services/pipeline_profiles.py): 'realtime', 'balanced' e 'forensic'.
+# O perfil é escolhido pelo parâmetro 'profile' (query/formulário), pelo comando 'set_profile' do
+# WebSocket ou pelos padrões abaixo, e fica gravado em PlateDetection.profile.
+DEFAULT_PIPELINE_PROFILE = 'balanced'
+PIPELINE_PROFILE_DEFAULTS = {'upload': 'balanced', 'batch': 'balanced', 'frame': 'realtime', 'stream': 'stream'}
+PIPELINE_PROFILES = {}  # Perfis novos ou substituídos, ex.: {'night': {'conf': 0.15, 'ocr': 'fast'}}
+PIPELINE_PROFILE_BY_SOURCE = {}  # Perfil por fonte de vídeo, ex.: {'webcam:0': 'forensic'}
+
+# Pool de modelos (YOLO + EasyOCR) compartilhado pelo processo
+PLATE_DETECTOR_POOL_SIZE = int(os.environ.get('PLATE_DETECTOR_POOL_SIZE', 1))
+PLATE_DETECTOR_PRELOAD = os.environ.get('PLATE_DETECTOR_PRELOAD', '0') == '1'  # Carregar os modelos na inicialização
+# Espera máxima (s) por uma instância livre do pool; as views respondem 503 depois disso
+PLATE_DETECTOR_ACQUIRE_TIMEOUT = float(os.environ.get('PLATE_DETECTOR_ACQUIRE_TIMEOUT', 30))
+
+# Agendador de inferência (backend/services/inference_scheduler.py), por processo: as instâncias do pool
+# de modelos e as execuções simultâneas do YOLO e do OCR são servidas por prioridade
+# ('live' > 'interactive' > 'batch').
+INFERENCE_YOLO_SLOTS = int(os.environ.get('INFERENCE_YOLO_SLOTS', 1))
+INFERENCE_OCR_SLOTS = int(os.environ.get('INFERENCE_OCR_SLOTS', 2))
+# Requisições em andamento por classe (process_frame, detect_plates, detect_batch); acima disso, 429
+INFERENCE_MAX_PENDING = {'live': 4, 'interactive': 16, 'batch': 2}
+INFERENCE_RETRY_AFTER = 2  # Retry-After (s) enquanto a duração média da classe ainda não foi medida
+
+# Uploads são decodificados em memória; imagens maiores que isto (maior lado, em px) usam decodificação reduzida
+UPLOAD_MAX_DECODE_DIMENSION = 2560
+# Gravação da imagem original das detecções: 'async' (após a resposta, em outra thread), 'sync' ou 'off'
+PERSIST_ORIGINAL_IMAGES = 'async'
+
+# Detecções assíncronas (detect_plates?async=1 responde 202 e processa em um pool local de workers)
+DETECTION_ASYNC_DEFAULT = False
+DETECTION_JOB_BACKEND = 'thread'  # 'thread' (compartilha modelos e índices) ou 'process'
+DETECTION_JOB_WORKERS = 2
+DETECTION_JOB_STALE_SECONDS = 3600  # Detecções pendentes há mais tempo são encerradas ao iniciar o pool
+
+# Detecções do stream de vídeo gravadas pelo próprio consumer (sem reenvio do frame pelo navegador)
+STREAM_PERSIST_DETECTIONS = True
+STREAM_PERSIST_MIN_INTERVAL = 5.0  # Segundos entre gravações
+STREAM_PERSIST_DEDUP_SECONDS = 60.0  # A mesma placa não é gravada de novo dentro deste intervalo
+STREAM_TARGET_FPS = 15  # Cadência de envio dos frames (a captura descarta os frames intermediários)
+# O YOLO roda em uma cópia letterbox (YOLO_IMGSZ) do frame da captura e o OCR recebe os recortes
+# em resolução completa; apenas o frame enviado aos clientes é reduzido
+STREAM_CAPTURE_WIDTH = 1280  # Resolução pedida à câmera (nem todas as fontes respeitam)
+STREAM_CAPTURE_HEIGHT = 720
+STREAM_DISPLAY_WIDTH = 640  # Largura máxima do frame enviado
+# Regiões de interesse por fonte (RegionOfInterest no admin): a detecção roda só no retângulo que as envolve
+STREAM_ROI_ENABLED = True
+STREAM_ROI_CACHE_SECONDS = 30.0  # Intervalo máximo entre consultas ao banco por fonte
+# Detecção no stream (worker de inferência separado): o intervalo entre detecções se adapta à duração
+# medida para que o worker fique ocupado no máximo STREAM_DETECTION_MAX_LOAD do tempo
+STREAM_DETECTION_MAX_LOAD = 0.5
+STREAM_DETECTION_MIN_INTERVAL = 0.2  # Segundos
+STREAM_DETECTION_MAX_INTERVAL = 2.0  # Segundos
+STREAM_OVERLAY_MAX_AGE = 1.0  # Segundos durante os quais a última detecção é desenhada nos frames
+# Filtro de movimento antes do YOLO: frames sem mudança em relação à última detecção são ignorados
+STREAM_MOTION_GATE_ENABLED = True
+STREAM_MOTION_GATE_WIDTH = 160  # Largura (px) do frame reduzido usado na comparação
+STREAM_MOTION_PIXEL_THRESHOLD = 25  # Diferença de intensidade para um pixel contar como alterado
+STREAM_MOTION_SENSITIVITY = 0.01  # Fração de pixels alterados que libera a inferência
+STREAM_MOTION_ROI = None  # Região de interesse normalizada (x1, y1, x2, y2), ex.: (0.0, 0.4, 1.0, 1.0)
+STREAM_MOTION_MAX_SKIP_SECONDS = 30.0  # Libera um frame periodicamente mesmo com a cena parada
+# Rastreamento das placas entre frames (OCR só em placas novas ou quando o recorte melhora)
+STREAM_TRACK_IOU_THRESHOLD = 0.3  # IoU mínimo entre a caixa e a posição prevista da trilha
+STREAM_TRACK_MAX_AGE = 2.0  # Segundos sem ser vista até a trilha ser descartada
+STREAM_TRACK_MAX_OCR = 5  # Execuções do OCR por trilha (com ou sem texto lido)
+STREAM_TRACK_QUALITY_GAIN = 1.2  # Melhora mínima do recorte para uma nova leitura
+
+# Qualidade dos recortes antes do OCR (nitidez, tamanho e proporção de placa brasileira)
+CROP_QUALITY_GATE_ENABLED = True  # False: apenas calcula o score, sem descartar recortes
+CROP_MIN_SHARPNESS = 30.0  # Variância mínima do Laplaciano
+CROP_MIN_WIDTH = 40  # Largura mínima do recorte (px)
+CROP_MIN_HEIGHT = 12  # Altura mínima do recorte (px)
+CROP_MAX_ASPECT_ERROR = 0.5  # |log(proporção / proporção da placa)| máximo (carro 400x130, moto 200x170)
+CROP_SHARPNESS_REFERENCE = 300.0  # Nitidez que vale score máximo
+CROP_WIDTH_REFERENCE = 160  # Largura (px) que vale score máximo
+
+# Detecção em lote (detections/detect_batch): vários arquivos ou um ZIP
+YOLO_BATCH_SIZE = 8  # Imagens por inferência do YOLO
+DETECTION_BATCH_CHUNK_SIZE = 64  # Imagens decodificadas/em memória por vez
+DETECTION_BATCH_MAX_IMAGES = 5000
+DETECTION_BATCH_MAX_BYTES = 2 * 1024 ** 3  # Tamanho total das imagens do lote (ZIP descompactado)
+DATA_UPLOAD_MAX_NUMBER_FILES = 500  # Limite do Django para arquivos por requisição (lotes maiores: use ZIP)
 
 LOGS_DIR = os.path.join(BASE_DIR, 'logs')
 if not os.path.exists(LOGS_DIR):
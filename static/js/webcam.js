@@ -38,9 +38,18 @@ const maxReconnectAttempts = 5;
 let detectionEnabled = true;
 let detectedPlates = []; // Mantém as placas para exibição na UI
 let startTime = Date.now();
-let isSavingFrame = false; // Flag para controlar o envio de frames para salvamento
-const SAVE_FRAME_INTERVAL = 5000; // Salvar no máximo um frame a cada 5 segundos
-let lastSaveTime = 0;
+
+// Protocolo binário de frames: cabeçalho (versão, tipo, frame_id, timestamp) + bytes do JPEG
+const FRAME_HEADER_SIZE = 14;
+const MESSAGE_TYPE_FRAME = 1;
+let currentFrameUrl = null; // Object URL do frame exibido (liberado a cada novo frame)
+
+// Latência da captura (timestamp do servidor, em segundos) até a exibição do frame
+const LATENCY_REPORT_INTERVAL = 5000; // ms
+let pendingFrameTimestamp = null; // Timestamp do frame aguardando a decodificação
+let latencySamples = []; // Amostras (ms) desde o último relatório
+
+let lastLivePlatesKey = ''; // Placas em cena na última mensagem 'plates' (evita repetir o status)
 
 // ++ ADICIONAR: Variável para controlar a fonte de vídeo atual ++
 let currentVideoSource = 'webcam'; // 'webcam' ou 'mjpeg'
@@ -58,6 +67,7 @@ function connectWebSocket() {
     loadingText.textContent = "Conectando...";
 
     socket = new WebSocket(socketUrl);
+    socket.binaryType = 'arraybuffer';
 
     socket.onopen = function (e) {
         updateStatus("✅ WebSocket conectado com sucesso!", 'success');
@@ -67,6 +77,10 @@ function connectWebSocket() {
 
     socket.onmessage = function (event) {
         try {
+            if (event.data instanceof ArrayBuffer) {
+                handleBinaryFrame(event.data);
+                return;
+            }
             const data = JSON.parse(event.data);
             handleWebSocketMessage(data);
         } catch (e) {
@@ -118,100 +132,108 @@ function updateSourceSelectionUI() {
 }
 
 
-// Função para converter base64 para Blob
-function base64ToBlob(base64, contentType = '', sliceSize = 512) {
-    const byteCharacters = atob(base64);
-    const byteArrays = [];
-
-    for (let offset = 0; offset < byteCharacters.length; offset += sliceSize) {
-        const slice = byteCharacters.slice(offset, offset + sliceSize);
-        const byteNumbers = new Array(slice.length);
-        for (let i = 0; i < slice.length; i++) {
-            byteNumbers[i] = slice.charCodeAt(i);
-        }
-        const byteArray = new Uint8Array(byteNumbers);
-        byteArrays.push(byteArray);
+// Exibir um frame (object URL ou data URL); timestamp é o momento da captura no servidor
+function showFrame(src, timestamp = null) {
+    pendingFrameTimestamp = timestamp;
+    videoFeed.src = src;
+    if (currentFrameUrl) {
+        URL.revokeObjectURL(currentFrameUrl);
+        currentFrameUrl = null;
+    }
+    if (src.startsWith('blob:')) {
+        currentFrameUrl = src;
+    }
+    if (videoFeed.style.display === 'none') {
+        videoFeed.style.display = 'block';
+        loadingOverlay.style.display = 'none';
     }
-
-    return new Blob(byteArrays, {type: contentType});
 }
 
-// Função para obter o cookie CSRF
-function getCookie(name) {
-    let cookieValue = null;
-    if (document.cookie && document.cookie !== '') {
-        const cookies = document.cookie.split(';');
-        for (let i = 0; i < cookies.length; i++) {
-            const cookie = cookies[i].trim();
-            if (cookie.substring(0, name.length + 1) === (name + '=')) {
-                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
-                break;
-            }
-        }
+// Frame recebido em mensagem binária (sem base64)
+function handleBinaryFrame(buffer) {
+    if (buffer.byteLength <= FRAME_HEADER_SIZE) {
+        return;
     }
-    return cookieValue;
+    const header = new DataView(buffer, 0, FRAME_HEADER_SIZE);
+    if (header.getUint8(1) !== MESSAGE_TYPE_FRAME) {
+        return;
+    }
+    const timestamp = header.getFloat64(6); // Big-endian, após versão, tipo e frame_id
+    const jpegBytes = new Uint8Array(buffer, FRAME_HEADER_SIZE);
+    showFrame(URL.createObjectURL(new Blob([jpegBytes], {type: 'image/jpeg'})), timestamp);
 }
 
-// Função para enviar o frame ao backend para salvamento
-async function saveFrameToServer(frameBase64) {
-    if (isSavingFrame) {
+// Frame decodificado e exibido: latência desde a captura (relógios do servidor e do navegador)
+function recordDisplayLatency() {
+    if (pendingFrameTimestamp === null) {
         return;
     }
-    const now = Date.now();
-    if (now - lastSaveTime < SAVE_FRAME_INTERVAL) {
+    const latency = performance.timeOrigin + performance.now() - pendingFrameTimestamp * 1000;
+    pendingFrameTimestamp = null;
+    if (latency >= 0) {
+        latencySamples.push(latency);
+    }
+}
+
+// Resumo periódico no console e envio das amostras ao servidor (timings.stream.capture_to_display)
+function reportDisplayLatency() {
+    if (latencySamples.length === 0) {
         return;
     }
+    const samples = latencySamples;
+    latencySamples = [];
+    const sorted = [...samples].sort((a, b) => a - b);
+    const mean = samples.reduce((sum, value) => sum + value, 0) / samples.length;
+    const p95 = sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * 0.95))];
+    console.log(`Latência captura→exibição: média ${mean.toFixed(0)} ms, p95 ${p95.toFixed(0)} ms (${samples.length} frames)`);
 
-    isSavingFrame = true;
-    lastSaveTime = now;
-    updateStatus("📡 Enviando frame para salvamento...", 'info');
+    if (socket && socket.readyState === WebSocket.OPEN) {
+        socket.send(JSON.stringify({
+            command: 'report_latency',
+            samples: samples.map(value => Math.round(value))
+        }));
+    }
+}
 
-    try {
-        const imageBlob = base64ToBlob(frameBase64, 'image/jpeg');
-        const formData = new FormData();
-        const timestamp = new Date().toISOString();
-        formData.append('original_image', imageBlob, `frame_${timestamp}.jpg`);
-
-        const csrfToken = getCookie('csrftoken');
-
-        const response = await fetch('/api/detections/detect_plates/', {
-            method: 'POST',
-            headers: {
-                'X-CSRFToken': csrfToken,
-            },
-            body: formData
-        });
+videoFeed.addEventListener('load', recordDisplayLatency);
+setInterval(reportDisplayLatency, LATENCY_REPORT_INTERVAL);
 
-        if (response.ok) {
-            const result = await response.json();
-            console.log('Frame salvo com sucesso. Detecção ID:', result.id, 'Placas:', result.plates);
-            updateStatus(`🖼️ Frame salvo (ID: ${result.id}), ${result.plates ? result.plates.length : 0} placa(s) processada(s).`, 'success');
-            fetchPlatesFromDB();
-        } else {
-            const errorData = await response.json();
-            console.error('Erro ao salvar frame:', response.status, errorData);
-            updateStatus(`⚠️ Erro ao salvar frame: ${errorData.error || response.statusText}`, 'error');
-        }
-    } catch (error) {
-        console.error('Erro na requisição fetch para salvar frame:', error);
-        updateStatus(`📛 Erro de rede ao salvar frame.`, 'error');
-    } finally {
-        isSavingFrame = false;
+// Placas lidas pelo worker de inferência: o status mostra as que estão em cena
+// (a lista lateral continua vindo do banco, atualizada a cada 'detection_saved')
+function handleLivePlates(data) {
+    const plates = data.plates || [];
+    const key = plates.map(plate => plate.formatted_text || plate.text).sort().join(',');
+    if (key === lastLivePlatesKey) {
+        return;
+    }
+    lastLivePlatesKey = key;
+    if (plates.length === 0) {
+        return;
     }
+
+    const description = plates.map(plate => {
+        const text = plate.formatted_text || plate.text;
+        return plate.ocr_confidence != null ? `${text} (${(plate.ocr_confidence * 100).toFixed(0)}%)` : text;
+    }).join(', ');
+    updateStatus(`🚗 Em cena (frame ${data.frame_id}): ${description}`, 'success');
 }
 
 // Manipular mensagens WebSocket
 function handleWebSocketMessage(data) {
     switch (data.type) {
         case 'frame':
-            videoFeed.src = 'data:image/jpeg;base64,' + data.frame;
-            if (videoFeed.style.display === 'none') {
-                videoFeed.style.display = 'block';
-                loadingOverlay.style.display = 'none';
-            }
-            if (detectionEnabled && data.frame && data.plates && data.plates.length > 0) {
-                saveFrameToServer(data.frame);
-            }
+            // Formato JSON (base64), usado quando o modo binário não foi negociado
+            showFrame('data:image/jpeg;base64,' + data.frame, data.timestamp);
+            break;
+        case 'plates':
+            // Placas do frame com o mesmo frame_id (as caixas já vêm desenhadas na imagem)
+            handleLivePlates(data);
+            break;
+        case 'detection_saved':
+            // O servidor grava as detecções do stream; basta atualizar a lista
+            console.log('Detecção gravada pelo servidor. ID:', data.detection_id, 'Placas:', data.plates);
+            updateStatus(`🖼️ Detecção salva (ID: ${data.detection_id}), ${data.plates ? data.plates.length : 0} placa(s).`, 'success');
+            fetchPlatesFromDB();
             break;
         case 'camera_started': // ++ ALTERAR: Mensagem mais genérica ++
             updateStatus(`✅ ${data.message}`, 'success');
@@ -221,10 +243,10 @@ function handleWebSocketMessage(data) {
             useWebcamButton.disabled = true;
             useMjpegButton.disabled = true;
             startTime = Date.now();
+            lastLivePlatesKey = '';
             detectedPlates = [];
             updatePlatesList();
             updateStatistics();
-            lastSaveTime = 0;
             break;
         case 'camera_stopped': // ++ ALTERAR: Mensagem mais genérica ++
             updateStatus(`⏹️ ${data.message}`);
@@ -433,7 +455,8 @@ startButton.onclick = function () {
         const message = {
             command: 'start_camera',
             source_type: currentVideoSource, // ++ ADICIONAR: Enviar tipo de fonte ++
-            detection_enabled: detectionEnabled
+            detection_enabled: detectionEnabled,
+            protocol: 'binary' // Frames em mensagens binárias (JPEG sem base64)
         };
 
         if (currentVideoSource === 'webcam') {